@@ -2,6 +2,8 @@
 # See "Writing benchmarks" in the asv docs for more information.
 import numpy as np
 from yt import YTArray, YTQuantity
+from yt.units.unit_object import Unit
+from yt.units.unit_registry import UnitRegistry
 
 def time_quantity_init_scalar1():
     3.0 * YTQuantity(1, "m/s")
@@ -29,3 +31,35 @@ def time_quantity_array_conversion():
 
 def time_quantity_ufunc_sin():
     np.sin(YTArray(np.arange(10000), "degree"))
+
+
+def time_unit_parse_compound():
+    Unit("g*km/(cm**3*s)")
+
+
+def time_unit_parse_new_registry():
+    # A new registry has none of its own units yet, as for each dataset that
+    # is loaded.
+    registry = UnitRegistry()
+    for units in ("g/cm**3", "cm/s", "erg/g", "K", "dyne/cm**2"):
+        Unit(units, registry=registry)
+
+
+def time_quantity_small_array_conversions():
+    a = YTArray(np.arange(64), "cm/s")
+    for i in range(100):
+        a.convert_to_units("km/s")
+        a.convert_to_units("cm/s")
+
+
+def timeraw_import_yt():
+    # Run in a fresh interpreter, so this includes every module yt imports.
+    return "import yt"
+
+
+def timeraw_import_yt_and_load_uniform_grid():
+    return """
+import numpy as np
+import yt
+yt.load_uniform_grid({"density": np.ones((8, 8, 8))}, (8, 8, 8))
+"""
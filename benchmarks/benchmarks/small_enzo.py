@@ -20,6 +20,21 @@ class SmallEnzoSuite:
         dd = self.ds.all_data()
         dd["gas", "density"]
 
+    def time_gas_read_many(self):
+        dd = self.ds.all_data()
+        dd.get_data([("enzo", "Density"), ("enzo", "Temperature"),
+                     ("enzo", "x-velocity"), ("enzo", "y-velocity"),
+                     ("enzo", "z-velocity")])
+
+    def time_gas_read_many_per_grid(self):
+        # The same read as above, without coalescing the HDF5 reads of the
+        # grids that share a file.
+        self.ds.index.io._coalesce_reads = False
+        try:
+            self.time_gas_read_many()
+        finally:
+            self.ds.index.io._coalesce_reads = True
+
     def time_gas_derived(self):
         dd = self.ds.all_data()
         dd["gas", "velocity_magnitude"]
@@ -87,6 +87,8 @@ cython_extensions = [
     Extension("yt.geometry.particle_deposit",
               ["yt/geometry/particle_deposit.pyx"],
               include_dirs=["yt/utilities/lib/"],
+              extra_compile_args=omp_args,
+              extra_link_args=omp_args,
               libraries=std_libs),
     Extension("yt.geometry.particle_smooth",
               ["yt/geometry/particle_smooth.pyx"],
@@ -135,7 +137,9 @@ cython_extensions = [
     Extension("yt.utilities.lib.pixelization_routines",
               ["yt/utilities/lib/pixelization_routines.pyx",
                "yt/utilities/lib/pixelization_constants.c"],
-              include_dirs=["yt/utilities/lib/"],
+              include_dirs=["yt/utilities/lib/", "yt/geometry/"],
+              extra_compile_args=omp_args,
+              extra_link_args=omp_args,
               libraries=std_libs,
               depends=["yt/utilities/lib/pixelization_constants.h"]),
     Extension("yt.utilities.lib.primitives",
@@ -185,7 +189,8 @@ lib_exts = [
     "particle_mesh_operations", "depth_first_octree", "fortran_reader",
     "interpolators", "basic_octree", "image_utilities",
     "points_in_volume", "quad_tree", "mesh_utilities",
-    "amr_kdtools", "lenses", "distance_queue", "allocation_container"
+    "amr_kdtools", "lenses", "distance_queue", "allocation_container",
+    "field_kernels", "particle_kdtree"
 ]
 for ext_name in lib_exts:
     cython_extensions.append(
@@ -90,43 +90,12 @@ from yt.frontends.stream.api import \
     load_particles, load_hexahedral_mesh, load_octree, \
     hexahedral_connectivity, load_unstructured_mesh
 
-from yt.frontends.ytdata.api import \
-    save_as_dataset
-
-# For backwards compatibility
-GadgetDataset = frontends.gadget.GadgetDataset
-GadgetStaticOutput = deprecated_class(GadgetDataset)
-TipsyDataset = frontends.tipsy.TipsyDataset
-TipsyStaticOutput = deprecated_class(TipsyDataset)
-
-# Now individual component imports from the visualization API
-from yt.visualization.api import \
-    FixedResolutionBuffer, ObliqueFixedResolutionBuffer, \
-    write_bitmap, write_image, \
-    apply_colormap, scale_image, write_projection, \
-    SlicePlot, AxisAlignedSlicePlot, OffAxisSlicePlot, LinePlot, \
-    LineBuffer, ProjectionPlot, OffAxisProjectionPlot, \
-    show_colormaps, add_cmap, make_colormap, \
-    ProfilePlot, PhasePlot, ParticlePhasePlot, \
-    ParticleProjectionPlot, ParticleImageBuffer, ParticlePlot, \
-    FITSImageData, FITSSlice, FITSProjection, FITSOffAxisSlice, \
-    FITSOffAxisProjection, plot_2d
-
-from yt.visualization.volume_rendering.api import \
-    volume_render, create_scene, ColorTransferFunction, TransferFunction, \
-    off_axis_projection, interactive_render
-import yt.visualization.volume_rendering.api as volume_rendering
-#    TransferFunctionHelper, MultiVariateTransferFunction
-#    off_axis_projection
-
 from yt.utilities.parallel_tools.parallel_analysis_interface import \
     parallel_objects, enable_parallelism, communication_system
 
 from yt.convenience import \
     load, simulation
 
-from yt.testing import run_nose
-
 # Import some helpful math utilities
 from yt.utilities.math_utils import \
     ortho_find, quartiles, periodic_position
@@ -134,5 +103,56 @@ from yt.utilities.math_utils import \
 from yt.units.unit_systems import UnitSystem
 from yt.units.unit_object import unit_system_registry
 
-from yt.analysis_modules.list_modules import \
-    amods
+# The plotting and volume rendering interfaces (and so matplotlib), the
+# frontends other than stream and the analysis modules are only imported
+# when they are first used, which keeps "import yt" fast.  yt.load imports
+# the frontends when it needs to identify a dataset.
+
+def _gadget_static_output():
+    from yt.frontends.gadget.api import GadgetDataset
+    return deprecated_class(GadgetDataset)
+
+def _tipsy_static_output():
+    from yt.frontends.tipsy.api import TipsyDataset
+    return deprecated_class(TipsyDataset)
+
+def _visualization():
+    import yt.visualization.api
+    import yt.visualization.volume_rendering.api
+    return yt.visualization
+
+_lazy_attributes = {
+    # For backwards compatibility
+    "GadgetDataset": ("yt.frontends.gadget.api", "GadgetDataset"),
+    "GadgetStaticOutput": _gadget_static_output,
+    "TipsyDataset": ("yt.frontends.tipsy.api", "TipsyDataset"),
+    "TipsyStaticOutput": _tipsy_static_output,
+    "save_as_dataset": ("yt.frontends.ytdata.api", "save_as_dataset"),
+    "save_sorted_particles": ("yt.frontends.ytdata.api",
+                              "save_sorted_particles"),
+    "volume_rendering": ("yt.visualization.volume_rendering.api", None),
+    "visualization": _visualization,
+    "run_nose": ("yt.testing", "run_nose"),
+    "amods": ("yt.analysis_modules.list_modules", "amods"),
+    "analysis_modules": ("yt.analysis_modules", None),
+}
+for _name in (
+        "FixedResolutionBuffer", "ObliqueFixedResolutionBuffer",
+        "write_bitmap", "write_image", "apply_colormap", "scale_image",
+        "write_projection", "SlicePlot", "AxisAlignedSlicePlot",
+        "OffAxisSlicePlot", "LinePlot", "LineBuffer", "ProjectionPlot",
+        "OffAxisProjectionPlot", "show_colormaps", "add_cmap",
+        "make_colormap", "ProfilePlot", "PhasePlot", "ParticlePhasePlot",
+        "ParticleProjectionPlot", "ParticleImageBuffer", "ParticlePlot",
+        "FITSImageData", "FITSSlice", "FITSProjection", "FITSOffAxisSlice",
+        "FITSOffAxisProjection", "plot_2d"):
+    _lazy_attributes[_name] = ("yt.visualization.api", _name)
+for _name in (
+        "volume_render", "create_scene", "ColorTransferFunction",
+        "TransferFunction", "off_axis_projection", "interactive_render"):
+    _lazy_attributes[_name] = ("yt.visualization.volume_rendering.api", _name)
+del _name
+
+from yt.utilities.lazy_imports import \
+    add_lazy_attributes as _add_lazy_attributes
+_add_lazy_attributes(__name__, _lazy_attributes)
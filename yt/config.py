@@ -46,6 +46,8 @@ ytcfg_defaults = dict(
     parallel_traceback = 'False',
     pasteboard_repo = '',
     reconstruct_index = 'True',
+    particle_index_cache = 'True',
+    particle_index_nprocs = '1',
     test_storage_dir = '/does/not/exist',
     test_data_dir = '/does/not/exist',
     requires_ds_strict = 'False',
@@ -67,10 +69,19 @@ ytcfg_defaults = dict(
     thread_field_detection = 'False',
     ignore_invalid_unit_operation_errors = 'False',
     chunk_size = '1000',
+    projection_nthreads = '1',
+    field_cache_size = '0',
+    max_chunk_bytes = '0',
+    memmap_particle_files = 'False',
+    fused_field_kernels = 'True',
     xray_data_dir = '/does/not/exist',
     supp_data_dir = '/does/not/exist',
     default_colormap = 'arbre',
     ray_tracing_engine = 'embree',
+    neighbor_backend = 'octree',
+    sph_pixelization = 'True',
+    particle_nthreads = '1',
+    save_particle_id_index = 'True',
     )
 
 CONFIG_DIR = os.environ.get(
@@ -26,7 +26,13 @@ from yt.utilities.parameter_file_storage import \
 from yt.utilities.exceptions import \
     YTOutputNotIdentified, \
     YTSimulationNotIdentified
+from yt.utilities.file_signature import FileSignature
 from yt.utilities.hierarchy_inspection import find_lowest_subclasses
+from yt.frontends.api import import_frontends
+
+# The name of the output type that was found for a path, keyed by
+# FileSignature.stat_key
+_output_type_cache = {}
 
 def load(*args ,**kwargs):
     """
@@ -35,7 +41,14 @@ def load(*args ,**kwargs):
     :meth:`yt.data_objects.static_output.Dataset._is_valid` until it finds a
     match, at which point it returns an instance of the appropriate
     :class:`yt.data_objects.static_output.Dataset` subclass.
+
+    If the first argument is an existing file or directory, the output types
+    are first narrowed down with their cheap
+    :meth:`yt.data_objects.static_output.Dataset._prefilter`, and the type
+    that is found is remembered for the next time the same, unmodified, path
+    is loaded.
     """
+    import_frontends()
     candidates = []
     args = [os.path.expanduser(arg) if isinstance(arg, string_types)
             else arg for arg in args]
@@ -74,8 +87,16 @@ def load(*args ,**kwargs):
             mylog.error("None of the arguments provided to load() is a valid file")
             mylog.error("Please check that you have used a correct path")
             raise YTOutputNotIdentified(args, kwargs)
+    signature = None
+    if isinstance(args[0], string_types) and os.path.exists(args[0]):
+        signature = FileSignature(args[0])
+        n = _output_type_cache.get(signature.stat_key())
+        if n in output_type_registry and \
+           output_type_registry[n]._is_valid(*args, **kwargs):
+            return output_type_registry[n](*args, **kwargs)
     for n, c in types_to_check.items():
         if n is None: continue
+        if signature is not None and not c._prefilter(signature): continue
         if c._is_valid(*args, **kwargs): candidates.append(n)
 
     # convert to classes
@@ -83,6 +104,8 @@ def load(*args ,**kwargs):
     # Find only the lowest subclasses, i.e. most specialised front ends
     candidates = find_lowest_subclasses(candidates)
     if len(candidates) == 1:
+        if signature is not None:
+            _output_type_cache[signature.stat_key()] = candidates[0].__name__
         return candidates[0](*args, **kwargs)
     if len(candidates) == 0:
         if ytcfg.get("yt", "enzo_db") != '' \
@@ -108,6 +131,7 @@ def simulation(parameter_filename, simulation_type, find_outputs=False):
     simulation type.
     """
 
+    import_frontends()
     if simulation_type not in simulation_time_series_registry:
         raise YTSimulationNotIdentified(simulation_type)
 
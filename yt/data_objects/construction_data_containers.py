@@ -20,8 +20,10 @@ import fileinput
 import io
 from re import finditer
 from tempfile import NamedTemporaryFile, TemporaryFile
+import multiprocessing
 import os
 import sys
+import threading
 import zipfile
 
 from yt.config import ytcfg
@@ -36,7 +38,8 @@ from yt.funcs import \
     mylog, \
     get_memory_usage, \
     iterable, \
-    only_on_root
+    only_on_root, \
+    get_particle_nthreads
 from yt.utilities.exceptions import \
     YTParticleDepositionNotImplemented, \
     YTNoAPIKey, \
@@ -44,7 +47,8 @@ from yt.utilities.exceptions import \
 from yt.fields.field_exceptions import \
     NeedsGridType
 from yt.utilities.lib.quad_tree import \
-    QuadTree
+    QuadTree, \
+    merge_quadtrees
 from yt.utilities.lib.interpolators import \
     ghost_zone_interpolate
 from yt.utilities.lib.misc_utilities import \
@@ -64,6 +68,7 @@ from yt.fields.field_exceptions import \
 from yt.frontends.stream.api import load_uniform_grid
 from yt.units.yt_array import YTArray
 import yt.extern.six as six
+from yt.extern.six.moves import queue
 
 class YTStreamline(YTSelectionContainer1D):
     """
@@ -266,7 +271,8 @@ class YTQuadTreeProj(YTSelectionContainer2D):
             if any(nodal_flag):
                 raise RuntimeError("Nodal fields are currently not supported for projections.")
 
-        if not self.deserialize(field):
+        # With no fields there is nothing to project, restore or store.
+        if len(field) > 0 and not self.deserialize(field):
             self.get_data(field)
             self.serialize()
 
@@ -332,16 +338,21 @@ class YTQuadTreeProj(YTSelectionContainer2D):
         if communication_system.communicators[-1].size > 1:
             for chunk in self.data_source.chunks([], "io", local_only = False):
                 self._initialize_chunk(chunk, tree)
-        _units_initialized = False
+        nthreads = self._get_nthreads()
         with self.data_source._field_parameter_state(self.field_parameters):
-            for chunk in parallel_objects(self.data_source.chunks(
-                                          [], "io", local_only = True)):
-                mylog.debug("Adding chunk (%s) to tree (%0.3e GB RAM)",
-                            chunk.ires.size, get_memory_usage()/1024.)
-                if _units_initialized is False:
-                    self._initialize_projected_units(fields, chunk)
-                    _units_initialized = True
-                self._handle_chunk(chunk, fields, tree)
+            chunks = parallel_objects(self.data_source.chunks(
+                                      [], "io", local_only = True))
+            if nthreads > 1:
+                self._add_chunks_threaded(chunks, fields, tree, nthreads)
+            else:
+                _units_initialized = False
+                for chunk in chunks:
+                    mylog.debug("Adding chunk (%s) to tree (%0.3e GB RAM)",
+                                chunk.ires.size, get_memory_usage()/1024.)
+                    if _units_initialized is False:
+                        self._initialize_projected_units(fields, chunk)
+                        _units_initialized = True
+                    self._handle_chunk(chunk, fields, tree)
         # if there's less than nprocs chunks, units won't be initialized
         # on all processors, so sync with _projected_units on rank 0
         projected_units = self.comm.mpi_bcast(self._projected_units)
@@ -432,7 +443,64 @@ class YTQuadTreeProj(YTSelectionContainer2D):
             else:
                 self._projected_units[field] = field_unit
 
+    def _get_nthreads(self):
+        nthreads = ytcfg.getint("yt", "projection_nthreads")
+        if nthreads <= 0:
+            nthreads = multiprocessing.cpu_count()
+        return nthreads
+
+    def _add_chunks_threaded(self, chunks, fields, tree, nthreads):
+        # Chunks are read and their fields generated on this thread, while
+        # nthreads workers each add cells to a tree of their own with the
+        # GIL released.  The trees are merged into *tree* at the end; since
+        # any structure in *tree* from _initialize_chunk is a superset of
+        # the workers' trees, merging keeps it identical on every processor.
+        trees = [tree] + [self._get_tree(len(fields))
+                          for i in range(nthreads - 1)]
+        pending = queue.Queue(maxsize = 2 * nthreads)
+        errors = []
+        def _worker(my_tree):
+            while True:
+                args = pending.get()
+                if args is None:
+                    return
+                if len(errors) > 0:
+                    continue
+                try:
+                    my_tree.add_chunk_to_tree(*args)
+                except Exception:
+                    errors.append(sys.exc_info())
+        workers = [threading.Thread(target = _worker, args = (t,))
+                   for t in trees]
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        _units_initialized = False
+        try:
+            for chunk in chunks:
+                if len(errors) > 0:
+                    break
+                mylog.debug("Adding chunk (%s) to tree (%0.3e GB RAM)",
+                            chunk.ires.size, get_memory_usage()/1024.)
+                if _units_initialized is False:
+                    self._initialize_projected_units(fields, chunk)
+                    _units_initialized = True
+                pending.put(self._get_chunk_values(chunk, fields))
+        finally:
+            for worker in workers:
+                pending.put(None)
+            for worker in workers:
+                worker.join()
+        if len(errors) > 0:
+            six.reraise(*errors[0])
+        merge_style = -1 if self.method == "mip" else 1
+        for other in trees[1:]:
+            merge_quadtrees(tree, other, merge_style)
+
     def _handle_chunk(self, chunk, fields, tree):
+        tree.add_chunk_to_tree(*self._get_chunk_values(chunk, fields))
+
+    def _get_chunk_values(self, chunk, fields):
         if self.method == "mip" or self._sum_only:
             dl = self.ds.quan(1.0, "")
         else:
@@ -461,7 +529,7 @@ class YTQuadTreeProj(YTSelectionContainer2D):
         i1 = icoords[:,xax]
         i2 = icoords[:,yax]
         ilevel = chunk.ires * self.ds.ires_factor
-        tree.add_chunk_to_tree(i1, i2, ilevel, v, w)
+        return i1, i2, ilevel, v, w
 
     def to_pw(self, fields=None, center='c', width=None, origin='center-window'):
         r"""Create a :class:`~yt.visualization.plot_window.PWViewerMPL` from this
@@ -754,7 +822,8 @@ class YTCoveringGrid(YTSelectionContainer3D):
         # routines, so we reverse it here to match the convention there
         op = cls(tuple(self.ActiveDimensions)[::-1], kernel_name)
         op.initialize()
-        op.process_grid(self, positions, fields)
+        op.process_grid(self, positions, fields,
+                        num_threads=get_particle_nthreads())
         vals = op.finalize()
         # Fortran-ordered, so transpose.
         return vals.transpose()
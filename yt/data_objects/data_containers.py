@@ -14,6 +14,7 @@ Various non-grid data containers.
 #-----------------------------------------------------------------------------
 
 import itertools
+import time
 import uuid
 
 import numpy as np
@@ -1174,6 +1175,39 @@ class YTDataContainer(object):
                     yield b, m
                 o.field_parameters = cache_fp
 
+def order_field_generation(fields, graph):
+    """
+    Order *fields* so that each one comes after the fields it depends on.
+
+    *graph* maps every field in *fields* to the set of fields it depends
+    on; dependencies that are not themselves in *fields* are assumed to be
+    available already.  Ties are broken by the original order of *fields*,
+    and any fields caught in a dependency cycle are appended in their
+    original order.
+    """
+    position = dict((f, i) for i, f in enumerate(fields))
+    waiting = dict((f, len(set(d for d in graph[f] if d in position)))
+                   for f in fields)
+    consumers = defaultdict(list)
+    for f in fields:
+        for d in graph[f]:
+            if d in position:
+                consumers[d].append(f)
+    ready = [f for f in fields if waiting[f] == 0]
+    order = []
+    while len(ready) > 0:
+        ready.sort(key = position.get)
+        f = ready.pop(0)
+        order.append(f)
+        for c in consumers[f]:
+            waiting[c] -= 1
+            if waiting[c] == 0:
+                ready.append(c)
+    if len(order) < len(fields):
+        done = set(order)
+        order += [f for f in fields if f not in done]
+    return order
+
 class GenerationInProgress(Exception):
     def __init__(self, fields):
         self.fields = fields
@@ -1188,6 +1222,7 @@ class YTSelectionContainer(YTDataContainer, ParallelAnalysisInterface):
     _dimensionality = None
     _max_level = None
     _min_level = None
+    _field_timings = None
 
     def __init__(self, ds, field_parameters, data_source=None):
         ParallelAnalysisInterface.__init__(self)
@@ -1231,39 +1266,119 @@ class YTSelectionContainer(YTDataContainer, ParallelAnalysisInterface):
         chunk_ind = kwargs.pop("chunk_ind", None)
         if chunk_ind is not None:
             chunk_ind = ensure_list(chunk_ind)
-        for ci, chunk in enumerate(self.index._chunk(self, chunking_style,
-                                   **kwargs)):
+        chunks = self.index._chunk(self, chunking_style, **kwargs)
+        if self.index.prefetch > 0 and self.index._prefetch_supported and \
+           chunking_style == "io" and chunk_ind is None and \
+           "preload_fields" not in kwargs:
+            prefetch_fields = self._identify_prefetch_fields(fields)
+            if len(prefetch_fields) > 0:
+                chunks = self.index._prefetch_chunks(
+                    self, chunks, prefetch_fields, self.index.prefetch)
+        for ci, chunk in enumerate(chunks):
             if chunk_ind is not None and ci not in chunk_ind:
                 continue
             with self._chunked_read(chunk):
+                prefetched = getattr(chunk, "_prefetched", None)
+                if prefetched is not None:
+                    self._store_read_fields(prefetched.get())
+                    chunk._prefetched = None
                 self.get_data(fields)
                 # NOTE: we yield before releasing the context
                 yield self
 
+    def _identify_prefetch_fields(self, fields):
+        # The on-disk fields that get_data would read for *fields*.  Fields
+        # that need ghost zones are generated from spatial chunks, so their
+        # dependencies are not read from the io chunks.
+        fields_to_get = []
+        for field in self._determine_fields(fields):
+            if field[0] in self.ds.filtered_particle_types:
+                return []
+            finfo = self.ds._get_field_info(*field)
+            try:
+                finfo.check_available(self)
+            except NeedsGridType:
+                continue
+            fields_to_get.append(field)
+        fields_to_get = self._identify_dependencies(fields_to_get)
+        try:
+            return self.index._split_fields(fields_to_get)[0]
+        except YTFieldNotFound:
+            return []
+
+    def _store_read_fields(self, read_fields):
+        for f, v in read_fields.items():
+            finfo = self.ds._get_field_info(*f)
+            self.field_data[f] = self.ds.arr(v, input_units = finfo.units)
+            self.field_data[f].convert_to_units(finfo.output_units)
+
+    def _get_field_detector(self, field):
+        fd = self.ds.field_dependencies.get(field, None) or \
+             self.ds.field_dependencies.get(field[1], None)
+        # This is long overdue.  Any time we *can't* find a field
+        # dependency -- for instance, if the derived field has been added
+        # after dataset instantiation -- let's just try to
+        # recalculate it.
+        if fd is None:
+            fi = self.ds._get_field_info(*field)
+            try:
+                fd = fi.get_dependencies(ds = self.ds)
+                self.ds.field_dependencies[field] = fd
+            except:
+                return None
+        return fd
+
     def _identify_dependencies(self, fields_to_get, spatial = False):
         inspected = 0
         fields_to_get = fields_to_get[:]
         for field in itertools.cycle(fields_to_get):
             if inspected >= len(fields_to_get): break
             inspected += 1
-            fi = self.ds._get_field_info(*field)
-            fd = self.ds.field_dependencies.get(field, None) or \
-                 self.ds.field_dependencies.get(field[1], None)
-            # This is long overdue.  Any time we *can't* find a field
-            # dependency -- for instance, if the derived field has been added
-            # after dataset instantiation -- let's just try to
-            # recalculate it.
+            fd = self._get_field_detector(field)
             if fd is None:
-                try:
-                    fd = fi.get_dependencies(ds = self.ds)
-                    self.ds.field_dependencies[field] = fd
-                except:
-                    continue
+                continue
             requested = self._determine_fields(list(set(fd.requested)))
             deps = [d for d in requested if d not in fields_to_get]
             fields_to_get += deps
         return fields_to_get
 
+    def _field_dependency_graph(self, fields, learned = None):
+        # Maps each field to the set of fields its function accesses
+        # directly, as recorded by the FieldDetector, following derived
+        # dependencies that are not yet in field_data.  Names that cannot be
+        # resolved in this container are dropped; a missing edge only costs
+        # a GenerationInProgress round trip in _generate_fields.
+        graph = {}
+        fields = list(fields)
+        while len(fields) > 0:
+            field = fields.pop(0)
+            if field in graph:
+                continue
+            graph[field] = deps = set()
+            if learned is not None:
+                deps.update(learned.get(field, ()))
+            fd = self._get_field_detector(field)
+            if fd is not None:
+                finfo = self.ds._get_field_info(*field)
+                with self._field_type_state(field[0], finfo):
+                    for dep in getattr(fd, "dependencies", []):
+                        try:
+                            dep = self._determine_fields(dep)[0]
+                        except (YTFieldNotFound, YTFieldTypeNotFound,
+                                YTFieldNotParseable):
+                            continue
+                        if dep != field:
+                            deps.add(dep)
+            for dep in deps:
+                if dep in graph or dep in self.field_data:
+                    continue
+                finfo = self.ds.field_info.get(dep, None)
+                if finfo is None or \
+                   finfo._function.__name__ == 'NullFunc':
+                    continue
+                fields.append(dep)
+        return graph
+
     def get_data(self, fields=None):
         if self._current_chunk is None:
             self.index._identify_base_chunk(self)
@@ -1315,6 +1430,9 @@ class YTSelectionContainer(YTDataContainer, ParallelAnalysisInterface):
         fluids, particles = [], []
         finfos = {}
         for ftype, fname in fields_to_get:
+            if (ftype, fname) in self.field_data:
+                # Already read, e.g. by a prefetching io chunk.
+                continue
             finfo = self.ds._get_field_info(ftype, fname)
             finfos[ftype, fname] = finfo
             if finfo.particle_type:
@@ -1337,65 +1455,108 @@ class YTSelectionContainer(YTDataContainer, ParallelAnalysisInterface):
             self.field_data[f].convert_to_units(finfos[f].output_units)
 
         fields_to_generate += gen_fluids + gen_particles
-        self._generate_fields(fields_to_generate)
+        self._generate_fields(fields_to_generate, keep = ofields)
         for field in list(self.field_data.keys()):
             if field not in ofields:
                 self.field_data.pop(field)
 
-    def _generate_fields(self, fields_to_generate):
-        index = 0
+    def _generate_fields(self, fields_to_generate, keep = None):
+        # Fields are generated in dependency order, so every derived field
+        # finds the fields it needs already in field_data and each
+        # intermediate is computed exactly once.  If *keep* is given, any
+        # generated field not in it is freed as soon as the last field that
+        # consumes it has been generated.  Dependencies the FieldDetector
+        # did not see show up as GenerationInProgress; they are added to the
+        # graph and the remaining fields are reordered.
+        learned = defaultdict(set)
         with self._field_lock():
-            # At this point, we assume that any fields that are necessary to
-            # *generate* a field are in fact already available to us.  Note
-            # that we do not make any assumption about whether or not the
-            # fields have a spatial requirement.  This will be checked inside
-            # _generate_field, at which point additional dependencies may
-            # actually be noted.
-            while any(f not in self.field_data for f in fields_to_generate):
-                field = fields_to_generate[index % len(fields_to_generate)]
-                index += 1
-                if field in self.field_data: continue
-                fi = self.ds._get_field_info(*field)
+            while True:
+                pending = [f for f in fields_to_generate
+                           if f not in self.field_data]
+                if len(pending) == 0: break
+                graph = self._field_dependency_graph(pending, learned)
+                pending += [f for f in graph if f not in pending]
+                for field in pending:
+                    if field not in fields_to_generate:
+                        fields_to_generate.append(field)
+                order = order_field_generation(pending, graph)
+                consumers = defaultdict(int)
+                for field in order:
+                    for dep in graph[field]:
+                        consumers[dep] += 1
                 try:
-                    fd = self._generate_field(field)
-                    if fd is None:
-                        raise RuntimeError
-                    if fi.units is None:
-                        # first time calling a field with units='auto', so we
-                        # infer the units from the units of the data we get back
-                        # from the field function and use these units for future
-                        # field accesses
-                        units = getattr(fd, 'units', '')
-                        if units == '':
-                            dimensions = ytdims.dimensionless
-                        else:
-                            dimensions = units.dimensions
-                            units = str(units.get_base_equivalent(self.ds.unit_system.name))
-                        if fi.dimensions != dimensions:
-                            raise YTDimensionalityError(fi.dimensions, dimensions)
-                        fi.units = units
-                        self.field_data[field] = self.ds.arr(fd, units)
-                        msg = ("Field %s was added without specifying units, "
-                               "assuming units are %s")
-                        mylog.warn(msg % (fi.name, units))
-                    try:
-                        fd.convert_to_units(fi.units)
-                    except AttributeError:
-                        # If the field returns an ndarray, coerce to a
-                        # dimensionless YTArray and verify that field is
-                        # supposed to be unitless
-                        fd = self.ds.arr(fd, '')
-                        if fi.units != '':
-                            raise YTFieldUnitError(fi, fd.units)
-                    except YTUnitConversionError:
-                        raise YTFieldUnitError(fi, fd.units)
-                    except UnitParseError:
-                        raise YTFieldUnitParseError(fi)
-                    self.field_data[field] = fd
+                    for field in order:
+                        self._evaluate_field(field)
+                        for dep in graph[field]:
+                            consumers[dep] -= 1
+                            if consumers[dep] == 0 and keep is not None \
+                               and dep not in keep \
+                               and dep in fields_to_generate:
+                                self.field_data.pop(dep, None)
                 except GenerationInProgress as gip:
                     for f in gip.fields:
                         if f not in fields_to_generate:
                             fields_to_generate.append(f)
+                        if f != field:
+                            learned[field].add(f)
+
+    def _evaluate_field(self, field):
+        fi = self.ds._get_field_info(*field)
+        t1 = time.time()
+        fd = self._generate_field(field)
+        if fd is None:
+            raise RuntimeError
+        if fi.units is None:
+            # first time calling a field with units='auto', so we
+            # infer the units from the units of the data we get back
+            # from the field function and use these units for future
+            # field accesses
+            units = getattr(fd, 'units', '')
+            if units == '':
+                dimensions = ytdims.dimensionless
+            else:
+                dimensions = units.dimensions
+                units = str(units.get_base_equivalent(self.ds.unit_system.name))
+            if fi.dimensions != dimensions:
+                raise YTDimensionalityError(fi.dimensions, dimensions)
+            fi.units = units
+            self.field_data[field] = self.ds.arr(fd, units)
+            msg = ("Field %s was added without specifying units, "
+                   "assuming units are %s")
+            mylog.warn(msg % (fi.name, units))
+        try:
+            fd.convert_to_units(fi.units)
+        except AttributeError:
+            # If the field returns an ndarray, coerce to a
+            # dimensionless YTArray and verify that field is
+            # supposed to be unitless
+            fd = self.ds.arr(fd, '')
+            if fi.units != '':
+                raise YTFieldUnitError(fi, fd.units)
+        except YTUnitConversionError:
+            raise YTFieldUnitError(fi, fd.units)
+        except UnitParseError:
+            raise YTFieldUnitParseError(fi)
+        self.field_data[field] = fd
+        t2 = time.time()
+        if self._field_timings is None:
+            self._field_timings = {}
+        calls, seconds = self._field_timings.get(field, (0, 0.0))
+        self._field_timings[field] = (calls + 1, seconds + t2 - t1)
+        mylog.debug("Generated %s in %0.3e seconds", field, t2 - t1)
+
+    @property
+    def field_timings(self):
+        """
+        The time spent generating each derived field for this container.
+
+        Returns a dictionary mapping each generated field to a tuple of the
+        number of times it was generated (once per chunk) and the total
+        wall-clock time in seconds.  Because fields are generated in
+        dependency order, the time reported for a field does not include
+        the time spent on the fields it depends on.
+        """
+        return dict(self._field_timings or {})
 
     def __or__(self, other):
         if not isinstance(other, YTSelectionContainer):
@@ -21,7 +21,9 @@ from six import string_types
 from yt.config import ytcfg
 from yt.data_objects.data_containers import \
     YTSelectionContainer
-from yt.funcs import iterable
+from yt.funcs import \
+    iterable, \
+    get_particle_nthreads
 from yt.geometry.selection_routines import convert_mask_to_indices
 import yt.geometry.particle_deposit as particle_deposit
 from yt.units.yt_array import YTArray
@@ -375,7 +377,8 @@ class AMRGridPatch(YTSelectionContainer):
         # routines, so we reverse it here to match the convention there
         op = cls(tuple(self.ActiveDimensions[::-1]), kernel_name)
         op.initialize()
-        op.process_grid(self, positions, fields)
+        op.process_grid(self, positions, fields,
+                        num_threads=get_particle_nthreads())
         vals = op.finalize()
         if vals is None: return
         # Fortran-ordered, so transpose.
@@ -425,3 +428,194 @@ class AMRGridPatch(YTSelectionContainer):
     def select_particles(self, selector, x, y, z):
         mask = selector.select_points(x,y,z, 0.0)
         return mask
+
+class AMRGridSlab(object):
+    """
+    The cells of a grid with x indices in the range [start, stop).
+
+    Slabs stand in for a grid in io chunks when the grid is too large to be
+    read as a single chunk.  Everything not defined here, including the id,
+    filename and dimensions used by the IO handlers, is that of the grid.
+    IO handlers that can read hyperslabs read only the planes of the slab,
+    an array shaped like ``slab_shape``; the others read the whole grid, and
+    the slab only selects and counts its own cells.  All of the particles of
+    the grid belong to its first slab.
+    """
+    def __init__(self, grid, start, stop):
+        self.grid = grid
+        self.start = start
+        self.stop = stop
+        self._last_selector_id = None
+        self._last_count = 0
+
+    def __getattr__(self, attr):
+        if attr == "grid":
+            raise AttributeError(attr)
+        return getattr(self.grid, attr)
+
+    def __getitem__(self, key):
+        return self.grid[key]
+
+    def __repr__(self):
+        return "%s[%s:%s]" % (self.grid, self.start, self.stop)
+
+    @property
+    def slab_shape(self):
+        return (self.stop - self.start,) + tuple(self.grid.ActiveDimensions[1:])
+
+    @property
+    def io_key(self):
+        # Slabs share the id of their grid but not its data, so the IO
+        # handlers cache them under their range as well.
+        return (self.grid.id, self.start, self.stop)
+
+    @property
+    def field_parameters(self):
+        return self.grid.field_parameters
+
+    @field_parameters.setter
+    def field_parameters(self, value):
+        self.grid.field_parameters = value
+
+    # The particle counts the IO handlers check before reading a grid's
+    # particles, which are all zero for the slabs after the first.
+    @property
+    def NumberOfParticles(self):
+        if self.start > 0:
+            return 0
+        return self.grid.NumberOfParticles
+
+    @property
+    def NumberOfActiveParticles(self):
+        counts = self.grid.NumberOfActiveParticles
+        if self.start > 0:
+            return dict((ptype, 0) for ptype in counts)
+        return counts
+
+    @property
+    def _pdata(self):
+        pdata = self.grid._pdata
+        if self.start > 0:
+            return dict((ptype, dict(info, NumberOfParticles=0))
+                        for ptype, info in pdata.items())
+        return pdata
+
+    def retrieve_ghost_zones(self, *args, **kwargs):
+        cube = self.grid.retrieve_ghost_zones(*args, **kwargs)
+        cube._base_grid = self
+        return cube
+
+    def _get_selector_mask(self, selector):
+        mask = self.grid._get_selector_mask(selector)
+        if mask is None:
+            self._last_count = 0
+            return None
+        mask = mask[self.start:self.stop]
+        if hash(selector) != self._last_selector_id:
+            self._last_count = mask.sum()
+            self._last_selector_id = hash(selector)
+        if self._last_count == 0:
+            return None
+        return mask
+
+    def count(self, selector):
+        mask = self._get_selector_mask(selector)
+        if mask is None: return 0
+        return self._last_count
+
+    def select(self, selector, source, dest, offset):
+        mask = self._get_selector_mask(selector)
+        if mask is None: return 0
+        count = self._last_count
+        if source.shape == self.slab_shape:
+            dest[offset:offset+count] = source[mask]
+            return count
+        nodal_flag = source.shape - self.grid.ActiveDimensions
+        if sum(nodal_flag) == 0:
+            dest[offset:offset+count] = source[self.start:self.stop][mask]
+        else:
+            slices = get_nodal_slices(source.shape, nodal_flag)
+            for i, sl in enumerate(slices):
+                dest[offset:offset+count, i] = \
+                    source[sl][self.start:self.stop][mask]
+        return count
+
+    def _slab_indices(self, selector):
+        mask = self._get_selector_mask(selector)
+        if mask is None:
+            return None
+        ind = convert_mask_to_indices(mask, self._last_count)
+        ind[:, 0] += self.start
+        return ind
+
+    def select_icoords(self, dobj):
+        coords = self._slab_indices(dobj.selector)
+        if coords is None: return np.empty((0,3), dtype='int64')
+        coords += self.grid.get_global_startindex()[None, :]
+        return coords
+
+    def select_fcoords(self, dobj):
+        coords = self._slab_indices(dobj.selector)
+        if coords is None: return np.empty((0,3), dtype='float64')
+        coords = coords.astype("float64")
+        coords += 0.5
+        coords *= self.grid.dds[None, :]
+        coords += self.grid.LeftEdge[None, :]
+        return coords
+
+    def select_fwidth(self, dobj):
+        count = self.count(dobj.selector)
+        if count == 0: return np.empty((0,3), dtype='float64')
+        coords = np.empty((count, 3), dtype='float64')
+        for axis in range(3):
+            coords[:,axis] = self.grid.dds[axis]
+        return coords
+
+    def select_ires(self, dobj):
+        count = self.count(dobj.selector)
+        coords = np.empty(count, dtype='int64')
+        coords[:] = self.grid.Level
+        return coords
+
+    def select_tcoords(self, dobj):
+        # The grid's values are in C order, so the slab's are a contiguous
+        # run of them.
+        dt, t = dobj.selector.get_dt(self.grid)
+        mask = self.grid._get_selector_mask(dobj.selector)
+        count = self.count(dobj.selector)
+        if count == 0:
+            return dt[:0], t[:0]
+        offset = mask[:self.start].sum()
+        return dt[offset:offset+count], t[offset:offset+count]
+
+def particle_grids(objs):
+    """
+    The grids and grid slabs of *objs* that hold particles of their own,
+    leaving out the slabs of a grid after its first, for IO handlers that
+    read the particles of runs of grids by their index.
+    """
+    return [obj for obj in objs
+            if not (isinstance(obj, AMRGridSlab) and obj.start > 0)]
+
+def split_grid(grid, selector, max_cells):
+    """
+    Split *grid* into AMRGridSlab objects that each hold no more than
+    *max_cells* of the cells selected by *selector*, or return the grid
+    itself in a list if it is small enough.  Slabs are never thinner than
+    a single plane of cells, so a slab may hold more than *max_cells* cells
+    if a single plane does.
+    """
+    mask = grid._get_selector_mask(selector)
+    if mask is None or grid.count(selector) <= max_cells:
+        return [grid]
+    per_plane = mask.reshape((mask.shape[0], -1)).sum(axis=1)
+    slabs = []
+    start = ncells = 0
+    for i, n in enumerate(per_plane):
+        if ncells > 0 and ncells + n > max_cells:
+            slabs.append(AMRGridSlab(grid, start, i))
+            start, ncells = i, 0
+        ncells += n
+    if ncells > 0:
+        slabs.append(AMRGridSlab(grid, start, mask.shape[0]))
+    return slabs
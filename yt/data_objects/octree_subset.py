@@ -23,8 +23,12 @@ from yt.data_objects.field_data import \
 import yt.geometry.particle_deposit as particle_deposit
 import yt.geometry.particle_smooth as particle_smooth
 
-from yt.funcs import mylog
+from yt.config import ytcfg
+from yt.funcs import \
+    mylog, \
+    get_particle_nthreads
 from yt.utilities.lib.geometry_utils import compute_morton
+from yt.utilities.lib.particle_kdtree import ParticleKDTree
 from yt.geometry.particle_oct_container import \
     ParticleOctreeContainer
 from yt.units.yt_array import YTArray
@@ -53,6 +57,7 @@ class OctreeSubset(YTSelectionContainer):
     _domain_offset = 0
     _cell_count = -1
     _block_reorder = None
+    _kdtree = None
 
     def __init__(self, base_region, domain, ds, over_refine_factor = 1):
         super(OctreeSubset, self).__init__(ds, None)
@@ -189,11 +194,32 @@ class OctreeSubset(YTSelectionContainer):
         # need no casting.
         fields = [np.ascontiguousarray(f, dtype="float64") for f in fields]
         op.process_octree(self.oct_handler, self.domain_ind, pos, fields,
-            self.domain_id, self._domain_offset)
+            self.domain_id, self._domain_offset,
+            num_threads=get_particle_nthreads())
         vals = op.finalize()
         if vals is None: return
         return np.asfortranarray(vals)
 
+    def _neighbor_kdtree(self, positions):
+        # Returns a KD-tree of *positions* if the dataset uses the "kdtree"
+        # neighbor backend, or None to fall back to the particle octree.
+        # The tree is kept for as long as the same positions array is passed
+        # in, so smoothing several fields in a chunk builds it only once.
+        backend = self.ds.neighbor_backend or \
+            ytcfg.get("yt", "neighbor_backend")
+        if backend not in ("octree", "kdtree"):
+            raise ValueError("Unknown neighbor backend %s" % backend)
+        if backend != "kdtree" or self.ds.geometry != "cartesian":
+            return None
+        if self._kdtree is not None and self._kdtree[0] is positions:
+            return self._kdtree[1]
+        tree = ParticleKDTree(positions,
+            self.ds.domain_left_edge.in_units("code_length").d,
+            self.ds.domain_right_edge.in_units("code_length").d,
+            self.ds.periodicity)
+        self._kdtree = (positions, tree)
+        return tree
+
     def smooth(self, positions, fields = None, index_fields = None,
                method = None, create_octree = False, nneighbors = 64,
                kernel_name = 'cubic'):
@@ -240,7 +266,10 @@ class OctreeSubset(YTSelectionContainer):
         """
         # Here we perform our particle deposition.
         positions.convert_to_units("code_length")
-        if create_octree:
+        kdtree = self._neighbor_kdtree(positions)
+        if kdtree is not None:
+            particle_octree = pdom_ind = None
+        elif create_octree:
             morton = compute_morton(
                 positions[:,0], positions[:,1], positions[:,2],
                 self.ds.domain_left_edge,
@@ -276,7 +305,8 @@ class OctreeSubset(YTSelectionContainer):
         op.process_octree(self.oct_handler, mdom_ind, positions,
             self.fcoords, fields,
             self.domain_id, self._domain_offset, self.ds.periodicity,
-            index_fields, particle_octree, pdom_ind, self.ds.geometry)
+            index_fields, particle_octree, pdom_ind, self.ds.geometry,
+            kdtree)
         # If there are 0s in the smoothing field this will not throw an error,
         # but silently return nans for vals where dividing by 0
         # Same as what is currently occurring, but suppressing the div by zero
@@ -330,19 +360,23 @@ class OctreeSubset(YTSelectionContainer):
         """
         # Here we perform our particle deposition.
         positions.convert_to_units("code_length")
-        morton = compute_morton(
-            positions[:,0], positions[:,1], positions[:,2],
-            self.ds.domain_left_edge,
-            self.ds.domain_right_edge)
-        morton.sort()
-        particle_octree = ParticleOctreeContainer([1, 1, 1],
-            self.ds.domain_left_edge,
-            self.ds.domain_right_edge,
-            over_refine = 1)
-        particle_octree.n_ref = nneighbors * 2
-        particle_octree.add(morton)
-        particle_octree.finalize()
-        pdom_ind = particle_octree.domain_ind(self.selector)
+        kdtree = self._neighbor_kdtree(positions)
+        if kdtree is not None:
+            particle_octree = pdom_ind = None
+        else:
+            morton = compute_morton(
+                positions[:,0], positions[:,1], positions[:,2],
+                self.ds.domain_left_edge,
+                self.ds.domain_right_edge)
+            morton.sort()
+            particle_octree = ParticleOctreeContainer([1, 1, 1],
+                self.ds.domain_left_edge,
+                self.ds.domain_right_edge,
+                over_refine = 1)
+            particle_octree.n_ref = nneighbors * 2
+            particle_octree.add(morton)
+            particle_octree.finalize()
+            pdom_ind = particle_octree.domain_ind(self.selector)
         if fields is None: fields = []
         cls = getattr(particle_smooth, "%s_smooth" % method, None)
         if cls is None:
@@ -356,7 +390,7 @@ class OctreeSubset(YTSelectionContainer):
             positions.shape[0], nvals[-1])
         op.process_particles(particle_octree, pdom_ind, positions,
             fields, self.domain_id, self._domain_offset, self.ds.periodicity,
-            self.ds.geometry)
+            self.ds.geometry, kdtree)
         vals = op.finalize()
         if vals is None: return
         if isinstance(vals, list):
@@ -433,6 +467,54 @@ class ParticleOctreeSubset(OctreeSubset):
         self.base_region = base_region
         self.base_selector = base_region.selector
 
+class ParticleOctreeSubsetPart(ParticleOctreeSubset):
+    """
+    The particles of some of the data files of a ParticleOctreeSubset.
+
+    Parts are used as io chunks when the particles of a subset are too many
+    to be read at once.  Particle fields are read from the data files of the
+    part only.  The octs cannot be divided up along with the particles, so
+    all of the cells of the subset belong to its first part and the other
+    parts select none; spatial chunks of the first part are taken from the
+    whole subset, so that deposited fields see every particle.
+    """
+    def __init__(self, subset, data_files, owns_mesh):
+        super(ParticleOctreeSubsetPart, self).__init__(
+            subset.base_region, data_files, subset.ds,
+            subset.min_ind, subset.max_ind, subset._oref)
+        self.subset = subset
+        self.owns_mesh = owns_mesh
+
+    def select_icoords(self, dobj):
+        if not self.owns_mesh: return np.empty((0, 3), dtype="int64")
+        return super(ParticleOctreeSubsetPart, self).select_icoords(dobj)
+
+    def select_fcoords(self, dobj):
+        if not self.owns_mesh:
+            return self.ds.arr(np.empty((0, 3), dtype="float64"),
+                               "code_length")
+        return super(ParticleOctreeSubsetPart, self).select_fcoords(dobj)
+
+    def select_fwidth(self, dobj):
+        if not self.owns_mesh:
+            return self.ds.arr(np.empty((0, 3), dtype="float64"),
+                               "code_length")
+        return super(ParticleOctreeSubsetPart, self).select_fwidth(dobj)
+
+    def select_ires(self, dobj):
+        if not self.owns_mesh: return np.empty(0, dtype="int64")
+        return super(ParticleOctreeSubsetPart, self).select_ires(dobj)
+
+    def select_tcoords(self, dobj):
+        if not self.owns_mesh:
+            return np.empty(0, "f8"), np.empty(0, "f8")
+        return super(ParticleOctreeSubsetPart, self).select_tcoords(dobj)
+
+    def select(self, selector, source, dest, offset):
+        if not self.owns_mesh: return 0
+        return super(ParticleOctreeSubsetPart, self).select(
+            selector, source, dest, offset)
+
 class OctreeSubsetBlockSlicePosition(object):
     def __init__(self, ind, block_slice):
         self.ind = ind
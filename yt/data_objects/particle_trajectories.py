@@ -12,17 +12,262 @@ from __future__ import print_function
 #-----------------------------------------------------------------------------
 
 from yt.data_objects.field_data import YTFieldData
-from yt.utilities.lib.particle_mesh_operations import CICSample_3
+from yt.data_objects.static_output import ParticleFileSlabs
 from yt.utilities.parallel_tools.parallel_analysis_interface import \
     parallel_root_only
-from yt.funcs import mylog, get_pbar
+from yt.funcs import mylog, get_pbar, ensure_list
 from yt.units.yt_array import array_like_field
 from yt.config import ytcfg
 from collections import OrderedDict
 
 import numpy as np
+import os
 from yt.utilities.on_demand_imports import _h5py as h5py
 
+class ParticleIDIndex(object):
+    r"""A table of where the particles of a dataset are, sorted by ID.
+
+    The particles of a dataset are read in pieces: the grids of a grid
+    dataset, each particle type in each data file of a particle dataset, or
+    else the io chunks of the whole dataset.  For every particle, the table holds its ID, the number of the piece it
+    is read from and its offset among the particles of that piece.  With
+    it, the particles with given IDs can be read from the pieces that hold
+    them; the HDF5 and binary Gadget readers read just the runs of records
+    holding them.
+
+    The table is saved in an HDF5 file next to the dataset, named after
+    the parameter file with a ``.pidx.h5`` suffix, and loaded from there for
+    as long as the parameter file and data files are unchanged.  This can be turned off
+    with the ``save_particle_id_index`` configuration option.
+
+    Parameters
+    ----------
+    ds : ~yt.data_objects.static_output.Dataset
+        The dataset to index.
+    idx_field : tuple of strings
+        The field holding the particle IDs, such as
+        ``("all", "particle_index")``.
+
+    Examples
+    --------
+    >>> id_index = ParticleIDIndex(ds, ("all", "particle_index"))
+    >>> found, chunks, offsets = id_index.locate(indices)
+    >>> pos = read_particle_offsets(ds, [("all", "particle_position_x")],
+    ...                             chunks, offsets)
+    """
+    _version = 3
+
+    def __init__(self, ds, idx_field):
+        self.ds = ds
+        self.idx_field = idx_field
+        self.ids = self.chunks = self.offsets = None
+        self._key = self._get_key()
+        if not self._load():
+            self._build()
+            if ytcfg.getboolean("yt", "save_particle_id_index"):
+                self._save()
+
+    @property
+    def filename(self):
+        return "%s.pidx.h5" % self.ds.parameter_filename
+
+    def _get_key(self):
+        # The table is only valid for the same parameter file and data
+        # files, with the same sizes and modification times.
+        fn = self.ds.parameter_filename
+        if not os.path.isfile(fn):
+            return None
+        pieces = _particle_pieces(self.ds)
+        if pieces is None:
+            # Other indexes are read in io chunks, which have to be counted.
+            npieces = sum(1 for _ in self.ds.all_data().chunks([], "io"))
+            filenames = [fn]
+        else:
+            npieces = len(pieces)
+            filenames = [fn] + [getattr(obj, "filename", None)
+                                for obj, ptype in pieces]
+        key = [self._version, npieces]
+        seen = set()
+        for filename in filenames:
+            if filename in seen or filename is None or \
+               not os.path.isfile(filename):
+                continue
+            seen.add(filename)
+            st = os.stat(filename)
+            key.extend([st.st_mtime, st.st_size])
+        return np.array(key, dtype="float64")
+
+    def _build(self):
+        ptype = self.idx_field[0]
+        unions = self.ds.particle_unions
+        if ptype in unions:
+            ptypes = set(unions[ptype])
+        else:
+            ptypes = set([ptype])
+        ids = []
+        chunks = []
+        offsets = []
+        pieces = _particle_pieces(self.ds)
+        if pieces is None:
+            pieces = ((chunk, None)
+                      for chunk in self.ds.all_data().chunks([], "io"))
+        for i, (obj, obj_ptype) in enumerate(pieces):
+            if obj_ptype is None:
+                cids = obj[self.idx_field]
+                if hasattr(obj, "clear_data"):
+                    obj.clear_data()
+            elif obj_ptype in ptypes and \
+                 obj.total_particles.get(obj_ptype, 0) > 0:
+                cids = _file_source(self.ds, obj)[obj_ptype,
+                                                   self.idx_field[1]]
+            else:
+                continue
+            cids = cids.d.astype("int64")
+            ids.append(cids)
+            chunks.append(np.full(cids.size, i, dtype="int32"))
+            offsets.append(np.arange(cids.size, dtype="int64"))
+        if len(ids) == 0:
+            ids = chunks = offsets = [np.empty(0, dtype="int64")]
+        ids = np.concatenate(ids)
+        order = np.argsort(ids, kind="mergesort")
+        self.ids = ids[order]
+        self.chunks = np.concatenate(chunks)[order]
+        self.offsets = np.concatenate(offsets)[order]
+
+    def _load(self):
+        if self._key is None or not os.path.isfile(self.filename):
+            return False
+        name = "/".join(self.idx_field)
+        try:
+            with h5py.File(self.filename, "r") as f:
+                if name not in f:
+                    return False
+                g = f[name]
+                if "key" not in g or \
+                   not np.array_equal(g["key"][()], self._key):
+                    return False
+                self.ids = g["ids"][()]
+                self.chunks = g["chunks"][()]
+                self.offsets = g["offsets"][()]
+        except (IOError, OSError, ImportError):
+            return False
+        return True
+
+    def _save(self):
+        if self._key is None:
+            return
+        name = "/".join(self.idx_field)
+        try:
+            with h5py.File(self.filename, "a") as f:
+                if name in f:
+                    del f[name]
+                g = f.create_group(name)
+                g.create_dataset("ids", data=self.ids)
+                g.create_dataset("chunks", data=self.chunks)
+                g.create_dataset("offsets", data=self.offsets)
+                # Written last, so that an interrupted write is not used.
+                g.create_dataset("key", data=self._key)
+        except (IOError, OSError, ImportError) as e:
+            mylog.debug("Could not save the particle ID index to %s: %s",
+                        self.filename, e)
+
+    def locate(self, indices):
+        """
+        Find the particles with the sorted IDs *indices*.
+
+        Returns
+        -------
+        The positions in *indices* of the IDs that were found, and the
+        pieces and offsets of these particles.
+        """
+        indices = np.asarray(indices, dtype="int64")
+        if self.ids.size == 0:
+            found = np.zeros(indices.size, dtype="bool")
+            pos = np.zeros(indices.size, dtype="int64")
+        else:
+            pos = np.searchsorted(self.ids, indices)
+            np.clip(pos, 0, self.ids.size - 1, pos)
+            found = self.ids[pos] == indices
+            pos = pos[found]
+        return np.where(found)[0], self.chunks[pos], self.offsets[pos]
+
+def _particle_pieces(ds):
+    # The pieces the particles of ds are read in, as (grid, None) for grid
+    # datasets and (data file, particle type) for particle datasets.  Other
+    # datasets are read in io chunks, which are only valid while they are
+    # iterated over; for these this returns None.
+    data_files = getattr(ds.index, "data_files", None)
+    if data_files is not None:
+        return [(data_file, ptype) for data_file in data_files
+                for ptype in ds.particle_types_raw]
+    grids = getattr(ds.index, "grids", None)
+    if grids is not None:
+        return [(g, None) for g in grids]
+    return None
+
+def _file_source(ds, data_file):
+    # A data object holding just the particles of data_file.
+    dd = ds.all_data()
+    dd.data_files = [data_file]
+    return dd
+
+def _record_slabs(offsets, max_gap):
+    # The (start, stop) runs of records holding the sorted, unique offsets,
+    # joining runs less than max_gap records apart, and the positions of the
+    # offsets in the records of the runs read one after the other.
+    breaks = np.flatnonzero(np.diff(offsets) > max_gap) + 1
+    starts = offsets[np.concatenate([[0], breaks])]
+    stops = offsets[np.concatenate([breaks - 1, [offsets.size - 1]])] + 1
+    sizes = stops - starts
+    first = np.cumsum(sizes) - sizes
+    slab = np.searchsorted(starts, offsets, side="right") - 1
+    slabs = [(int(start), int(stop)) for start, stop in zip(starts, stops)]
+    return slabs, first[slab] + offsets - starts[slab]
+
+def read_particle_offsets(ds, fields, chunks, offsets, max_gap=256):
+    r"""Read *fields* for the particles at *offsets* in the pieces
+    *chunks* of the dataset, as found by :class:`ParticleIDIndex`.
+
+    Only the pieces holding at least one of the particles are read.  For
+    particle datasets each field is read for the particle type of each
+    particle, and where the IO handler can read runs of records only the
+    runs holding the particles are read, joining runs fewer than *max_gap*
+    records apart.  Returns a dict of unitless arrays, in the order of
+    *offsets*.
+    """
+    values = dict((field, np.empty(offsets.size, dtype="float64"))
+                  for field in fields)
+    if offsets.size == 0:
+        return values
+    slabs_supported = ds.index.io._particle_ranges_supported
+    order = np.argsort(chunks, kind="mergesort")
+    wanted, bounds = np.unique(chunks[order], return_index=True)
+    bounds = dict(zip(wanted, zip(bounds, np.append(bounds[1:], order.size))))
+    pieces = _particle_pieces(ds)
+    if pieces is None:
+        pieces = ((chunk, None) for chunk in ds.all_data().chunks([], "io"))
+    for i, (obj, ptype) in enumerate(pieces):
+        if i not in bounds:
+            continue
+        start, end = bounds[i]
+        sel = order[start:end]
+        if ptype is None:
+            for field in fields:
+                values[field][sel] = obj[field].d[offsets[sel]]
+            if hasattr(obj, "clear_data"):
+                obj.clear_data()
+            continue
+        records, inverse = np.unique(offsets[sel], return_inverse=True)
+        if slabs_supported:
+            slabs, take = _record_slabs(records, max_gap)
+            obj = ParticleFileSlabs(obj, {ptype: slabs})
+        else:
+            take = records
+        dd = _file_source(ds, obj)
+        for field in fields:
+            values[field][sel] = dd[ptype, field[1]].d[take][inverse]
+    return values
+
 class ParticleTrajectories(object):
     r"""A collection of particle trajectories in time over a series of
     datasets. 
@@ -63,9 +308,7 @@ class ParticleTrajectories(object):
         indices.sort() # Just in case the caller wasn't careful
         self.field_data = YTFieldData()
         self.data_series = outputs
-        self.masks = []
-        self.sorts = []
-        self.array_indices = []
+        self.locations = {}
         self.indices = indices
         self.num_indices = len(indices)
         self.num_steps = len(outputs)
@@ -89,21 +332,16 @@ class ParticleTrajectories(object):
         my_storage = {}
         pbar = get_pbar("Constructing trajectory information", len(self.data_series))
         for i, (sto, ds) in enumerate(self.data_series.piter(storage=my_storage)):
-            dd = ds.all_data()
-            newtags = dd[idx_field].d.astype("int64")
-            mask = np.in1d(newtags, indices, assume_unique=True)
-            sort = np.argsort(newtags[mask])
-            array_indices = np.where(np.in1d(indices, newtags, assume_unique=True))[0]
-            self.array_indices.append(array_indices)
-            self.masks.append(mask)
-            self.sorts.append(sort)
-
-            pfields = {}
-            for field in ("particle_position_%s" % ax for ax in "xyz"):
-                pfields[field] = dd[fds[field]].ndarray_view()[mask][sort]
+            # Only the particles we track are read, found by their IDs.
+            id_index = ParticleIDIndex(ds, idx_field)
+            array_indices, chunks, offsets = id_index.locate(indices)
+            pfields = read_particle_offsets(
+                ds, [fds[field] for field in fds], chunks, offsets)
+            pfields = dict((field, pfields[fds[field]]) for field in fds)
 
             sto.result_id = ds.parameter_filename
-            sto.result = (ds.current_time, array_indices, pfields)
+            sto.result = (ds.current_time, array_indices, pfields,
+                          (chunks, offsets))
             pbar.update(i)
         pbar.finish()
 
@@ -111,15 +349,16 @@ class ParticleTrajectories(object):
             mylog.setLevel(old_level)
 
         times = []
-        for fn, (time, indices, pfields) in sorted(my_storage.items()):
+        for fn, (time, indices, pfields, loc) in sorted(my_storage.items()):
             times.append(time)
+            self.locations[fn] = (indices,) + loc
         self.times = self.data_series[0].arr([time for time in times], times[0].units)
 
         self.particle_fields = []
         output_field = np.empty((self.num_indices, self.num_steps))
         output_field.fill(np.nan)
         for field in ("particle_position_%s" % ax for ax in "xyz"):
-            for i, (fn, (time, indices, pfields)) in enumerate(sorted(my_storage.items())):
+            for i, (fn, (time, indices, pfields, loc)) in enumerate(sorted(my_storage.items())):
                 output_field[indices, i] = pfields[field]
             self.field_data[field] = array_like_field(
                 dd_first, output_field.copy(), fds[field])
@@ -229,37 +468,32 @@ class ParticleTrajectories(object):
         my_storage = {}
         
         for i, (sto, ds) in enumerate(self.data_series.piter(storage=my_storage)):
-            mask = self.masks[i]
-            sort = self.sorts[i]
+            array_indices, chunks, offsets = \
+                self.locations[ds.parameter_filename]
             pfield = {}
 
             if new_particle_fields:  # there's at least one particle field
-                dd = ds.all_data()
+                # This is easy... just read the particles we track
+                values = read_particle_offsets(
+                    ds, [fds[field] for field in new_particle_fields],
+                    chunks, offsets)
                 for field in new_particle_fields:
-                    # This is easy... just get the particle fields
-                    pfield[field] = dd[fds[field]].d[mask][sort]
+                    pfield[field] = values[fds[field]]
 
             if grid_fields:
-                # This is hard... must loop over grids
-                for field in grid_fields:
-                    pfield[field] = np.zeros(self.num_indices)
-                x = self["particle_position_x"][:,step].d
-                y = self["particle_position_y"][:,step].d
-                z = self["particle_position_z"][:,step].d
-                particle_grids, particle_grid_inds = ds.index._find_points(x,y,z)
-
-                # This will fail for non-grid index objects
-                for grid in particle_grids:
-                    cube = grid.retrieve_ghost_zones(1, grid_fields)
-                    for field in grid_fields:
-                        CICSample_3(x, y, z, pfield[field],
-                                    self.num_indices,
-                                    cube[fds[field]],
-                                    np.array(grid.LeftEdge).astype(np.float64),
-                                    np.array(grid.ActiveDimensions).astype(np.int32),
-                                    grid.dds[0])
+                # Interpolate the mesh fields to the particles.  The index
+                # groups them by the block of cells holding them, so that
+                # each block is read once, whatever the type of index.
+                pos = np.column_stack(
+                    [self["particle_position_%s" % ax][:,step].d
+                     for ax in "xyz"])
+                values = ensure_list(
+                    ds.index._interpolate_field_values_at_points(
+                        [fds[field] for field in grid_fields], pos))
+                for field, value in zip(grid_fields, values):
+                    pfield[field] = value.d[array_indices]
             sto.result_id = ds.parameter_filename
-            sto.result = (self.array_indices[i], pfield)
+            sto.result = (array_indices, pfield)
             pbar.update(step)
             step += 1
         pbar.finish()
@@ -17,8 +17,6 @@ from yt.extern.six import string_types
 from yt.funcs import obj_length
 from yt.units.yt_array import YTQuantity
 from yt.utilities.exceptions import YTDimensionalityError
-from yt.visualization.line_plot import LineBuffer
-
 class RegionExpression(object):
     _all_data = None
     def __init__(self, ds):
@@ -157,6 +155,7 @@ class RegionExpression(object):
         start_point = [self._spec_to_value(v) for v in ray_slice.start]
         end_point = [self._spec_to_value(v) for v in ray_slice.stop]
         if getattr(ray_slice.step, "imag", 0.0) != 0.0:
+            from yt.visualization.line_plot import LineBuffer
             return LineBuffer(self.ds, start_point, end_point, 
                               int(ray_slice.step.imag))
         else:
@@ -189,6 +188,7 @@ class RegionExpression(object):
                     axis = ax
                     new_slice.append(v)
         if npoints > 0:
+            from yt.visualization.line_plot import LineBuffer
             ray = LineBuffer(self.ds, start_point, end_point, npoints)
         else:
             if axis == 1:
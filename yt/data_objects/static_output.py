@@ -241,6 +241,16 @@ class Dataset(object):
     fields = requires_index("fields")
     _instantiated = False
     _particle_type_counts = None
+    # "octree" or "kdtree"; if None, the neighbor_backend ytcfg option is used
+    neighbor_backend = None
+    # Cheap necessary conditions on the path passed to yt.load, checked by
+    # _prefilter before _is_valid is called.  These are inherited, so a
+    # subclass that accepts files its parent does not must override them.
+    _prefilter_directory = False
+    _prefilter_suffixes = None
+    _prefilter_magic = None
+    _prefilter_hdf5_groups = None
+    _prefilter_hdf5_attrs = None
 
     def __new__(cls, filename=None, *args, **kwargs):
         if not isinstance(filename, string_types):
@@ -418,6 +428,38 @@ class Dataset(object):
     def _is_valid(cls, *args, **kwargs):
         return False
 
+    @classmethod
+    def _prefilter(cls, signature):
+        """
+        This is a class method that accepts a
+        :class:`~yt.utilities.file_signature.FileSignature` for the path
+        passed to yt.load and returns False if this class can certainly not
+        load it, without the cost of a full call to _is_valid.  By default
+        it checks the ``_prefilter_*`` class attributes: whether the path is
+        a directory, its suffixes, the bytes the file starts with and the
+        groups and attributes required in the root of an HDF5 file.
+        """
+        if cls._prefilter_directory and not signature.is_dir:
+            return False
+        if cls._prefilter_suffixes is not None and \
+           not signature.endswith(cls._prefilter_suffixes):
+            return False
+        if cls._prefilter_magic is not None and \
+           not signature.startswith(cls._prefilter_magic):
+            return False
+        for required, present in (
+                (cls._prefilter_hdf5_groups, "hdf5_groups"),
+                (cls._prefilter_hdf5_attrs, "hdf5_attrs")):
+            if required is None:
+                continue
+            if not signature.is_hdf5:
+                return False
+            present = getattr(signature, present)
+            # If the file cannot be read here, leave it to _is_valid.
+            if present is not None and not present.issuperset(required):
+                return False
+        return True
+
     @classmethod
     def _guess_candidates(cls, base, directories, files):
         """
@@ -432,7 +474,10 @@ class Dataset(object):
         return [], True
 
     def close(self):
-        pass
+        if self._instantiated_index is not None:
+            io = getattr(self._instantiated_index, "io", None)
+            if io is not None:
+                io.close()
 
     def __getitem__(self, key):
         """ Returns units, parameters, or conversion_factors in that order. """
@@ -835,14 +880,15 @@ class Dataset(object):
         """
         Returns the values [field1, field2,...] of the fields at the given
         [(x1, y1, z2), (x2, y2, z2),...] points.  Returns a list of field
-        values in the same order as the input *fields*.
+        values in the same order as the input *fields*.  Each grid or
+        block of cells holding any of the points is read only once.  Points
+        outside of the domain are given NaN.
 
         """
         # If an optimized version exists on the Index object we'll use that
-        try:
-            return self.index._find_field_values_at_points(fields, coords)
-        except AttributeError:
-            pass
+        sampler = getattr(self.index, "_find_field_values_at_points", None)
+        if sampler is not None:
+            return sampler(fields, coords)
 
         fields = ensure_list(fields)
         out = []
@@ -1450,6 +1496,7 @@ class ParticleFile(object):
         self.io = weakref.proxy(io)
         self.filename = filename
         self.file_id = file_id
+        self.cell_ranges = {}
         self.total_particles = self.io._count_particles(self)
 
     def select(self, selector):
@@ -1464,6 +1511,87 @@ class ParticleFile(object):
     def __lt__(self, other):
         return self.filename < other.filename
 
+    def _particle_range(self, ptype):
+        # The indices of the first and one past the last particle of ptype
+        # in the file that belong to this object.
+        return 0, self.total_particles[ptype]
+
+    def _particle_slabs(self, ptype):
+        # The increasing (start, stop) ranges of the indices of the
+        # particles of ptype in the file that belong to this object.
+        return [self._particle_range(ptype)]
+
+
+class ParticleFileRange(object):
+    """
+    Part *i* of *n* equal parts of the particles in a ParticleFile.
+
+    For every particle type, the range holds a contiguous run of the
+    particles of that type in the file.  Everything else is that of the
+    file itself.  Only IO handlers that read particles with
+    ``_particle_range`` support these.
+    """
+    def __init__(self, data_file, i, n):
+        self.data_file = data_file
+        self.part = (i, n)
+        self.ranges = {}
+        self.total_particles = {}
+        for ptype, count in data_file.total_particles.items():
+            start, stop = count * i // n, count * (i + 1) // n
+            self.ranges[ptype] = (start, stop)
+            self.total_particles[ptype] = stop - start
+
+    def __getattr__(self, attr):
+        if attr == "data_file":
+            raise AttributeError(attr)
+        return getattr(self.data_file, attr)
+
+    def __lt__(self, other):
+        return (self.filename, self.part) < \
+            (other.filename, getattr(other, "part", (0, 1)))
+
+    def _particle_range(self, ptype):
+        return self.ranges[ptype]
+
+    def _particle_slabs(self, ptype):
+        return [self.ranges[ptype]]
+
+
+class ParticleFileSlabs(object):
+    """
+    Some runs of the particles in a ParticleFile.
+
+    *slabs* maps particle types to increasing, disjoint (start, stop)
+    ranges of particle indices in the file; particle types it leaves out
+    have no particles.  Everything else is that of the file itself.  Only
+    IO handlers that read particles with ``_particle_slabs`` support these.
+    """
+    def __init__(self, data_file, slabs):
+        self.data_file = data_file
+        self.slabs = {}
+        self.total_particles = {}
+        for ptype in data_file.total_particles:
+            self.slabs[ptype] = list(slabs.get(ptype, []))
+            self.total_particles[ptype] = sum(
+                stop - start for start, stop in self.slabs[ptype])
+
+    def __getattr__(self, attr):
+        if attr == "data_file":
+            raise AttributeError(attr)
+        return getattr(self.data_file, attr)
+
+    def __lt__(self, other):
+        return self.filename < other.filename
+
+    def _particle_range(self, ptype):
+        slabs = self.slabs[ptype]
+        if len(slabs) == 0:
+            return 0, 0
+        return slabs[0][0], slabs[-1][1]
+
+    def _particle_slabs(self, ptype):
+        return self.slabs[ptype]
+
 
 class ParticleDataset(Dataset):
     _unit_base = None
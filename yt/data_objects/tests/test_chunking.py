@@ -1,6 +1,16 @@
+import numpy as np
+import threading
+import time
+
 from yt.testing import \
     fake_random_ds, \
     assert_equal
+from yt.data_objects.grid_patch import \
+    AMRGridSlab, \
+    particle_grids, \
+    split_grid
+from yt.data_objects.static_output import \
+    ParticleFileRange
 from yt.units.yt_array import \
     uconcatenate
 
@@ -38,3 +48,160 @@ def test_chunking():
             assert_equal(coords['f']['io'], coords['f']['spatial'])
             assert_equal(coords['i']['io'], coords['i']['all'])
             assert_equal(coords['i']['io'], coords['i']['spatial'])
+
+def test_prefetch_chunking():
+    fields = ["density", "velocity_magnitude", "cell_mass"]
+    for nprocs in [1, 8]:
+        ds = fake_random_ds(32, nprocs = nprocs)
+        c = (ds.domain_right_edge + ds.domain_left_edge)/2.0
+        for dobj in _get_dobjs(c):
+            obj = getattr(ds, dobj[0])(*dobj[1])
+            values = {}
+            for prefetch in [0, 1, 3]:
+                ds.index.prefetch = prefetch
+                values[prefetch] = dict((f, []) for f in fields)
+                for chunk in obj.chunks(fields, "io"):
+                    for f in fields:
+                        values[prefetch][f].append(chunk[f])
+            ds.index.prefetch = 0
+            for prefetch in [1, 3]:
+                for f in fields:
+                    assert_equal(uconcatenate(values[0][f]),
+                                 uconcatenate(values[prefetch][f]))
+
+def test_prefetch_serialized_reads():
+    # The io handler reads of the prefetch threads and the main thread must
+    # never overlap unless the handler declares them thread-safe.
+    ds = fake_random_ds(32, nprocs = 8)
+    io = ds.index.io
+    read_fluid_selection = io._read_fluid_selection
+    state = {"active": 0, "most": 0, "calls": 0}
+    lock = threading.Lock()
+    def _read_fluid_selection(*args):
+        with lock:
+            state["active"] += 1
+            state["calls"] += 1
+            state["most"] = max(state["most"], state["active"])
+        time.sleep(0.01)
+        try:
+            return read_fluid_selection(*args)
+        finally:
+            with lock:
+                state["active"] -= 1
+    io._read_fluid_selection = _read_fluid_selection
+    ds.index.prefetch = 3
+    try:
+        dd = ds.all_data()
+        for chunk in dd.chunks(["density", "velocity_x"], "io"):
+            chunk["density"]
+            chunk["velocity_x"]
+    finally:
+        ds.index.prefetch = 0
+        del io._read_fluid_selection
+    assert state["calls"] >= 8
+    assert_equal(state["most"], 1)
+
+def test_max_chunk_bytes():
+    fields = ["density", "velocity_magnitude", "cell_mass", "x",
+              "velocity_divergence"]
+    for nprocs in [1, 8]:
+        ds = fake_random_ds(32, nprocs = nprocs)
+        c = (ds.domain_right_edge + ds.domain_left_edge)/2.0
+        for dobj in _get_dobjs(c):
+            obj = getattr(ds, dobj[0])(*dobj[1])
+            values = {}
+            nchunks = {}
+            for max_bytes in [0, 8 * 2048]:
+                ds.index.max_chunk_bytes = max_bytes
+                values[max_bytes] = dict((f, []) for f in fields)
+                nchunks[max_bytes] = 0
+                for chunk in obj.chunks([], "io"):
+                    nchunks[max_bytes] += 1
+                    if max_bytes > 0 and len(chunk._current_chunk.objs) > 1:
+                        assert chunk.ires.size <= 2048
+                    for f in fields:
+                        values[max_bytes][f].append(chunk[f])
+            ds.index.max_chunk_bytes = 0
+            for f in fields:
+                assert_equal(uconcatenate(values[0][f]),
+                             uconcatenate(values[8 * 2048][f]))
+            if obj.ires.size > 32 * 32 * 32 // nprocs:
+                assert nchunks[8 * 2048] > nchunks[0]
+        ad = ds.all_data()
+        total = ad.quantities.total_quantity("cell_mass")
+        ds.index.max_chunk_bytes = 8 * 1024
+        assert_equal(ds.all_data().quantities.total_quantity("cell_mass"),
+                     total)
+        ds.index.max_chunk_bytes = 0
+
+class FakeDataFile(object):
+    filename = "fake"
+    def __init__(self, total_particles):
+        self.total_particles = total_particles
+
+def test_particle_file_ranges():
+    data_file = FakeDataFile({"PartType0": 10, "PartType1": 3})
+    ranges = [ParticleFileRange(data_file, i, 4) for i in range(4)]
+    for ptype, count in data_file.total_particles.items():
+        assert_equal(sum(r.total_particles[ptype] for r in ranges), count)
+        assert_equal(ranges[0]._particle_range(ptype)[0], 0)
+        assert_equal(ranges[-1]._particle_range(ptype)[1], count)
+        for r1, r2 in zip(ranges[:-1], ranges[1:]):
+            assert_equal(r1._particle_range(ptype)[1],
+                         r2._particle_range(ptype)[0])
+    assert_equal(ranges[2].filename, "fake")
+    assert_equal(sorted(ranges[::-1]), ranges)
+
+def test_grid_slab_select():
+    # Slabs select the same values from their own planes, as read by IO
+    # handlers that read hyperslabs, as from the whole grid.
+    ds = fake_random_ds(16)
+    grid = ds.index.grids[0]
+    sp = ds.sphere(ds.domain_center, 0.3)
+    source = np.random.random(grid.ActiveDimensions)
+    slabs = split_grid(grid, sp.selector, 256)
+    assert len(slabs) > 1
+    for slab in slabs:
+        count = slab.count(sp.selector)
+        full = np.empty(count)
+        part = np.empty(count)
+        assert_equal(slab.select(sp.selector, source, full, 0), count)
+        part_source = source[slab.start:slab.stop]
+        assert_equal(part_source.shape, slab.slab_shape)
+        assert_equal(slab.select(sp.selector, part_source, part, 0), count)
+        assert_equal(full, part)
+
+def test_max_chunk_bytes_particles():
+    fields = [("io", "particle_mass"), ("io", "particle_position_x")]
+    for nprocs in [1, 8]:
+        ds = fake_random_ds(32, nprocs = nprocs, particles = 4096)
+        c = (ds.domain_right_edge + ds.domain_left_edge)/2.0
+        for dobj in [ds.all_data(), ds.sphere(c, (0.25, "unitary"))]:
+            values = {}
+            for max_bytes in [0, 8 * 1024]:
+                ds.index.max_chunk_bytes = max_bytes
+                dobj.field_data.clear()
+                values[max_bytes] = [dobj[f] for f in fields]
+            ds.index.max_chunk_bytes = 0
+            for v1, v2 in zip(values[0], values[8 * 1024]):
+                assert_equal(v1.size, v2.size)
+                assert_equal(v1, v2)
+
+class FakeGrid(object):
+    id = 1
+    NumberOfParticles = 10
+    NumberOfActiveParticles = {"io": 10, "DarkMatter": 5}
+    _pdata = {"io": {"NumberOfParticles": 10, "offset": 3}}
+
+def test_grid_slab_particles():
+    grid = FakeGrid()
+    first = AMRGridSlab(grid, 0, 4)
+    second = AMRGridSlab(grid, 4, 8)
+    assert_equal(first.NumberOfParticles, 10)
+    assert_equal(first.NumberOfActiveParticles, grid.NumberOfActiveParticles)
+    assert_equal(first._pdata, grid._pdata)
+    assert_equal(second.NumberOfParticles, 0)
+    assert_equal(second.NumberOfActiveParticles, {"io": 0, "DarkMatter": 0})
+    assert_equal(second._pdata,
+                 {"io": {"NumberOfParticles": 0, "offset": 3}})
+    assert_equal(particle_grids([grid, first, second]), [grid, first])
@@ -0,0 +1,63 @@
+from yt.testing import \
+    fake_random_ds, \
+    assert_equal, \
+    assert_array_almost_equal
+from yt.data_objects.data_containers import \
+    order_field_generation
+
+def test_order_field_generation():
+    graph = {"a": set(["b", "c"]),
+             "b": set(["c", "disk"]),
+             "c": set(),
+             "d": set(["a"])}
+    assert_equal(order_field_generation(["a", "b", "c", "d"], graph),
+                 ["c", "b", "a", "d"])
+    assert_equal(order_field_generation(["d", "c"], graph), ["d", "c"])
+    # Cycles keep their original order at the end.
+    graph = {"a": set(["b"]), "b": set(["a"]), "c": set()}
+    assert_equal(order_field_generation(["a", "b", "c"], graph),
+                 ["c", "a", "b"])
+
+def test_field_detector_dependencies():
+    ds = fake_random_ds(16)
+    fd = ds.field_dependencies["gas", "cell_mass"]
+    assert ("gas", "density") in fd.dependencies
+    assert ("index", "cell_volume") in fd.dependencies
+    # Only leaf fields are in requested, but intermediates are direct
+    # dependencies.
+    fd = ds.field_dependencies["gas", "velocity_magnitude"]
+    assert ("gas", "velocity_x") in fd.dependencies
+
+def test_generation_plan():
+    ds = fake_random_ds(16, nprocs = 4)
+    calls = []
+    def _mass(field, data):
+        calls.append(field.name)
+        return data["gas", "cell_mass"]
+    def _double_mass(field, data):
+        return 2 * data["gas", "shared_mass"]
+    def _triple_mass(field, data):
+        return data["gas", "shared_mass"] + data["gas", "double_mass"]
+    ds.add_field(("gas", "shared_mass"), function = _mass,
+                 sampling_type = "cell", units = "g")
+    ds.add_field(("gas", "double_mass"), function = _double_mass,
+                 sampling_type = "cell", units = "g")
+    ds.add_field(("gas", "triple_mass"), function = _triple_mass,
+                 sampling_type = "cell", units = "g")
+    ds.index
+    del calls[:]
+    dd = ds.all_data()
+    fields = [("gas", "triple_mass"), ("gas", "double_mass")]
+    nchunks = 0
+    for chunk in dd.chunks(fields, "io"):
+        nchunks += 1
+        # Intermediates are freed once their consumers are done.
+        assert ("gas", "shared_mass") not in chunk.field_data
+        assert ("gas", "cell_mass") not in chunk.field_data
+        assert_array_almost_equal(chunk["gas", "triple_mass"],
+                                  3 * chunk["gas", "cell_mass"])
+    assert_equal(len(calls), nchunks)
+    timings = dd.field_timings
+    for field in fields + [("gas", "shared_mass")]:
+        assert_equal(timings[field][0], nchunks)
+        assert timings[field][1] >= 0.0
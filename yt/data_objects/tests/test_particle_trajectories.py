@@ -1,8 +1,23 @@
 import glob
+import numpy as np
 import os
+import shutil
+import tempfile
 
 from yt.config import ytcfg
+from yt.convenience import load
+from yt.data_objects.particle_trajectories import \
+    ParticleIDIndex, \
+    read_particle_offsets, \
+    _record_slabs
 from yt.data_objects.time_series import DatasetSeries
+from yt.frontends.stream.api import load_particles
+from yt.testing import \
+    assert_almost_equal, \
+    assert_array_equal, \
+    assert_equal, \
+    requires_file, \
+    requires_module
 from yt.utilities.answer_testing.framework import \
     requires_ds, \
     GenericArrayTest
@@ -43,3 +58,171 @@ def test_etc_traj():
         def field_func(name):
             return traj[field]
         yield GenericArrayTest(ds, field_func, args=[field])
+
+def fake_particle_outputs(nsteps=3, npart=1000):
+    # The particles are shuffled in every output and particle 7 is missing
+    # from the second one.
+    prng = np.random.RandomState(0x4d3d3d3)
+    outputs = []
+    for step in range(nsteps):
+        ids = prng.permutation(npart)
+        if step == 1:
+            ids = ids[ids != 7]
+        data = {"particle_index": ids.astype("float64"),
+                "particle_position_x": ((ids + 0.5) / npart, "cm"),
+                "particle_position_y": (np.full(ids.size, 0.5), "cm"),
+                "particle_position_z": (np.full(ids.size, 0.5), "cm"),
+                "particle_mass": (step + 1e-3 * ids, "g")}
+        outputs.append(load_particles(data, 1.0, sim_time=float(step)))
+    return outputs
+
+def test_traj_by_id():
+    ts = DatasetSeries(fake_particle_outputs())
+    indices = np.array([3, 7, 500, 999])
+    traj = ts.particle_trajectories(indices, fields=["particle_mass"],
+                                    suppress_logging=True)
+    for i, t in enumerate(traj.times.d):
+        x = traj["particle_position_x"][:, i].d
+        m = traj["particle_mass"][:, i].d
+        found = (indices != 7) | (t != 1)
+        assert_almost_equal(x[found], (indices[found] + 0.5) / 1000)
+        assert_almost_equal(m[found], t + 1e-3 * indices[found])
+        assert np.isnan(x[~found]).all()
+
+def check_traj_mesh_fields(outputs, indices, field):
+    ts = DatasetSeries(outputs)
+    traj = ts.particle_trajectories(indices, suppress_logging=True)
+    traj.add_fields([field])
+    for i, ds in enumerate(outputs):
+        found = np.isfinite(traj["particle_position_x"][:, i].d)
+        assert found.any()
+        pos = np.column_stack([traj["particle_position_%s" % ax][found, i].d
+                               for ax in "xyz"])
+        expected = ds.index._interpolate_field_values_at_points(field, pos)
+        values = traj[field][found, i]
+        assert np.isfinite(values.d).all()
+        assert_almost_equal(values.d, expected.d)
+        assert np.isnan(traj[field][~found, i].d).all()
+
+def test_traj_mesh_fields_particle_index():
+    outputs = fake_particle_outputs()
+    for ds in outputs:
+        # ART and unstructured indexes give get_smallest_dx without units.
+        ds.index.get_smallest_dx = lambda: 0.1
+    check_traj_mesh_fields(outputs, np.array([3, 7, 500, 999]),
+                           ("deposit", "io_density"))
+
+snap_33 = "snapshot_033/snap_033.0.hdf5"
+
+@requires_file(snap_33)
+def test_traj_mesh_fields_gadget():
+    ds = load(snap_33)
+    ad = ds.all_data()
+    indices = ad["all", "particle_index"][::10000][:5].d.astype("int64")
+    check_traj_mesh_fields([ds], indices, ("deposit", "all_density"))
+
+@requires_module("h5py")
+def test_particle_id_index_file():
+    tmpdir = tempfile.mkdtemp()
+    ds = fake_particle_outputs(1)[0]
+    fields = [("io", "particle_index"), ("io", "particle_mass")] + \
+        [("io", "particle_position_%s" % ax) for ax in "xyz"]
+    fn = ds.all_data().save_as_dataset(os.path.join(tmpdir, "data.h5"),
+                                       fields=fields)
+    ds = load(fn)
+    id_index1 = ParticleIDIndex(ds, ("io", "particle_index"))
+    assert os.path.exists(fn + ".pidx.h5")
+    def _build(self):
+        raise RuntimeError("The index should have been loaded.")
+    build = ParticleIDIndex._build
+    ParticleIDIndex._build = _build
+    try:
+        id_index2 = ParticleIDIndex(ds, ("io", "particle_index"))
+    finally:
+        ParticleIDIndex._build = build
+    for attr in ["ids", "chunks", "offsets"]:
+        assert_array_equal(getattr(id_index1, attr), getattr(id_index2, attr))
+    found, chunks, offsets = id_index2.locate([5, 17, 1000])
+    assert_array_equal(found, [0, 1])
+    values = read_particle_offsets(ds, [("io", "particle_position_x")],
+                                   chunks, offsets)
+    assert_almost_equal(values["io", "particle_position_x"],
+                        [0.0055, 0.0175])
+    shutil.rmtree(tmpdir)
+
+@requires_file(snap_33)
+def test_particle_id_index_key():
+    # The saved table is rebuilt when any data file changes, not just the
+    # parameter file.
+    ds = load(snap_33)
+    id_index = ParticleIDIndex.__new__(ParticleIDIndex)
+    id_index.ds = ds
+    key = id_index._get_key()
+    fn = ds.index.data_files[-1].filename
+    assert fn != ds.parameter_filename
+    st = os.stat(fn)
+    os.utime(fn, (st.st_atime, st.st_mtime + 10))
+    try:
+        assert not np.array_equal(id_index._get_key(), key)
+    finally:
+        os.utime(fn, (st.st_atime, st.st_mtime))
+    assert_array_equal(id_index._get_key(), key)
+
+def test_record_slabs():
+    offsets = np.array([2, 3, 4, 10, 11, 500, 1000])
+    slabs, take = _record_slabs(offsets, 8)
+    assert_equal(slabs, [(2, 12), (500, 501), (1000, 1001)])
+    records = np.concatenate([np.arange(*slab) for slab in slabs])
+    assert_array_equal(records[take], offsets)
+
+def check_read_particle_offsets(ds):
+    old = ytcfg.get("yt", "save_particle_id_index")
+    ytcfg["yt", "save_particle_id_index"] = "False"
+    try:
+        id_index = ParticleIDIndex(ds, ("all", "particle_index"))
+    finally:
+        ytcfg["yt", "save_particle_id_index"] = old
+    prng = np.random.RandomState(0x4d3d3d3)
+    indices = np.sort(prng.choice(id_index.ids, 100, replace=False))
+    found, chunks, offsets = id_index.locate(indices)
+    assert_equal(found.size, indices.size)
+    fields = [("all", "particle_position_x"), ("all", "particle_mass")]
+    # Count the records the IO handler reads.
+    io = ds.index.io
+    nread = [0]
+    read_slabs = io._read_slabs
+    def _read_slabs(dset, slabs, col=None):
+        nread[0] += sum(stop - start for start, stop in slabs)
+        return read_slabs(dset, slabs, col)
+    io._read_slabs = _read_slabs
+    read_field_slabs = getattr(io, "_read_field_slabs", None)
+    def _read_field_slabs(f, data_file, offset, slabs, name):
+        nread[0] += sum(stop - start for start, stop in slabs)
+        return read_field_slabs(f, data_file, offset, slabs, name)
+    if read_field_slabs is not None:
+        io._read_field_slabs = _read_field_slabs
+    try:
+        values = read_particle_offsets(ds, fields, chunks, offsets)
+    finally:
+        del io._read_slabs
+        if read_field_slabs is not None:
+            del io._read_field_slabs
+    ad = ds.all_data()
+    order = np.argsort(ad["all", "particle_index"].d)
+    where = order[np.searchsorted(ad["all", "particle_index"].d[order],
+                                  indices)]
+    for field in fields:
+        assert_array_equal(values[field], ad[field].d[where])
+    # A whole-dataset read touches every record once per field.
+    assert 0 < nread[0] < id_index.ids.size
+
+@requires_file(snap_33)
+def test_read_particle_offsets_gadget_hdf5():
+    check_read_particle_offsets(load(snap_33))
+
+isothermal_bin = "IsothermalCollapse/snap_505"
+
+@requires_file(isothermal_bin)
+def test_read_particle_offsets_gadget_binary():
+    bbox = [[-3, 3], [-3, 3], [-3, 3]]
+    check_read_particle_offsets(load(isothermal_bin, bounding_box=bbox))
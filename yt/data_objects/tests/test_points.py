@@ -1,8 +1,10 @@
 import numpy as np
 import yt
 
+from yt.frontends.stream.api import load_particles
 from yt.testing import \
     fake_random_ds, \
+    assert_almost_equal, \
     assert_equal, \
     requires_file
 
@@ -75,3 +77,77 @@ def test_fast_find_field_values_at_points():
     assert_equal(len(ppos_den_vel), 2)
     assert_equal(ppos_den_vel[0], ppos_den)
     assert_equal(ppos_den_vel[1], ppos_vel)
+
+def test_bulk_find_field_values_at_points():
+    from yt.geometry.geometry_handler import Index
+    ds = fake_random_ds(16, nprocs=8)
+    np.random.seed(0x4d3d3d3)
+    ppos = ds.arr(np.random.random((50, 3)), 'code_length')
+    fields = ['density', 'velocity_x']
+    expected = [ds.arr([ds.point(p)[field][0] for p in ppos])
+                for field in fields]
+    grid_vals = ds.find_field_values_at_points(fields, ppos)
+    # The generic chunk-based sampler used by octree and particle indexes
+    index_vals = Index._find_field_values_at_points(ds.index, fields, ppos)
+    for i in range(len(fields)):
+        assert_equal(grid_vals[i], expected[i])
+        assert_equal(index_vals[i], expected[i])
+    # Points outside of the domain have no value.
+    outside = ds.arr([[0.5, 0.5, 1.5]], 'code_length')
+    assert np.isnan(ds.find_field_values_at_points('density', outside)[0])
+
+def test_interpolate_field_values_at_points():
+    from yt.geometry.geometry_handler import Index
+    ds = fake_random_ds(16, nprocs=8)
+    np.random.seed(0x4d3d3d3)
+    ppos = ds.arr(0.1 + 0.8 * np.random.random((50, 3)), 'code_length')
+    # Cloud-in-cell interpolation is exact for fields linear in position.
+    fields = [("index", "x"), ("index", "z")]
+    grid_vals = ds.index._interpolate_field_values_at_points(fields, ppos)
+    # The generic sampler used by octree and particle indexes
+    index_vals = Index._interpolate_field_values_at_points(
+        ds.index, fields, ppos)
+    for i, ax in enumerate([0, 2]):
+        assert_almost_equal(grid_vals[i].to("code_length").d, ppos[:, ax].d)
+        assert_almost_equal(index_vals[i].to("code_length").d, ppos[:, ax].d)
+    # Points without a position have no value.
+    missing = ds.arr([[np.nan, np.nan, np.nan]], 'code_length')
+    assert np.isnan(
+        ds.index._interpolate_field_values_at_points("density", missing)[0])
+
+def test_octree_find_field_values_at_points():
+    octree_mask = np.array([8, 0, 0, 0, 0, 8, 0, 0,
+                            0, 0, 0, 0, 0, 0, 0, 0,
+                            8, 0, 0, 0, 0, 0, 0, 0,
+                            0], dtype=np.uint8)
+    quantities = {("gas", "density"): np.arange(22, dtype="float64")[:,None]}
+    bbox = np.array([[-10., 10.], [-10., 10.], [-10., 10.]])
+    ds = yt.load_octree(octree_mask=octree_mask, data=quantities, bbox=bbox,
+                        over_refine_factor=0, partial_coverage=0)
+    np.random.seed(0x4d3d3d3)
+    ppos = ds.arr(-9.5 + 19.0 * np.random.random((30, 3)), 'code_length')
+    expected = ds.arr([ds.point(p)["density"][0] for p in ppos])
+    assert_equal(ds.find_field_values_at_points("density", ppos), expected)
+    # Some indexes (ART, unstructured meshes) give get_smallest_dx without
+    # units; sampling must not depend on it.
+    ds.index.get_smallest_dx = lambda: 0.1
+    assert_equal(ds.find_field_values_at_points("density", ppos), expected)
+
+def test_particle_index_find_field_values_at_points():
+    # A tight clump of particles makes the octree deep enough that the
+    # cells of its finest level cannot all be counted in an int64.
+    prng = np.random.RandomState(0x4d3d3d3)
+    pos = np.concatenate([prng.random_sample((64, 3)),
+                          0.3 + 1e-8 * prng.random_sample((8, 3))])
+    data = {"particle_mass": (np.ones(pos.shape[0]), "g")}
+    for i, ax in enumerate("xyz"):
+        data["particle_position_%s" % ax] = (pos[:, i], "cm")
+    ds = load_particles(data, 1.0, n_ref=1, over_refine_factor=2)
+    ldims = ds.domain_dimensions[0] * 2.0**ds.index.max_level
+    assert ldims**3 > np.iinfo("int64").max
+    field = ("deposit", "io_density")
+    ppos = ds.arr(np.concatenate([pos[-4:], prng.random_sample((8, 3))]),
+                  'code_length')
+    expected = ds.arr([ds.point(p)[field][0] for p in ppos])
+    assert_equal(ds.find_field_values_at_points(field, ppos), expected)
+    assert (expected[:4] > 0).all()
@@ -120,3 +120,23 @@ def test_max_level():
 
     proj = ds.proj('Density', 2, method='mip')
     assert proj['grid_level'].max() == ds.index.max_level
+
+def test_threaded_projection():
+    from yt.config import ytcfg
+    ds = fake_amr_ds(fields=("Density",))
+    old = ytcfg.get("yt", "projection_nthreads")
+    for method, weight in [("integrate", None), ("integrate", "Density"),
+                           ("mip", None)]:
+        try:
+            ytcfg["yt", "projection_nthreads"] = "1"
+            proj1 = ds.proj("Density", 2, weight_field=weight, method=method)
+            ytcfg["yt", "projection_nthreads"] = "4"
+            proj4 = ds.proj("Density", 2, weight_field=weight, method=method)
+        finally:
+            ytcfg["yt", "projection_nthreads"] = old
+        order1 = np.lexsort((proj1["py"], proj1["px"]))
+        order4 = np.lexsort((proj4["py"], proj4["px"]))
+        for field in ["px", "py", "pdx", "pdy"]:
+            assert_equal(proj1[field][order1], proj4[field][order4])
+        assert_rel_equal(proj1["Density"][order1],
+                         proj4["Density"][order4], 12)
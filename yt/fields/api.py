@@ -34,6 +34,7 @@ from .local_fields import add_field, derived_field
 
 from .derived_field import \
     DerivedField, \
+    bare_field_evaluation, \
     ValidateParameter, \
     ValidateDataField, \
     ValidateProperty, \
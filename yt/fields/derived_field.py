@@ -13,6 +13,7 @@ Derived field base class.
 
 import contextlib
 import inspect
+import numpy as np
 import re
 import warnings
 
@@ -30,9 +31,15 @@ from .field_detector import \
     FieldDetector
 from yt.units.unit_object import \
     Unit
+from yt.units.yt_array import \
+    YTArray, \
+    uncounted_value_conversions, \
+    value_conversion_count
 import yt.units.dimensions as ytdims
 from yt.utilities.exceptions import \
-    YTFieldNotFound
+    YTFieldNotFound, \
+    YTUfuncUnitError, \
+    YTUnitOperationError
 
 
 def TranslationFunc(field_name):
@@ -45,6 +52,60 @@ def TranslationFunc(field_name):
 def NullFunc(field, data):
     raise YTFieldNotFound(field.name)
 
+_bare_evaluation = [False]
+
+@contextlib.contextmanager
+def bare_field_evaluation():
+    """
+    Within this context, derived field functions are handed bare ndarrays
+    instead of YTArrays, so that they do not pay for unit bookkeeping on
+    every operation.  The units of each field are instead propagated once,
+    the first time the field is evaluated, and attached to the result.
+
+    Fields whose values depend on more than the units of their inputs, for
+    instance because they combine arrays in different units, use constants
+    with units, or convert units explicitly, are detected and evaluated as
+    usual.
+
+    Examples
+    --------
+
+    >>> from yt.fields.api import bare_field_evaluation
+    >>> with bare_field_evaluation():
+    ...     p = yt.ProfilePlot(ds.all_data(), "density", "kinetic_energy")
+    """
+    old = _bare_evaluation[0]
+    _bare_evaluation[0] = True
+    try:
+        yield
+    finally:
+        _bare_evaluation[0] = old
+
+class UnitFieldData(object):
+    """
+    A view of a data object that does not count the unit conversions made
+    while getting its fields, so that only those made by the function using
+    them are.
+    """
+    def __init__(self, data):
+        self.data = data
+
+    def __getitem__(self, key):
+        with uncounted_value_conversions():
+            return self.data[key]
+
+    def __getattr__(self, attr):
+        if attr == "data":
+            raise AttributeError(attr)
+        return getattr(self.data, attr)
+
+class BareFieldData(UnitFieldData):
+    """
+    A view of a data object whose fields are bare ndarrays.
+    """
+    def __getitem__(self, key):
+        return np.asarray(self.data[key])
+
 class DerivedField(object):
     """
     This is the base class used to describe a cell-by-cell derived field.
@@ -247,12 +308,50 @@ class DerivedField(object):
                 "Something has gone terribly wrong, _function is NullFunc " +
                 "for %s" % (self.name,))
         with self.unit_registry(data):
-            dd = self._function(self, data)
+            if _bare_evaluation[0] and not isinstance(data, FieldDetector):
+                dd = self._call_bare(data)
+            else:
+                dd = self._function(self, data)
         for field_name in data.keys():
             if field_name not in original_fields:
                 del data[field_name]
         return dd
 
+    # None until the field has been evaluated inside bare_field_evaluation,
+    # then either a tuple with the units of its values, or False if its
+    # function can not be evaluated on bare arrays.
+    _bare_units = None
+
+    def _call_bare(self, data):
+        if self._bare_units is False:
+            return self._function(self, data)
+        if self._bare_units is None:
+            # Propagate the units with the usual bookkeeping, and keep them if
+            # nothing depended on anything but the units of the inputs.
+            count = value_conversion_count()
+            dd = self._function(self, UnitFieldData(data))
+            if value_conversion_count() == count:
+                self._bare_units = (getattr(dd, "units", None),)
+            else:
+                self._bare_units = False
+            return dd
+        try:
+            dd = self._function(self, BareFieldData(data))
+        except (AttributeError, TypeError, YTUfuncUnitError,
+                YTUnitOperationError):
+            # What bare arrays raise in functions that use their units, or
+            # that mix them with quantities that have units.
+            dd = None
+        if type(dd) is not np.ndarray:
+            # Units got in through something other than the fields, or the
+            # function needs them, so evaluate it as usual from now on.
+            self._bare_units = False
+            return self._function(self, data)
+        units = self._bare_units[0]
+        if units is None:
+            return dd
+        return YTArray(dd, units, bypass_validation=True)
+
     def get_source(self):
         """
         Return a string containing the source of the function (if possible.)
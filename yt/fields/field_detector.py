@@ -69,6 +69,11 @@ class FieldDetector(defaultdict):
         self.index = fake_index()
         self.requested = []
         self.requested_parameters = []
+        # The fields accessed directly by the field being detected, in the
+        # order they are accessed.  Unlike ``requested``, this includes
+        # derived fields, so it can be used to order field generation.
+        self.dependencies = []
+        self._depth = 0
         if not self.flat:
             defaultdict.__init__(self,
                 lambda: np.ones((nd, nd, nd), dtype='float64')
@@ -83,6 +88,11 @@ class FieldDetector(defaultdict):
         if len(arr.shape) == 3: return arr
         return arr.reshape(self.ActiveDimensions, order="C")
 
+    def __getitem__(self, item):
+        if self._depth == 1 and item not in self.dependencies:
+            self.dependencies.append(item)
+        return defaultdict.__getitem__(self, item)
+
     def __missing__(self, item):
         if not isinstance(item, tuple):
             field = ("unknown", item)
@@ -99,6 +109,7 @@ class FieldDetector(defaultdict):
         # dependencies during checking.  Bug #627 talks about this.
         item = self.ds._last_freq
         if finfo is not None and finfo._function.__name__ != 'NullFunc':
+            self._depth += 1
             try:
                 for param, param_v in permute_params.items():
                     for v in param_v:
@@ -112,6 +123,7 @@ class FieldDetector(defaultdict):
                     self.nd + ngz * 2, ds = self.ds,
                     field_parameters=self.field_parameters.copy())
                 nfd._num_ghost_zones = ngz
+                nfd._depth = self._depth
                 vv = finfo(nfd)
                 if ngz > 0: vv = vv[ngz:-ngz, ngz:-ngz, ngz:-ngz]
                 for i in nfd.requested:
@@ -119,6 +131,10 @@ class FieldDetector(defaultdict):
                 for i in nfd.requested_parameters:
                     if i not in self.requested_parameters:
                         self.requested_parameters.append(i)
+                for i in nfd.dependencies:
+                    if i not in self.dependencies: self.dependencies.append(i)
+            finally:
+                self._depth -= 1
             if vv is not None:
                 if not self.flat: self[item] = vv
                 else: self[item] = vv.ravel()
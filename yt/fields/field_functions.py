@@ -15,9 +15,28 @@ General field-related functions.
 
 import numpy as np
 
+from yt.config import ytcfg
 from yt.utilities.lib.misc_utilities import \
     obtain_position_vector
 
+def use_fused_kernels(registry):
+    """
+    Whether the fields set up on *registry* should be evaluated with the
+    compiled kernels in :mod:`yt.utilities.lib.field_kernels`.
+    """
+    return getattr(registry, "use_fused_kernels", False) and \
+        ytcfg.getboolean("yt", "fused_field_kernels")
+
+def fused_buffer(arr, units=None):
+    """
+    Return *arr*, converted to *units* if given, as a C-contiguous float64
+    ndarray that the kernels in :mod:`yt.utilities.lib.field_kernels` can
+    operate on.  No copy is made if *arr* is already one.
+    """
+    if units is not None and arr.units != units:
+        arr = arr.in_units(units)
+    return np.ascontiguousarray(arr, dtype="float64")
+
 def get_radius(data, field_prefix, ftype):
     unit_system = data.ds.unit_system
     center = data.get_field_parameter("center").in_base(unit_system.name)
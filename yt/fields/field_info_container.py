@@ -58,6 +58,9 @@ class FieldInfoContainer(dict):
     known_other_fields = ()
     known_particle_fields = ()
     extra_union_fields = ()
+    # Whether the standard fluid fields set up on this container may use the
+    # compiled kernels in yt.utilities.lib.field_kernels.
+    use_fused_kernels = True
 
     def __init__(self, ds, field_list, slice_info = None):
         self._show_field_errors = []
@@ -66,6 +69,9 @@ class FieldInfoContainer(dict):
         self.field_list = field_list
         self.slice_info = slice_info
         self.field_aliases = {}
+        # Mesh fields smoothed from SPH particles, mapped to the particle
+        # fields they are made from; see get_sph_source.
+        self.sph_smoothed_fields = {}
         self.species_names = []
         self.setup_fluid_aliases()
 
@@ -173,6 +179,19 @@ class FieldInfoContainer(dict):
             #print "Aliasing %s => %s" % (alias, source)
             self.alias(alias, source)
 
+    def get_sph_source(self, field):
+        """
+        If *field* is smoothed onto the mesh from SPH particles, possibly
+        through aliases, returns the tuple ``(ptype, field, mass,
+        smoothing_length, density, kernel_name)`` naming the particle fields
+        it is made from; otherwise returns None.
+        """
+        seen = set()
+        while field in self.field_aliases and field not in seen:
+            seen.add(field)
+            field = self.field_aliases[field]
+        return self.sph_smoothed_fields.get(field)
+
     def setup_fluid_aliases(self, ftype='gas'):
         known_other_fields = dict(self.known_other_fields)
         for field in sorted(self.field_list):
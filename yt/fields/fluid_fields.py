@@ -21,13 +21,18 @@ from .derived_field import \
     ValidateSpatial, \
     ValidateParameter
 
+from .field_functions import \
+    fused_buffer, \
+    use_fused_kernels
+
 from .field_plugin_registry import \
     register_field_plugin
 
 from .vector_operations import \
     create_averaged_field, \
     create_magnitude_field, \
-    create_vector_fields
+    create_vector_fields, \
+    get_bulk
 
 from yt.utilities.physical_constants import \
     mh, \
@@ -38,6 +43,7 @@ from yt.utilities.physical_ratios import \
 
 from yt.utilities.lib.misc_utilities import \
     obtain_relative_velocity_vector
+from yt.utilities.lib import field_kernels
 
 @register_field_plugin
 def setup_fluid_fields(registry, ftype = "gas", slice_info = None):
@@ -55,6 +61,7 @@ def setup_fluid_fields(registry, ftype = "gas", slice_info = None):
         sl_left, sl_right, div_fac = slice_info
 
     unit_system = registry.ds.unit_system
+    fused = use_fused_kernels(registry)
 
     create_vector_fields(registry, "velocity", unit_system["velocity"], ftype, slice_info)
     create_vector_fields(registry, "magnetic_field", unit_system["magnetic_field"], ftype, slice_info)
@@ -62,9 +69,17 @@ def setup_fluid_fields(registry, ftype = "gas", slice_info = None):
     def _cell_mass(field, data):
         return data[ftype, "density"] * data[ftype, "cell_volume"]
 
+    def _cell_mass_fused(field, data):
+        rho = data[ftype, "density"]
+        vol = data[ftype, "cell_volume"]
+        out = np.empty(rho.shape, dtype="float64")
+        field_kernels.product(fused_buffer(rho).ravel(),
+                              fused_buffer(vol).ravel(), out.ravel())
+        return data.ds.arr(out, rho.units * vol.units)
+
     registry.add_field((ftype, "cell_mass"),
                        sampling_type="cell",
-                       function=_cell_mass,
+                       function=_cell_mass_fused if fused else _cell_mass,
                        units=unit_system["mass"])
 
     def _sound_speed(field, data):
@@ -87,9 +102,22 @@ def setup_fluid_fields(registry, ftype = "gas", slice_info = None):
     def _kin_energy(field, data):
         v = obtain_relative_velocity_vector(data)
         return 0.5 * data[ftype, "density"] * (v**2).sum(axis=0)
+
+    def _kin_energy_fused(field, data):
+        rho = data[ftype, "density"]
+        vx = data[ftype, "velocity_x"]
+        vel = [fused_buffer(data[ftype, "velocity_%s" % ax], vx.units).ravel()
+               for ax in 'xyz']
+        bulk = fused_buffer(get_bulk(data, "velocity", vx.unit_quantity),
+                            vx.units)
+        out = np.empty(rho.shape, dtype="float64")
+        field_kernels.kinetic_energy(fused_buffer(rho).ravel(), vel[0],
+                                     vel[1], vel[2], bulk, out.ravel())
+        return data.ds.arr(out, rho.units * vx.units**2)
+
     registry.add_field((ftype, "kinetic_energy"),
                        sampling_type="cell",
-                       function=_kin_energy,
+                       function=_kin_energy_fused if fused else _kin_energy,
                        units=unit_system["pressure"],
                        validators=[ValidateParameter('bulk_velocity')])
 
@@ -19,12 +19,18 @@ from yt.fields.derived_field import \
     ValidateSpatial, \
     ValidateParameter
 
+from .field_functions import \
+    fused_buffer, \
+    use_fused_kernels
+
 from .field_plugin_registry import \
     register_field_plugin
 
 from yt.funcs import \
     just_one
 
+from yt.utilities.lib import field_kernels
+
 from .vector_operations import \
     create_magnitude_field, \
     create_squared_field
@@ -111,7 +117,7 @@ def setup_fluid_vector_fields(registry, ftype = "gas", slice_info = None):
         vx = data[ftype, "relative_velocity_x"]
         vy = data[ftype, "relative_velocity_y"]
         f  = ((vy[sl_right,sl_center,sl_center] -
-               vx[sl_left,sl_center,sl_center]) /
+               vy[sl_left,sl_center,sl_center]) /
               (div_fac*just_one(data["index", "dx"])))
         f -= ((vx[sl_center,sl_right,sl_center] -
                vx[sl_center,sl_left,sl_center]) /
@@ -121,16 +127,42 @@ def setup_fluid_vector_fields(registry, ftype = "gas", slice_info = None):
         new_field[sl_center, sl_center, sl_center] = f
         return new_field
 
+    def _vorticity_fused(a, b):
+        # vorticity = d(a)/d(axis of b) - d(b)/d(axis of a), e.g.
+        # dvz/dy - dvy/dz for the x component.  The bulk velocity drops out
+        # of the differences.
+        axis_a = 'xyz'.index(b)
+        axis_b = 'xyz'.index(a)
+        def _vorticity(field, data):
+            va = data[ftype, "velocity_%s" % a]
+            vb = fused_buffer(data[ftype, "velocity_%s" % b], va.units)
+            db = just_one(data["index", "d%s" % b])
+            ds_a = div_fac * db.d
+            ds_b = div_fac * just_one(data["index", "d%s" % a]).in_units(
+                db.units).d
+            out = np.empty(va.shape, dtype="float64")
+            field_kernels.curl_component(
+                fused_buffer(va), axis_a, ds_a, vb, axis_b, ds_b,
+                sl_left.start or 0, sl_right.start or 0, out)
+            return data.ds.arr(out, va.units / db.units)
+        return _vorticity
+
     vort_validators = [
         ValidateSpatial(1, [(ftype, "velocity_%s" % d) for d in 'xyz']),
         ValidateParameter('bulk_velocity')
     ]
 
+    fused = use_fused_kernels(registry)
+    vort_components = {'x': ('z', 'y'), 'y': ('x', 'z'), 'z': ('y', 'x')}
     for ax in 'xyz':
         n = "vorticity_%s" % ax
+        if fused:
+            func = _vorticity_fused(*vort_components[ax])
+        else:
+            func = eval("_%s" % n)
         registry.add_field((ftype, n),
                            sampling_type="cell",
-                           function=eval("_%s" % n),
+                           function=func,
                            units=unit_system["frequency"],
                            validators=vort_validators)
     create_magnitude_field(registry, "vorticity", unit_system["frequency"],
@@ -813,6 +813,11 @@ def add_volume_weighted_smoothed_field(ptype, coord_name, mass_name,
                        validators = [ValidateSpatial(0)],
                        units = field_units)
     registry.find_dependencies((field_name,))
+    if smoothing_length_name is not None:
+        # Images of this field can be made from the particles directly.
+        registry.sph_smoothed_fields[field_name] = (
+            ptype, smoothed_field, mass_name, smoothing_length_name,
+            density_name, kernel_name)
     return [field_name]
 
 def add_nearest_neighbor_field(ptype, coord_name, registry, nneighbors = 64):
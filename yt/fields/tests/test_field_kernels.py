@@ -0,0 +1,69 @@
+"""
+Tests for the fused field kernels
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+from yt.config import ytcfg
+from yt.testing import \
+    assert_allclose_units, \
+    assert_almost_equal, \
+    assert_equal, \
+    fake_random_ds
+from yt.units import km, s
+from yt.utilities.lib import field_kernels
+
+def test_kernels():
+    prng = np.random.RandomState(0x4d3d3d3)
+    vx, vy, vz = prng.random_sample((3, 8, 8, 8))
+    out = np.empty((8, 8, 8))
+    field_kernels.divergence(vx, vy, vz, np.array([0.2, 0.2, 0.2]), 0, 2,
+                             out)
+    div = (vx[2:, 1:-1, 1:-1] - vx[:-2, 1:-1, 1:-1]) / 0.2 \
+        + (vy[1:-1, 2:, 1:-1] - vy[1:-1, :-2, 1:-1]) / 0.2 \
+        + (vz[1:-1, 1:-1, 2:] - vz[1:-1, 1:-1, :-2]) / 0.2
+    assert_almost_equal(out[1:-1, 1:-1, 1:-1], div)
+    assert_equal(out[0], 0.0)
+    # The x component of the curl, with one-sided differences.
+    field_kernels.curl_component(vz, 1, 0.1, vy, 2, 0.1, 0, 1, out)
+    curl = (vz[1:-1, 1:-1, 1:-1] - vz[1:-1, :-2, 1:-1]) / 0.1 \
+         - (vy[1:-1, 1:-1, 1:-1] - vy[1:-1, 1:-1, :-2]) / 0.1
+    assert_almost_equal(out[1:-1, 1:-1, 1:-1], curl)
+    bulk = np.array([0.1, 0.2, 0.3])
+    out = np.empty(512)
+    field_kernels.magnitude([vx.ravel(), vy.ravel()], bulk, out)
+    assert_almost_equal(out, np.sqrt((vx.ravel() - 0.1)**2 +
+                                     (vy.ravel() - 0.2)**2))
+
+def test_fused_fields():
+    fields = ["cell_mass", "kinetic_energy", "velocity_magnitude",
+              "velocity_divergence", "vorticity_x", "vorticity_y",
+              "vorticity_z", "vorticity_magnitude"]
+    old = ytcfg.get("yt", "fused_field_kernels")
+    try:
+        ytcfg["yt", "fused_field_kernels"] = "False"
+        ds_ref = fake_random_ds(16, nprocs=4)
+        ds_ref.index
+        ytcfg["yt", "fused_field_kernels"] = "True"
+        ds = fake_random_ds(16, nprocs=4)
+        ds.index
+    finally:
+        ytcfg["yt", "fused_field_kernels"] = old
+    for bv in [[0, 0, 0], [1e5, 1e5, 1e5]]:
+        sp_ref = ds_ref.sphere("c", 0.3)
+        sp = ds.sphere("c", 0.3)
+        for dobj in (sp_ref, sp):
+            dobj.set_field_parameter("bulk_velocity", bv*km/s)
+        for field in fields:
+            assert_allclose_units(sp["gas", field], sp_ref["gas", field])
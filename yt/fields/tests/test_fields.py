@@ -15,6 +15,8 @@ from yt.testing import \
     requires_file
 from yt.utilities.cosmology import \
     Cosmology
+from yt.fields.api import \
+    bare_field_evaluation
 from yt.frontends.stream.fields import \
     StreamFieldInfo
 from yt.units.yt_array import \
@@ -368,3 +370,59 @@ def test_deposit_amr():
         gpm = g['particle_mass'].sum()
         dpm = g['deposit', 'all_mass'].sum()
         assert_allclose_units(gpm, dpm)
+
+def test_bare_field_evaluation():
+    ds = fake_random_ds(16, nprocs=8)
+
+    def _momentum(field, data):
+        return data["gas", "density"] * data["gas", "velocity_x"]
+
+    def _converted(field, data):
+        return data["gas", "velocity_x"] + ds.quan(1.0, "km/s")
+
+    def _explicit(field, data):
+        return data["gas", "density"].in_units("kg/m**3")
+
+    calls = []
+    def _counted(field, data):
+        calls.append(field.name)
+        return data["gas", "density"].in_units("kg/m**3")
+
+    fields = [("gas", "momentum_x"), ("gas", "converted"),
+              ("gas", "explicit"), ("gas", "counted")]
+    for field, function, units in zip(fields,
+            [_momentum, _converted, _explicit, _counted],
+            ["g/cm**2/s", "cm/s", "kg/m**3", "kg/m**3"]):
+        ds.add_field(field, function=function, units=units,
+                     sampling_type="cell")
+    ad = ds.all_data()
+    answers = dict((field, ad[field]) for field in fields)
+    with bare_field_evaluation():
+        # The first evaluation decides whether a field can be evaluated on
+        # bare arrays.
+        ad = ds.all_data()
+        for field in fields:
+            assert_allclose_units(ad[field], answers[field])
+        assert_equal(ds.field_info["gas", "momentum_x"]._bare_units[0],
+                     answers["gas", "momentum_x"].units)
+        assert_equal(ds.field_info["gas", "converted"]._bare_units, False)
+        assert_equal(ds.field_info["gas", "explicit"]._bare_units, False)
+        assert_equal(ds.field_info["gas", "counted"]._bare_units, False)
+        # Later ones call the function only once either way.
+        del calls[:]
+        ad = ds.all_data()
+        for field in fields:
+            assert_allclose_units(ad[field], answers[field])
+        assert_equal(calls, [("gas", "counted")])
+        # Errors other than those of functions that need units propagate.
+        fail = [False]
+        def _failing(field, data):
+            if fail[0]:
+                raise RuntimeError
+            return 2.0 * data["gas", "density"]
+        ds.add_field(("gas", "failing"), function=_failing, units="g/cm**3",
+                     sampling_type="cell")
+        ds.all_data()["gas", "failing"]
+        fail[0] = True
+        assert_raises(RuntimeError, ds.all_data().__getitem__,
+                      ("gas", "failing"))
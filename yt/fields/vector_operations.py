@@ -17,6 +17,10 @@ from .derived_field import \
     ValidateParameter, \
     ValidateSpatial
 
+from .field_functions import \
+    fused_buffer, \
+    use_fused_kernels
+
 from yt.utilities.math_utils import \
     get_sph_r_component, \
     get_sph_theta_component, \
@@ -30,6 +34,7 @@ from yt.funcs import \
     handle_mks_cgs
 
 from yt.utilities.lib.misc_utilities import obtain_relative_velocity_vector
+from yt.utilities.lib import field_kernels
 
 def get_bulk(data, basename, unit):
     if data.has_field_parameter("bulk_%s" % basename):
@@ -60,14 +65,31 @@ def create_magnitude_field(registry, basename, field_units,
             mag += (data[fn])**2
         return np.sqrt(mag)
 
+    def _magnitude_fused(field, data):
+        # The relative fields take care of converting the bulk vector between
+        # unit systems, so leave that case to them.
+        if data.has_field_parameter('bulk_%s' % basename):
+            return _magnitude(field, data)
+        d = data[field_components[0]]
+        components = [fused_buffer(data[fn], d.units).ravel()
+                      for fn in field_components[:registry.ds.dimensionality]]
+        out = np.empty(d.shape, dtype="float64")
+        field_kernels.magnitude(components, np.zeros(3), out.ravel())
+        return data.ds.arr(out, d.units)
+
     if particle_type is True:
         sampling_type = 'particle'
     else:
         sampling_type = 'cell'
 
+    if use_fused_kernels(registry):
+        _magnitude_func = _magnitude_fused
+    else:
+        _magnitude_func = _magnitude
+
     registry.add_field((ftype, "%s_magnitude" % basename),
                        sampling_type=sampling_type,
-                       function=_magnitude,
+                       function=_magnitude_func,
                        units=field_units,
                        validators=validators)
 
@@ -278,15 +300,38 @@ def create_vector_fields(registry, basename, field_units,
         new_field[1:-1,1:-1,1:-1] = f
         return new_field
 
+    def _divergence_fused(field, data):
+        # The bulk vector drops out of the differences, so the components
+        # can be used directly instead of the relative fields.
+        d = data[xn]
+        dx = just_one(data["index", "dx"])
+        ds = np.array([div_fac * just_one(data["index", "d%s" % ax]).in_units(
+                       dx.units).d for ax in 'xyz'])
+        vectors = []
+        for fn in (xn, yn, zn):
+            if fn == ("index", "zeros"):
+                vectors.append(fused_buffer(data[fn]))
+            else:
+                vectors.append(fused_buffer(data[fn], d.units))
+        out = np.empty(d.shape, dtype="float64")
+        field_kernels.divergence(vectors[0], vectors[1], vectors[2], ds,
+                                 sl_left.start or 0, sl_right.start or 0, out)
+        return data.ds.arr(out, d.units / dx.units)
+
     def _divergence_abs(field, data):
         return np.abs(data[ftype, "%s_divergence" % basename])
 
     field_units = Unit(field_units, registry=registry.ds.unit_registry)
     div_units = field_units / registry.ds.unit_system["length"]
 
+    if use_fused_kernels(registry):
+        _divergence_func = _divergence_fused
+    else:
+        _divergence_func = _divergence
+
     registry.add_field((ftype, "%s_divergence" % basename),
                        sampling_type="cell",
-                       function=_divergence,
+                       function=_divergence_func,
                        units=div_units,
                        validators=[ValidateSpatial(1),
                                    ValidateParameter('bulk_%s' % basename)])
@@ -62,6 +62,7 @@ class AHFHalosDataset(Dataset):
     _index_class = ParticleIndex
     _file_class = AHFHalosFile
     _field_info_class = AHFHalosFieldInfo
+    _prefilter_suffixes = (".parameter",)
 
     def __init__(self, filename, dataset_type='ahf',
                  n_ref=16, over_refine_factor=1,
@@ -49,10 +49,26 @@ _frontends = [
     'ytdata',
 ]
 
+def import_frontends():
+    """
+    Import every frontend, which registers their dataset and simulation
+    classes so that yt.load and yt.simulation can find them.
+    """
+    for frontend in _frontends:
+        importlib.import_module("yt.frontends.%s.api" % frontend)
+
 class _frontend_container:
+    # Each frontend is imported the first time it is accessed.
     def __init__(self):
-        for frontend in _frontends:
-            _mod = "yt.frontends.%s.api" % frontend
-            setattr(self, frontend, importlib.import_module(_mod))
         setattr(self, 'api', importlib.import_module('yt.frontends.api'))
         setattr(self, '__name__', 'yt.frontends.api')
+
+    def __getattr__(self, name):
+        if name not in _frontends:
+            raise AttributeError(name)
+        _mod = importlib.import_module("yt.frontends.%s.api" % name)
+        setattr(self, name, _mod)
+        return _mod
+
+    def __dir__(self):
+        return sorted(set(list(self.__dict__) + _frontends))
@@ -156,6 +156,7 @@ class ARTIORootMeshSubset(ARTIOOctreeSubset):
         return np.asfortranarray(vals)
 
 class ARTIOIndex(Index):
+    _prefetch_supported = False
 
     def __init__(self, ds, dataset_type='artio'):
         self.dataset_type = dataset_type
@@ -332,6 +333,7 @@ class ARTIODataset(Dataset):
     _handle = None
     _index_class = ARTIOIndex
     _field_info_class = ARTIOFieldInfo
+    _prefilter_suffixes = (".art",)
 
     def __init__(self, filename, dataset_type='artio',
                  storage_filename=None, max_range = 1024,
@@ -235,6 +235,7 @@ class AthenaPPHierarchy(GridIndex):
 class AthenaPPDataset(Dataset):
     _field_info_class = AthenaPPFieldInfo
     _dataset_type = "athena_pp"
+    _prefilter_suffixes = ("athdf",)
 
     def __init__(self, filename, dataset_type='athena_pp',
                  storage_filename=None, parameters=None,
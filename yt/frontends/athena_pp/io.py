@@ -75,7 +75,8 @@ class IOHandlerAthenaPP(BaseIOHandler):
                         end = gs[-1].id - gs[-1]._id_offset + 1
                         data = ds[fdi,start:end,:,:,:].transpose()
                         for i, g in enumerate(gs):
-                            ind += g.select(selector, data[...,i], rv[field], ind)
+                            ind += self._select_into(
+                                g, selector, data[...,i], rv[field], ind)
         return rv
 
     def _read_chunk_data(self, chunk, fields):
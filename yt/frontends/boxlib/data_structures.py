@@ -326,6 +326,7 @@ class AMReXParticleHeader(object):
 class BoxlibHierarchy(GridIndex):
 
     grid = BoxlibGrid
+    _cache_grid_metadata = True
 
     def __init__(self, ds, dataset_type='boxlib_native'):
         self.dataset_type = dataset_type
@@ -485,6 +486,9 @@ class BoxlibHierarchy(GridIndex):
         mylog.debug("Creating grid objects")
         self.grids = np.array(self.grids, dtype='object')
         self._reconstruct_parent_child()
+        self._prepare_grid_objects()
+
+    def _prepare_grid_objects(self):
         for i, grid in enumerate(self.grids):
             if (i % 1e4) == 0: mylog.debug("Prepared % 7i / % 7i grids", i,
                                            self.num_grids)
@@ -492,6 +496,45 @@ class BoxlibHierarchy(GridIndex):
             grid._setup_dx()
         mylog.debug("Done creating grid objects")
 
+    def _grid_metadata_source(self):
+        return self.header_filename
+
+    def _grid_metadata(self):
+        metadata = {}
+        metadata["level_dds"] = self.level_dds
+        metadata["grid_start_index"] = self.grid_start_index
+        children = [g._children_ids for g in self.grids]
+        metadata["grid_children_offsets"] = np.cumsum(
+            [0] + [len(c) for c in children], dtype="int64")
+        metadata["grid_children_ids"] = np.concatenate(
+            [np.asarray(c, dtype="int64") for c in children])
+        metadata["grid_offsets"] = np.array(
+            [g._base_offset for g in self.grids], dtype="int64")
+        # Relative to the output directory, in case it is moved.
+        metadata["grid_filenames"] = np.array(
+            [os.path.relpath(g.filename, self.directory).encode("utf-8")
+             for g in self.grids])
+        return metadata
+
+    def _restore_grid_objects(self, metadata):
+        self.max_level = self.dataset._max_level
+        self.dimensionality = self.dataset.dimensionality
+        self.level_dds = metadata["level_dds"]
+        self.grid_start_index[:] = metadata["grid_start_index"]
+        offsets = metadata["grid_children_offsets"]
+        children = metadata["grid_children_ids"]
+        self.grids = np.empty(self.num_grids, dtype='object')
+        for i in range(self.num_grids):
+            filename = os.path.join(
+                self.directory, metadata["grid_filenames"][i].decode("utf-8"))
+            go = self.grid(i, int(metadata["grid_offsets"][i]), filename, self)
+            go.Level = int(self.grid_levels[i, 0])
+            go._children_ids = children[offsets[i]:offsets[i + 1]]
+            self.grids[i] = go
+        self._link_parents()
+        self._prepare_grid_objects()
+        self.float_type = 'float64'
+
     def _reconstruct_parent_child(self):
         mask = np.empty(len(self.grids), dtype='int32')
         mylog.debug("First pass; identifying child grids")
@@ -503,6 +546,9 @@ class BoxlibHierarchy(GridIndex):
                                 self.grid_levels, mask)
             ids = np.where(mask.astype("bool"))  # where is a tuple
             grid._children_ids = ids[0] + grid._id_offset
+        self._link_parents()
+
+    def _link_parents(self):
         mylog.debug("Second pass; identifying parents")
         for i, grid in enumerate(self.grids):  # Second pass
             for child in grid.Children:
@@ -605,6 +651,8 @@ class BoxlibDataset(Dataset):
     _index_class = BoxlibHierarchy
     _field_info_class = BoxlibFieldInfo
     _output_prefix = None
+    # boxlib datasets are always directories
+    _prefilter_directory = True
 
     # THIS SHOULD BE FIXED:
     periodicity = (True, True, True)
@@ -255,6 +255,7 @@ class ChomboHierarchy(GridIndex):
 class ChomboDataset(Dataset):
     _index_class = ChomboHierarchy
     _field_info_class = ChomboFieldInfo
+    _prefilter_hdf5_groups = ("Chombo_global",)
 
     def __init__(self, filename, dataset_type='chombo_hdf5',
                  storage_filename = None, ini_filename = None,
@@ -143,7 +143,7 @@ class IOHandlerChomboHDF5(BaseIOHandler):
                 for field in fields:
                     ftype, fname = field
                     data = self._read_data(g, fname)
-                    nd = g.select(selector, data, rv[field], ind) # caches
+                    nd = self._select_into(g, selector, data, rv[field], ind)
                 ind += nd
         return rv
 
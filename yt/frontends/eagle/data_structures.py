@@ -31,6 +31,8 @@ class EagleDataset(GadgetHDF5Dataset):
     _particle_mass_name = "Mass"
     _field_info_class = OWLSFieldInfo
     _time_readin_ = 'Time'
+    _prefilter_hdf5_groups = ("Config", "Constants", "HashTable", "Header",
+                              "Parameters", "RuntimePars", "Units")
 
     def _parse_parameter_file(self):
 
@@ -80,6 +82,7 @@ class EagleNetworkDataset(EagleDataset):
     _particle_mass_name = "Mass"
     _field_info_class = EagleNetworkFieldInfo
     _time_readin = 'Time'
+    _prefilter_hdf5_groups = ("Constants", "Header", "PartType0")
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -165,6 +165,7 @@ class EnzoHierarchy(GridIndex):
     _strip_path = False
     grid = EnzoGrid
     _preload_implemented = True
+    _cache_grid_metadata = True
 
     def __init__(self, ds, dataset_type):
 
@@ -364,6 +365,42 @@ class EnzoHierarchy(GridIndex):
         del self.filenames # No longer needed.
         self.max_level = self.grid_levels.max()
 
+    def _grid_metadata(self):
+        metadata = {}
+        children = [g._children_ids for g in self.grids]
+        metadata["grid_children_offsets"] = np.cumsum(
+            [0] + [len(c) for c in children], dtype="int64")
+        metadata["grid_children_ids"] = np.array(
+            [cid for c in children for cid in c], dtype="int64")
+        metadata["grid_parent_ids"] = np.array(
+            [g._parent_id for g in self.grids], dtype="int64")
+        # Relative to the directory, in case the dataset is moved.
+        metadata["grid_filenames"] = np.array(
+            [b"" if g.filename is None else
+             os.path.relpath(g.filename, self.directory).encode("utf-8")
+             for g in self.grids])
+        for ptype, count in getattr(self, "grid_active_particle_count",
+                                    {}).items():
+            metadata["active_particle_count_%s" % ptype] = count
+        return metadata
+
+    def _restore_grid_objects(self, metadata):
+        offsets = metadata["grid_children_offsets"]
+        children = metadata["grid_children_ids"]
+        self.grids = np.empty(self.num_grids, dtype='object')
+        for i in range(self.num_grids):
+            g = self.grid(i + 1, self)
+            g.Level = int(self.grid_levels[i, 0])
+            g._parent_id = int(metadata["grid_parent_ids"][i])
+            g._children_ids = children[offsets[i]:offsets[i + 1]].tolist()
+            self.grids[i] = g
+        for ptype, count in getattr(self, "grid_active_particle_count",
+                                    {}).items():
+            count[:] = metadata["active_particle_count_%s" % ptype]
+        self.filenames = [[fn.decode("utf-8") or None]
+                          for fn in metadata["grid_filenames"]]
+        self._populate_grid_objects()
+
     def _detect_active_particle_fields(self):
         ap_list = self.dataset["AppendActiveParticleType"]
         _fields = dict((ap, []) for ap in ap_list)
@@ -13,8 +13,13 @@ Enzo-specific IO functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from collections import defaultdict
+
+from yt.data_objects.grid_patch import \
+    AMRGridSlab
 from yt.utilities.io_handler import \
-    BaseIOHandler
+    BaseIOHandler, \
+    _io_key
 from yt.utilities.logger import ytLogger as mylog
 from yt.extern.six import b, iteritems
 from yt.utilities.on_demand_imports import _h5py as h5py
@@ -31,6 +36,12 @@ class IOHandlerPackedHDF5(BaseIOHandler):
     _dataset_type = "enzo_packed_3d"
     _base = slice(None)
     _field_dtype = "float64"
+    # Read all the grids of a chunk that live in the same file in one pass,
+    # in on-disk order, into one buffer per field.  Chunks are read in
+    # batches of consecutive grids holding at most _coalesce_max_bytes of
+    # field data, so the buffers never hold much more than that at once.
+    _coalesce_reads = True
+    _coalesce_max_bytes = 256 * 1024**2
 
     def _read_field_names(self, grid):
         if grid.filename is None: return []
@@ -114,6 +125,10 @@ class IOHandlerPackedHDF5(BaseIOHandler):
             if f: f.close()
 
     def io_iter(self, chunks, fields):
+        if self._coalesce_reads:
+            for rv in self._coalesced_io_iter(chunks, fields):
+                yield rv
+            return
         h5_dtype = self._field_dtype
         for chunk in chunks:
             fid = None
@@ -131,13 +146,126 @@ class IOHandlerPackedHDF5(BaseIOHandler):
                     filename = obj.filename
                 for field in fields:
                     nodal_flag = self.ds.field_info[field].nodal_flag
-                    dims = obj.ActiveDimensions[::-1] + nodal_flag[::-1]
-                    data = np.empty(dims, dtype=h5_dtype)
+                    if isinstance(obj, AMRGridSlab) and not any(nodal_flag):
+                        # Sized by _read_obj_field, once it knows whether
+                        # it can read just the planes of the slab.
+                        data = None
+                    else:
+                        dims = obj.ActiveDimensions[::-1] + nodal_flag[::-1]
+                        data = np.empty(dims, dtype=h5_dtype)
                     yield field, obj, self._read_obj_field(
                         obj, field, (fid, data))
         if fid is not None:
             fid.close()
         
+    def _coalesced_io_iter(self, chunks, fields):
+        h5_dtype = self._field_dtype
+        for chunk in chunks:
+            objs = [obj for obj in chunk.objs if obj.filename is not None]
+            for batch in self._coalesce_batches(objs, fields, h5_dtype):
+                by_file = defaultdict(list)
+                for obj in batch:
+                    by_file[obj.filename].append(obj)
+                data = {}
+                for filename in sorted(by_file):
+                    self._read_file_fields(filename, by_file[filename],
+                                           fields, h5_dtype, data)
+                # The caller fills its arrays in chunk order, so this is the
+                # order we have to yield in, whatever order the file was read
+                # in.
+                for obj in batch:
+                    for field in fields:
+                        yield field, obj, data.pop((_io_key(obj), field))
+
+    def _coalesce_batches(self, objs, fields, h5_dtype):
+        # Split the grids, in order, into runs whose field data fit in
+        # _coalesce_max_bytes.  A single grid larger than that is read alone.
+        itemsize = np.dtype(h5_dtype).itemsize * max(len(fields), 1)
+        batch = []
+        nbytes = 0
+        for obj in objs:
+            if isinstance(obj, AMRGridSlab):
+                dims = np.array(obj.slab_shape)
+            else:
+                dims = obj.ActiveDimensions
+            size = int(np.prod(dims + 1)) * itemsize
+            if batch and nbytes + size > self._coalesce_max_bytes:
+                yield batch
+                batch = []
+                nbytes = 0
+            batch.append(obj)
+            nbytes += size
+        if batch:
+            yield batch
+
+    def _read_file_fields(self, filename, objs, fields, h5_dtype, data):
+        fid = h5py.h5f.open(b(filename), h5py.h5f.ACC_RDONLY)
+        try:
+            reads = []
+            sizes = dict((field, 0) for field in fields)
+            for obj in objs:
+                for field in fields:
+                    node = "/Grid%08i/%s" % (obj.id, field[1])
+                    try:
+                        dg = h5py.h5d.open(fid, b(node))
+                    except KeyError:
+                        if field[1] == "Dark_Matter_Density":
+                            shape = obj.ActiveDimensions[::-1] + \
+                                self.ds.field_info[field].nodal_flag[::-1]
+                            data[_io_key(obj), field] = \
+                                np.zeros(shape, h5_dtype).T
+                            continue
+                        raise
+                    # Read into the grid's shape, so 1D and 2D datasets come
+                    # back 3D; datasets with ghost zones keep their own shape.
+                    shape = tuple(obj.ActiveDimensions[::-1] +
+                        self.ds.field_info[field].nodal_flag[::-1])
+                    if np.prod(shape) != np.prod(dg.shape):
+                        shape = dg.shape
+                    slab = self._slab_hyperslab(obj, dg)
+                    if slab is not None:
+                        shape = slab[1]
+                    offset = dg.get_offset()
+                    # Chunked or compressed datasets have no single offset;
+                    # they go at the end, in the order they were requested.
+                    if offset is None:
+                        offset = np.iinfo(np.int64).max
+                    reads.append((offset, len(reads), obj, field, dg, slab,
+                                  shape, sizes[field]))
+                    sizes[field] += int(np.prod(shape))
+            buffers = dict((field, np.empty(sizes[field], dtype=h5_dtype))
+                           for field in fields)
+            reads.sort(key=lambda r: (r[0], r[1]))
+            for offset, _, obj, field, dg, slab, shape, start in reads:
+                n = int(np.prod(shape))
+                arr = buffers[field][start:start + n].reshape(shape)
+                if slab is None:
+                    dg.read(h5py.h5s.ALL, h5py.h5s.ALL, arr)
+                else:
+                    self._read_hyperslab(dg, slab, arr)
+                data[_io_key(obj), field] = arr.T[self._base]
+        finally:
+            fid.close()
+
+    def _slab_hyperslab(self, obj, dg):
+        # The (offset, count) of the planes of the grid slab obj in the
+        # dataset dg, which holds the grid z first, or None if dg is read
+        # whole: for grids, and for datasets that aren't shaped like the grid
+        # (1D and 2D grids, nodal fields, ghost zones), whose slabs select
+        # their own planes from the whole grid.
+        if not isinstance(obj, AMRGridSlab):
+            return None
+        if dg.shape != tuple(obj.ActiveDimensions[::-1]):
+            return None
+        count = tuple(int(n) for n in obj.slab_shape[::-1])
+        return (0, 0, obj.start), count
+
+    def _read_hyperslab(self, dg, slab, data):
+        offset, count = slab
+        fspace = dg.get_space()
+        fspace.select_hyperslab(offset, count)
+        dg.read(h5py.h5s.create_simple(count), fspace, data)
+
     def _read_obj_field(self, obj, field, fid_data):
         if fid_data is None: fid_data = (None, None)
         fid, data = fid_data
@@ -146,19 +274,27 @@ class IOHandlerPackedHDF5(BaseIOHandler):
             fid = h5py.h5f.open(b(obj.filename), h5py.h5f.ACC_RDONLY)
         else:
             close = False
-        if data is None:
-            data = np.empty(obj.ActiveDimensions[::-1],
-                            dtype=self._field_dtype)
         ftype, fname = field
         try:
             node = "/Grid%08i/%s" % (obj.id, fname)
             dg = h5py.h5d.open(fid, b(node))
         except KeyError:
             if fname == "Dark_Matter_Density":
+                if data is None:
+                    data = np.empty(obj.ActiveDimensions[::-1],
+                                    dtype=self._field_dtype)
                 data[:] = 0
                 return data.T
             raise
-        dg.read(h5py.h5s.ALL, h5py.h5s.ALL, data)
+        slab = self._slab_hyperslab(obj, dg)
+        if slab is not None:
+            data = np.empty(slab[1], dtype=self._field_dtype)
+            self._read_hyperslab(dg, slab, data)
+        else:
+            if data is None:
+                data = np.empty(obj.ActiveDimensions[::-1],
+                                dtype=self._field_dtype)
+            dg.read(h5py.h5s.ALL, h5py.h5s.ALL, data)
         # I don't know why, but on some installations of h5py this works, but
         # on others, nope.  Doesn't seem to be a version thing.
         #dg.close()
@@ -242,7 +378,8 @@ class IOHandlerInMemory(BaseIOHandler):
                 for field in fields:
                     ftype, fname = field
                     data_view = self.grids_in_memory[g.id][fname][self.my_slice].swapaxes(0,2)
-                    nd = g.select(selector, data_view, rv[field], ind)
+                    nd = self._select_into(g, selector, data_view,
+                                           rv[field], ind)
                 ind += nd
         assert(ind == fsize)
         return rv
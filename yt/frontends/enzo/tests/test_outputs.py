@@ -14,7 +14,11 @@ Enzo frontend tests
 #-----------------------------------------------------------------------------
 
 import numpy as np
+import os
+import shutil
+import tempfile
 
+from yt.config import ytcfg
 from yt.testing import \
     assert_almost_equal, \
     assert_equal, \
@@ -31,7 +35,10 @@ from yt.utilities.answer_testing.framework import \
     SimulatedHaloMassFunctionTest
 from yt.visualization.plot_window import \
     SlicePlot
+from yt.data_objects.grid_patch import \
+    AMRGridSlab
 from yt.frontends.enzo.api import EnzoDataset
+from yt.frontends.enzo.data_structures import EnzoHierarchy
 from yt.frontends.enzo.fields import NODAL_FLAGS
 
 _fields = ("temperature", "density", "velocity_magnitude",
@@ -228,3 +235,95 @@ def test_2d_grid_shape():
     ds = data_dir_load(kh2d)
     g = ds.index.grids[1]
     assert g['density'].shape == (128, 100, 1)
+
+@requires_file(enzotiny)
+def test_grid_metadata_cache():
+    tmpdir = tempfile.mkdtemp()
+    kwargs = dict(storage_filename=os.path.join(tmpdir, "DD0046.yt"))
+    old = [ytcfg.get("yt", option)
+           for option in ("serialize", "skip_dataset_cache")]
+    ytcfg["yt", "serialize"] = "True"
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    def _parse_index(self):
+        raise RuntimeError("The index should not be parsed again.")
+    parse_index = EnzoHierarchy._parse_index
+    try:
+        ds1 = data_dir_load(enzotiny, cls=EnzoDataset, kwargs=kwargs)
+        EnzoHierarchy._parse_index = _parse_index
+        ds2 = data_dir_load(enzotiny, cls=EnzoDataset, kwargs=kwargs)
+    finally:
+        EnzoHierarchy._parse_index = parse_index
+        ytcfg["yt", "serialize"], ytcfg["yt", "skip_dataset_cache"] = old
+    for attr in ds1.index._index_properties:
+        assert_array_equal(getattr(ds1.index, attr),
+                           getattr(ds2.index, attr))
+    for g1, g2 in zip(ds1.index.grids, ds2.index.grids):
+        assert_equal(g1.filename, g2.filename)
+        assert_equal(g1.Level, g2.Level)
+        assert_equal(g1._parent_id, g2._parent_id)
+        assert_equal(g1._children_ids, g2._children_ids)
+        assert_array_equal(g1.dds, g2.dds)
+    assert_array_equal(ds1.r["density"], ds2.r["density"])
+    ds1.index._close_data_file()
+    ds2.index._close_data_file()
+    shutil.rmtree(tmpdir)
+
+@requires_file(enzotiny)
+def test_coalesced_reads():
+    ds = data_dir_load(enzotiny)
+    io = ds.index.io
+    c = ds.domain_center
+    fields = [("enzo", "Density"), ("enzo", "x-velocity"),
+              ("gas", "temperature"), ("gas", "cell_mass")]
+    def _data_sources():
+        return [ds.all_data(),
+                ds.sphere(c, (5.0, "Mpc")),
+                ds.region(c, ds.domain_left_edge, c),
+                ds.slice(2, c[2])]
+    def _read(coalesce, max_bytes):
+        io._coalesce_reads = coalesce
+        io._coalesce_max_bytes = max_bytes
+        try:
+            return [[dobj[field] for field in fields]
+                    for dobj in _data_sources()]
+        finally:
+            del io._coalesce_reads, io._coalesce_max_bytes
+    per_grid = _read(False, 0)
+    # A batch size of one byte reads every grid on its own.
+    for max_bytes in (type(io)._coalesce_max_bytes, 1):
+        coalesced = _read(True, max_bytes)
+        for values1, values2 in zip(per_grid, coalesced):
+            for v1, v2 in zip(values1, values2):
+                assert_array_equal(v1, v2)
+
+@requires_file(enzotiny)
+def test_slab_reads():
+    ds = data_dir_load(enzotiny)
+    io = ds.index.io
+    fields = [("enzo", "Density"), ("enzo", "x-velocity"),
+              ("gas", "cell_mass")]
+    expected = [ds.all_data()[field] for field in fields]
+    # Record the shape of the data read for each slab.
+    reads = []
+    io_iter = io.io_iter
+    def _io_iter(chunks, fields):
+        for field, obj, data in io_iter(chunks, fields):
+            if isinstance(obj, AMRGridSlab):
+                reads.append((obj, data.shape))
+            yield field, obj, data
+    io.io_iter = _io_iter
+    # At most 1024 cells per chunk splits the root grid into single planes.
+    ds.index.max_chunk_bytes = 8 * 1024
+    try:
+        for coalesce in (True, False):
+            io._coalesce_reads = coalesce
+            del reads[:]
+            values = [ds.all_data()[field] for field in fields]
+            for v1, v2 in zip(expected, values):
+                assert_array_equal(v1, v2)
+            assert len(reads) > 0
+            for obj, shape in reads:
+                assert_equal(shape, obj.slab_shape)
+    finally:
+        ds.index.max_chunk_bytes = 0
+        del io.io_iter, io._coalesce_reads
@@ -253,6 +253,7 @@ class EnzoPDataset(Dataset):
     """
     _index_class = EnzoPHierarchy
     _field_info_class = EnzoPFieldInfo
+    _prefilter_suffixes = (".block_list",)
 
     def __init__(self, filename, dataset_type=None,
                  file_style = None,
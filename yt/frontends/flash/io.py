@@ -16,6 +16,8 @@ FLASH-specific IO functions
 import numpy as np
 from itertools import groupby
 
+from yt.data_objects.grid_patch import \
+    particle_grids
 from yt.utilities.io_handler import \
     BaseIOHandler
 from yt.geometry.selection_routines import AlwaysSelector
@@ -24,7 +26,7 @@ from yt.utilities.lib.geometry_utils import \
 
 # http://stackoverflow.com/questions/2361945/detecting-consecutive-integers-in-a-list
 def particle_sequences(grids):
-    g_iter = sorted(grids, key = lambda g: g.id)
+    g_iter = sorted(particle_grids(grids), key = lambda g: g.id)
     for k, g in groupby(enumerate(g_iter), lambda i_x:i_x[0]-i_x[1].id):
         seq = list(v[1] for v in g)
         yield seq[0], seq[-1]
@@ -96,6 +96,10 @@ class GadgetDataset(SPHDataset):
     _particle_coordinates_name = "Coordinates"
     _particle_velocity_name = "Velocities"
     _suffix = ""
+    # The first record marker, 256 for SnapFormat=1 or 8 for SnapFormat=2,
+    # in either byte order.  See _validate_header.
+    _prefilter_magic = (b"\x00\x01\x00\x00", b"\x00\x00\x01\x00",
+                        b"\x08\x00\x00\x00", b"\x00\x00\x00\x08")
 
     def __init__(self, filename, dataset_type="gadget_binary",
                  additional_fields=(),
@@ -415,6 +419,8 @@ class GadgetHDF5Dataset(GadgetDataset):
     _field_info_class = GadgetFieldInfo
     _particle_mass_name = "Masses"
     _suffix = ".hdf5"
+    _prefilter_magic = None
+    _prefilter_hdf5_groups = ("Header",)
 
     def __init__(self, filename, dataset_type="gadget_hdf5",
                  unit_base=None, n_ref=64,
@@ -18,7 +18,12 @@ from __future__ import print_function
 import numpy as np
 import os
 
+from collections import defaultdict
 from yt.extern.six import string_types
+from yt.geometry.particle_geometry_handler import \
+    ParticleCellRanges
+from yt.geometry.selection_routines import \
+    AlwaysSelector
 from yt.utilities.io_handler import \
     BaseIOHandler
 from yt.utilities.lib.geometry_utils import \
@@ -55,38 +60,99 @@ class IOHandlerGadgetHDF5(BaseIOHandler):
     def _read_fluid_selection(self, chunks, selector, fields, size):
         raise NotImplementedError
 
-    def _read_particle_coords(self, chunks, ptf):
-        # This will read chunks and yield the results.
-        chunks = list(chunks)
+    # Particles are located within a file through the ranges of particle
+    # indices covered by each cell of a coarse mesh; see ParticleCellRanges.
+    # Partial reads are only used when the file is close enough to spatially
+    # sorted for these ranges to be short and the selection is small.
+    _cell_range_dims = 32
+    _max_cell_range_coverage = 2.0
+    _max_partial_fraction = 0.5
+    _particle_ranges_supported = True
+
+    def _data_files(self, chunks):
         data_files = set([])
         for chunk in chunks:
             for obj in chunk.objs:
                 data_files.update(obj.data_files)
-        for data_file in sorted(data_files, key=lambda x: x.filename):
+        return sorted(data_files, key=lambda x: x.filename)
+
+    def _get_cell_ranges(self, data_file, ptype, g):
+        # The ranges are built the first time a selection needs them.  Those
+        # of files too far from spatially sorted to be read in part are not
+        # kept; False is kept in their place.
+        ranges = data_file.cell_ranges.get(ptype, None)
+        if ranges is None:
+            pos = g["Coordinates"][:].astype("float64")
+            ranges = ParticleCellRanges(self.ds.domain_left_edge.d,
+                                        self.ds.domain_right_edge.d,
+                                        self._cell_range_dims, pos)
+            del pos
+            if ranges.coverage > self._max_cell_range_coverage:
+                ranges = False
+            data_file.cell_ranges[ptype] = ranges
+        return ranges
+
+    def _selected_slabs(self, data_file, g, ptype, selector):
+        # Return the (start, stop) ranges of particles that have to be read
+        # from the group g to satisfy selector.
+        full = data_file._particle_slabs(ptype)
+        if selector is None or isinstance(selector, AlwaysSelector):
+            return full
+        ranges = self._get_cell_ranges(data_file, ptype, g)
+        if ranges is False:
+            return full
+        cell_slabs = ranges.select_ranges(selector)
+        slabs = [(max(s1, start), min(s2, stop))
+                 for start, stop in full
+                 for s1, s2 in cell_slabs
+                 if s2 > start and s1 < stop]
+        nread = sum(s2 - s1 for s1, s2 in slabs)
+        if nread > self._max_partial_fraction * \
+                sum(stop - start for start, stop in full):
+            return full
+        return slabs
+
+    def _read_particle_coords(self, chunks, ptf, selector=None):
+        # This will read chunks and yield the results.
+        chunks = list(chunks)
+        for data_file in self._data_files(chunks):
             f = h5py.File(data_file.filename, "r")
             # This double-reads
             for ptype, field_list in sorted(ptf.items()):
                 if data_file.total_particles[ptype] == 0:
                     continue
-                x = f["/%s/Coordinates" % ptype][:, 0].astype("float64")
-                y = f["/%s/Coordinates" % ptype][:, 1].astype("float64")
-                z = f["/%s/Coordinates" % ptype][:, 2].astype("float64")
+                g = f["/%s" % ptype]
+                slabs = self._selected_slabs(data_file, g, ptype, selector)
+                if len(slabs) == 0:
+                    continue
+                coords = self._read_slabs(g["Coordinates"], slabs)
+                x = coords[:, 0].astype("float64")
+                y = coords[:, 1].astype("float64")
+                z = coords[:, 2].astype("float64")
+                del coords
                 yield ptype, (x, y, z)
             f.close()
 
+    def _count_particles_chunks(self, chunks, ptf, selector):
+        psize = defaultdict(lambda: 0)
+        for ptype, (x, y, z) in self._read_particle_coords(
+                chunks, ptf, selector):
+            psize[ptype] += selector.count_points(x, y, z, 0.0)
+        return dict(psize.items())
+
     def _read_particle_fields(self, chunks, ptf, selector):
         # Now we have all the sizes, and we can allocate
-        data_files = set([])
-        for chunk in chunks:
-            for obj in chunk.objs:
-                data_files.update(obj.data_files)
-        for data_file in sorted(data_files, key=lambda x: x.filename):
+        for data_file in self._data_files(chunks):
             f = h5py.File(data_file.filename, "r")
             for ptype, field_list in sorted(ptf.items()):
                 if data_file.total_particles[ptype] == 0:
                     continue
                 g = f["/%s" % ptype]
-                coords = g["Coordinates"][:].astype("float64")
+                slabs = self._selected_slabs(data_file, g, ptype, selector)
+                if len(slabs) == 0:
+                    continue
+                coords = self._read_slabs(g["Coordinates"], slabs)
+                coords = coords.astype("float64")
                 mask = selector.select_points(
                     coords[:, 0], coords[:, 1], coords[:, 2], 0.0)
                 del coords
@@ -102,15 +168,17 @@ class IOHandlerGadgetHDF5(BaseIOHandler):
 
                     elif field in self._element_names:
                         rfield = 'ElementAbundance/' + field
-                        data = g[rfield][:][mask, ...]
+                        data = self._read_slabs(g[rfield], slabs)[mask, ...]
                     elif field.startswith("Metallicity_"):
                         col = int(field.rsplit("_", 1)[-1])
-                        data = g["Metallicity"][:, col][mask]
+                        data = self._read_slabs(
+                            g["Metallicity"], slabs, col)[mask]
                     elif field.startswith("Chemistry_"):
                         col = int(field.rsplit("_", 1)[-1])
-                        data = g["ChemistryAbundances"][:, col][mask]
+                        data = self._read_slabs(
+                            g["ChemistryAbundances"], slabs, col)[mask]
                     else:
-                        data = g[field][:][mask, ...]
+                        data = self._read_slabs(g[field], slabs)[mask, ...]
 
                     yield (ptype, field), data
             f.close()
@@ -236,6 +304,7 @@ class IOHandlerGadgetBinary(BaseIOHandler):
 
     _var_mass = None
     _format = None
+    _particle_ranges_supported = True
 
     def __init__(self, ds, *args, **kwargs):
         self._vector_fields = dict(self._vector_fields)
@@ -246,6 +315,10 @@ class IOHandlerGadgetBinary(BaseIOHandler):
         # gadget format 1 original, 2 with block name
         self._format = gformat[0]
         self._endian = gformat[1]
+        # This is set here rather than while indexing, which is skipped when
+        # the index comes from its sidecar file or is built in other
+        # processes.
+        self._float_type = ds._validate_header(ds.parameter_filename)[1]
         super(IOHandlerGadgetBinary, self).__init__(ds, *args, **kwargs)
 
     @property
@@ -271,10 +344,12 @@ class IOHandlerGadgetBinary(BaseIOHandler):
             tp = data_file.total_particles
             f = open(data_file.filename, "rb")
             for ptype in ptf:
-                # This is where we could implement sub-chunking
-                f.seek(poff[ptype, "Coordinates"], os.SEEK_SET)
-                pos = self._read_field_from_file(f,
-                                                 tp[ptype], "Coordinates")
+                if tp[ptype] == 0:
+                    continue
+                pos = self._read_field_slabs(f, data_file,
+                                             poff[ptype, "Coordinates"],
+                                             data_file._particle_slabs(ptype),
+                                             "Coordinates")
                 yield ptype, (pos[:, 0], pos[:, 1], pos[:, 2])
             f.close()
 
@@ -288,9 +363,12 @@ class IOHandlerGadgetBinary(BaseIOHandler):
             tp = data_file.total_particles
             f = open(data_file.filename, "rb")
             for ptype, field_list in sorted(ptf.items()):
-                f.seek(poff[ptype, "Coordinates"], os.SEEK_SET)
-                pos = self._read_field_from_file(f,
-                                                 tp[ptype], "Coordinates")
+                if tp[ptype] == 0:
+                    continue
+                slabs = data_file._particle_slabs(ptype)
+                pos = self._read_field_slabs(f, data_file,
+                                             poff[ptype, "Coordinates"],
+                                             slabs, "Coordinates")
                 mask = selector.select_points(
                     pos[:, 0], pos[:, 1], pos[:, 2], 0.0)
                 del pos
@@ -304,22 +382,49 @@ class IOHandlerGadgetBinary(BaseIOHandler):
                         data[:] = m
                         yield (ptype, field), data
                         continue
-                    f.seek(poff[ptype, field], os.SEEK_SET)
-                    data = self._read_field_from_file(f, tp[ptype], field)
+                    data = self._read_field_slabs(f, data_file,
+                                                  poff[ptype, field],
+                                                  slabs, field)
                     data = data[mask, ...]
                     yield (ptype, field), data
             f.close()
 
-    def _read_field_from_file(self, f, count, name):
+    def _read_field_at(self, f, data_file, offset, count, name):
+        if self._use_memmap:
+            return self._read_field_from_file(
+                None, count, name, (data_file.filename, offset))
+        f.seek(offset, os.SEEK_SET)
+        return self._read_field_from_file(f, count, name)
+
+    def _read_field_slabs(self, f, data_file, offset, slabs, name):
+        # Reads the particles in the (start, stop) ranges slabs of the block
+        # of field name that begins offset bytes into the file.
+        size = np.dtype(self._field_dtype(name)).itemsize * \
+            self._vector_fields.get(name, 1)
+        arrs = [self._read_field_at(f, data_file, offset + start * size,
+                                    stop - start, name)
+                for start, stop in slabs if stop > start]
+        if len(arrs) == 1:
+            return arrs[0]
+        return np.concatenate(arrs)
+
+    def _field_dtype(self, name):
+        if name == "ParticleIDs":
+            return self._endian + "u4"
+        return self._endian + self._float_type
+
+    def _read_field_from_file(self, f, count, name, mapped=None):
+        # If mapped is given as (filename, offset), the field is returned as
+        # a view of the memory-mapped file rather than read from f.
         if count == 0:
             return
-        if name == "ParticleIDs":
-            dt = self._endian + "u4"
-        else:
-            dt = self._endian + self._float_type
+        dt = self._field_dtype(name)
         if name in self._vector_fields:
             count *= self._vector_fields[name]
-        arr = np.fromfile(f, dtype=dt, count=count)
+        if mapped is not None:
+            arr = self._map_array(mapped[0], mapped[1], dt, count)
+        else:
+            arr = np.fromfile(f, dtype=dt, count=count)
         if name in self._vector_fields:
             factor = self._vector_fields[name]
             arr = arr.reshape((count // factor, factor), order="C")
@@ -327,14 +432,17 @@ class IOHandlerGadgetBinary(BaseIOHandler):
 
     def _get_morton_from_position(self, data_file, count, offset_count,
                                   regions, DLE, DRE):
-        with open(data_file.filename, "rb") as f:
-            # We add on an additionally 4 for the first record.
-            f.seek(data_file._position_offset + 4 + offset_count * 12)
-            # The first total_particles * 3 values are positions
-            pp = np.fromfile(f, dtype=self._endian + self._float_type,
-                             count=count * 3)
-            pp.shape = (count, 3)
-            pp = pp.astype(self._float_type)
+        # We add on an additionally 4 for the first record.
+        offset = data_file._position_offset + 4 + offset_count * 12
+        dt = self._endian + self._float_type
+        if self._use_memmap:
+            pp = self._map_array(data_file.filename, offset, dt, count * 3)
+        else:
+            with open(data_file.filename, "rb") as f:
+                f.seek(offset)
+                # The first total_particles * 3 values are positions
+                pp = np.fromfile(f, dtype=dt, count=count * 3)
+        pp = pp.reshape((count, 3)).astype(self._float_type)
         regions.add_data_file(pp, data_file.file_id,
                                   data_file.ds.filter_bbox)
         morton = compute_morton(pp[:, 0], pp[:, 1], pp[:, 2], DLE, DRE,
@@ -344,7 +452,6 @@ class IOHandlerGadgetBinary(BaseIOHandler):
     def _initialize_index(self, data_file, regions):
         DLE = data_file.ds.domain_left_edge
         DRE = data_file.ds.domain_right_edge
-        self._float_type = data_file.ds._validate_header(data_file.filename)[1]
         if self.index_ptype == "all":
             count = sum(data_file.total_particles.values())
             return self._get_morton_from_position(
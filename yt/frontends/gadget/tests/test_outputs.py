@@ -15,13 +15,20 @@ Gadget frontend tests
 #-----------------------------------------------------------------------------
 
 from collections import OrderedDict
+import os
 
-from yt.testing import requires_file
+import numpy as np
+
+from yt.config import ytcfg
+from yt.testing import \
+    assert_equal, \
+    requires_file
 from yt.utilities.answer_testing.framework import \
     data_dir_load, \
     requires_ds, \
     sph_answer
 from yt.frontends.gadget.api import GadgetHDF5Dataset, GadgetDataset
+from yt.frontends.gadget.io import IOHandlerGadgetBinary
 
 isothermal_h5 = "IsothermalCollapse/snap_505.hdf5"
 isothermal_bin = "IsothermalCollapse/snap_505"
@@ -87,3 +94,114 @@ def test_pid_uniqueness():
     ad = ds.all_data()
     pid = ad['ParticleIDs']
     assert len(pid) == len(set(pid.v))
+
+
+@requires_file(isothermal_bin)
+def test_gadget_binary_memmap():
+    fields = [("Gas", "Coordinates"), ("Gas", "Velocities"),
+              ("Gas", "ParticleIDs"), ("Gas", "Density"),
+              ("Gas", "SmoothingLength")]
+    values = []
+    options = ("memmap_particle_files", "skip_dataset_cache",
+               "particle_index_cache")
+    old = [ytcfg.get("yt", option) for option in options]
+    # Skip the dataset cache and the index sidecar, so that each pass makes
+    # its own IO handler and indexes the file with it.
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    ytcfg["yt", "particle_index_cache"] = "False"
+    try:
+        for memmap in ["False", "True"]:
+            ytcfg["yt", "memmap_particle_files"] = memmap
+            ds = data_dir_load(isothermal_bin, cls=GadgetDataset,
+                               kwargs=iso_kwargs)
+            sp = ds.sphere("c", (0.5, "code_length"))
+            values.append([sp[field] for field in fields])
+            io = ds.index.io
+            assert_equal(io._use_memmap, memmap == "True")
+            assert_equal(len(io._memmaps) > 0, memmap == "True")
+            ds.close()
+            assert_equal(len(io._memmaps), 0)
+    finally:
+        for option, value in zip(options, old):
+            ytcfg["yt", option] = value
+    for v1, v2 in zip(*values):
+        assert_equal(v1, v2)
+
+
+snap_33 = "snapshot_033/snap_033.0.hdf5"
+
+@requires_file(snap_33)
+def test_gadget_hdf5_slab_reads():
+    ds = data_dir_load(snap_33)
+    io = ds.index.io
+    fields = [("PartType0", "Coordinates"), ("PartType0", "Density"),
+              ("PartType0", "Masses"), ("PartType1", "ParticleIDs")]
+    c = ds.domain_center
+    w = 0.05 * ds.domain_width
+    # Count the bytes actually read from the particle datasets.
+    nbytes = [0]
+    read_slabs = io._read_slabs
+    def _read_slabs(dset, slabs, col=None):
+        data = read_slabs(dset, slabs, col)
+        nbytes[0] += data.nbytes
+        return data
+    def _read(max_fraction):
+        nbytes[0] = 0
+        io._max_partial_fraction = max_fraction
+        try:
+            values = [[dobj[field] for field in fields]
+                      for dobj in (ds.region(c, c - w, c + w),
+                                   ds.sphere(c, w[0]))]
+        finally:
+            del io._max_partial_fraction
+        return values, nbytes[0]
+    for data_file in ds.index.data_files:
+        data_file.cell_ranges.clear()
+    io._read_slabs = _read_slabs
+    # Use the cell ranges however unsorted the files are.
+    io._max_cell_range_coverage = np.inf
+    try:
+        # Always read whole files, then read just the selected ranges.
+        full, full_bytes = _read(-1.0)
+        part, part_bytes = _read(1.0)
+    finally:
+        del io._read_slabs, io._max_cell_range_coverage
+    assert 0 < part_bytes < full_bytes
+    for values1, values2 in zip(full, part):
+        for v1, v2 in zip(values1, values2):
+            assert_equal(v1, v2)
+
+
+@requires_file(isothermal_bin)
+def test_gadget_binary_index_cache():
+    # Datasets indexed from the sidecar file never call _initialize_index,
+    # so their IO handlers mustn't need it to read fields.
+    fields = [("Gas", "Coordinates"), ("Gas", "Density"),
+              ("Gas", "ParticleIDs")]
+    options = ("skip_dataset_cache", "particle_index_cache")
+    old = [ytcfg.get("yt", option) for option in options]
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    ytcfg["yt", "particle_index_cache"] = "True"
+    initialize_index = vars(IOHandlerGadgetBinary)["_initialize_index"]
+    calls = []
+    def _initialize_index(self, data_file, regions):
+        calls.append(data_file.filename)
+        return initialize_index(self, data_file, regions)
+    IOHandlerGadgetBinary._initialize_index = _initialize_index
+    values = []
+    try:
+        for i in range(2):
+            del calls[:]
+            ds = data_dir_load(isothermal_bin, cls=GadgetDataset,
+                               kwargs=iso_kwargs)
+            sp = ds.sphere("c", (0.5, "code_length"))
+            values.append([sp[field] for field in fields])
+            fn = ds.index.index_cache_filename
+            if i == 1 and os.path.isfile(fn):
+                assert_equal(len(calls), 0)
+    finally:
+        IOHandlerGadgetBinary._initialize_index = initialize_index
+        for option, value in zip(options, old):
+            ytcfg["yt", option] = value
+    for v1, v2 in zip(*values):
+        assert_equal(v1, v2)
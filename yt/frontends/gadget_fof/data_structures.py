@@ -43,6 +43,8 @@ from yt.utilities.logger import ytLogger as \
     mylog
 
 class GadgetFOFParticleIndex(ParticleIndex):
+    _prefetch_supported = False
+
     def __init__(self, ds, dataset_type):
         super(GadgetFOFParticleIndex, self).__init__(ds, dataset_type)
 
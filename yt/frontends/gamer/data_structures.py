@@ -193,6 +193,7 @@ class GAMERDataset(Dataset):
     _group_grid       = None
     _group_particle   = None
     _debug            = False # debug mode for the GAMER frontend
+    _prefilter_hdf5_groups = ("Info",)
 
     def __init__(self, filename,
                  dataset_type      = 'gamer',
@@ -16,6 +16,8 @@ GAMER-specific IO functions
 import numpy as np
 from itertools import groupby
 
+from yt.data_objects.grid_patch import \
+    particle_grids
 from yt.utilities.io_handler import \
     BaseIOHandler
 from yt.utilities.logger import ytLogger as mylog
@@ -35,6 +37,7 @@ def grid_sequences(grids):
         yield seq
 
 def particle_sequences(grids):
+    grids = particle_grids(grids)
     for k, g in groupby( enumerate(grids), lambda i_x:i_x[0]-i_x[1].id ):
         seq = list(v[1] for v in g)
         yield seq[0], seq[-1]
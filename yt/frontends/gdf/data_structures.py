@@ -178,6 +178,7 @@ class GDFHierarchy(GridIndex):
 class GDFDataset(Dataset):
     _index_class = GDFHierarchy
     _field_info_class = GDFFieldInfo
+    _prefilter_hdf5_groups = ("gridded_data_format",)
 
     def __init__(self, filename, dataset_type='grid_data_format',
                  storage_filename=None, geometry=None,
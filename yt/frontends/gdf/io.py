@@ -30,6 +30,15 @@ def _field_dname(grid_id, field_name):
     return "%s/%s" % (_grid_dname(grid_id), field_name)
 
 
+def _make_grid_reader(dg, grid):
+    def _read(out):
+        if out is None:
+            out = np.empty(grid.ActiveDimensions, dtype="float64")
+        dg.read(h5py.h5s.ALL, h5py.h5s.ALL, out)
+        return out
+    return _read
+
+
 # TODO all particle bits were removed
 class IOHandlerGDFHDF5(BaseIOHandler):
     _dataset_type = "grid_data_format"
@@ -86,18 +95,24 @@ class IOHandlerGDFHDF5(BaseIOHandler):
                                     dtype="float64")
                     data_view = data.swapaxes(0, 2)
                 else:
-                    # check the dtype instead
-                    data_view = data = np.empty(grid.ActiveDimensions,
-                                                dtype="float64")
+                    data = None
                 for field in fields:
                     ftype, fname = field
                     if version < '3':
                         dg = h5py.h5d.open(fid, _field_dname(grid.id, fname))
                     else:
                         dg = h5py.h5d.open(fid, bytes(_field_dname(grid.id, fname),'utf-8'))
+                    if data is None:
+                        # The on-disk layout matches ours, so fully selected
+                        # grids are read directly into rv[field].
+                        nd = self._read_into_selection(
+                            grid, selector, rv[field], ind,
+                            _make_grid_reader(dg, grid))
+                        continue
                     dg.read(h5py.h5s.ALL, h5py.h5s.ALL, data)
                     # caches
-                    nd = grid.select(selector, data_view, rv[field], ind)
+                    nd = self._select_into(grid, selector, data_view,
+                                           rv[field], ind)
                 ind += nd    # I don't get that part, only last nd is added
             if fid is not None:
                 fid.close()
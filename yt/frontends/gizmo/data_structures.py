@@ -24,6 +24,7 @@ from .fields import \
 
 class GizmoDataset(GadgetHDF5Dataset):
     _field_info_class = GizmoFieldInfo
+    _prefilter_hdf5_groups = ("Header", "PartType0")
 
     @classmethod
     def _is_valid(self, *args, **kwargs):
@@ -64,6 +64,7 @@ class MoabHex8Hierarchy(UnstructuredIndex):
 class MoabHex8Dataset(Dataset):
     _index_class = MoabHex8Hierarchy
     _field_info_class = MoabFieldInfo
+    _prefilter_suffixes = (".h5m",)
     periodicity = (False, False, False)
 
     def __init__(self, filename, dataset_type='moab_hex8',
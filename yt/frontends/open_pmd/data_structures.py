@@ -395,6 +395,7 @@ class OpenPMDDataset(Dataset):
     """
     _index_class = OpenPMDHierarchy
     _field_info_class = OpenPMDFieldInfo
+    _prefilter_hdf5_attrs = opmd_required_attributes
 
     def __init__(self,
                  filename,
@@ -606,6 +607,7 @@ class OpenPMDDatasetSeries(DatasetSeries):
 class OpenPMDGroupBasedDataset(Dataset):
     _index_class = OpenPMDHierarchy
     _field_info_class = OpenPMDFieldInfo
+    _prefilter_hdf5_attrs = opmd_required_attributes
 
     def __new__(cls, *args, **kwargs):
         ret = object.__new__(OpenPMDDatasetSeries)
@@ -30,6 +30,7 @@ class OWLSDataset(GadgetHDF5Dataset):
     _particle_mass_name = "Mass"
     _field_info_class = OWLSFieldInfo
     _time_readin = "Time_GYR"
+    _prefilter_hdf5_groups = ("Constants", "Header", "Parameters", "Units")
 
 
     def _parse_parameter_file(self):
@@ -106,6 +106,8 @@ class OWLSSubfindDataset(Dataset):
     _file_class = OWLSSubfindHDF5File
     _field_info_class = OWLSSubfindFieldInfo
     _suffix = ".hdf5"
+    _prefilter_hdf5_groups = ("Constants", "Header", "Parameters", "Units",
+                              "FOF")
 
     def __init__(self, filename, dataset_type="subfind_hdf5",
                  n_ref = 16, over_refine_factor = 1, units_override=None,
@@ -50,6 +50,10 @@ class RockstarDataset(Dataset):
     _file_class = RockstarBinaryFile
     _field_info_class = RockstarFieldInfo
     _suffix = ".bin"
+    _prefilter_suffixes = (".bin",)
+    # The magic number 0xfadedacec0c0d0d0 in either byte order.
+    _prefilter_magic = (b"\xd0\xd0\xc0\xc0\xce\xda\xde\xfa",
+                        b"\xfa\xde\xda\xce\xc0\xc0\xd0\xd0")
 
     def __init__(self, filename, dataset_type="rockstar_binary",
                  n_ref = 16, over_refine_factor = 1,
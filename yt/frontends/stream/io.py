@@ -59,7 +59,7 @@ class IOHandlerStream(BaseIOHandler):
             for chunk in chunks:
                 for g in chunk.objs:
                     ds = self.fields[g.id][ftype, fname]
-                    ind += g.select(selector, ds, rv[field], ind) # caches
+                    ind += self._select_into(g, selector, ds, rv[field], ind)
         return rv
 
     def _read_particle_coords(self, chunks, ptf):
@@ -69,6 +69,18 @@ class IOHandlerTipsyBinary(BaseIOHandler):
         self._aux_fields = []
         super(IOHandlerTipsyBinary, self).__init__(*args, **kwargs)
 
+    # The domain is only known once the data files have been opened, and the
+    # index may come from its sidecar file or from other processes without
+    # _initialize_index ever running here, so the edges are looked up when
+    # they are used.
+    @property
+    def domain_left_edge(self):
+        return self.ds.domain_left_edge.in_units("code_length").ndarray_view()
+
+    @property
+    def domain_right_edge(self):
+        return self.ds.domain_right_edge.in_units("code_length").ndarray_view()
+
     def _read_fluid_selection(self, chunks, selector, fields, size):
         raise NotImplementedError
 
@@ -94,10 +106,10 @@ class IOHandlerTipsyBinary(BaseIOHandler):
                 rv[field][:] = vals[field][mask]
             if field == "Coordinates":
                 eps = np.finfo(rv[field].dtype).eps
+                DLE, DRE = self.domain_left_edge, self.domain_right_edge
                 for i in range(3):
                     rv[field][:, i] = np.clip(rv[field][:, i],
-                                              self.domain_left_edge[i] + eps,
-                                              self.domain_right_edge[i] - eps)
+                                              DLE[i] + eps, DRE[i] - eps)
         return rv
 
     def _read_particle_coords(self, chunks, ptf):
@@ -115,7 +127,8 @@ class IOHandlerTipsyBinary(BaseIOHandler):
                 total = 0
                 while total < tp[ptype]:
                     count = min(self._chunksize, tp[ptype] - total)
-                    p = np.fromfile(f, self._pdtypes[ptype], count=count)
+                    p = self._read_records(f, data_file, poff[ptype], total,
+                                           self._pdtypes[ptype], count)
                     total += p.size
                     d = [p["Coordinates"][ax].astype("float64")
                          for ax in 'xyz']
@@ -151,7 +164,8 @@ class IOHandlerTipsyBinary(BaseIOHandler):
                 total = 0
                 while total < tp[ptype]:
                     count = min(self._chunksize, tp[ptype] - total)
-                    p = np.fromfile(f, self._pdtypes[ptype], count=count)
+                    p = self._read_records(f, data_file, poff[ptype], total,
+                                           self._pdtypes[ptype], count)
 
                     auxdata = []
                     for afield in afields:
@@ -193,6 +207,16 @@ class IOHandlerTipsyBinary(BaseIOHandler):
             for fh in list(aux_fh.values()):
                 fh.close()
 
+    def _read_records(self, f, data_file, offset, start, dtype, count):
+        # Reads count records of dtype, the first of which is record number
+        # start after offset.  Without memory-mapping, f must already be
+        # positioned there.
+        if self._use_memmap:
+            return self._map_array(data_file.filename,
+                                   offset + start * dtype.itemsize,
+                                   dtype, count)
+        return np.fromfile(f, dtype, count=count)
+
     def _update_domain(self, data_file):
         '''
         This method is used to determine the size needed for a box that will
@@ -245,20 +269,20 @@ class IOHandlerTipsyBinary(BaseIOHandler):
                           dtype="uint64")
         ind = 0
         DLE, DRE = ds.domain_left_edge, ds.domain_right_edge
-        self.domain_left_edge = DLE.in_units("code_length").ndarray_view()
-        self.domain_right_edge = DRE.in_units("code_length").ndarray_view()
         with open(data_file.filename, "rb") as f:
             f.seek(ds._header_offset)
+            offset = ds._header_offset
             for iptype, ptype in enumerate(self._ptypes):
                 # We'll just add the individual types separately
                 count = data_file.total_particles[ptype]
                 if count == 0:
                     continue
+                start = ind
                 stop = ind + count
                 while ind < stop:
                     c = min(CHUNKSIZE, stop - ind)
-                    pp = np.fromfile(f, dtype=self._pdtypes[ptype],
-                                     count=c)
+                    pp = self._read_records(f, data_file, offset, ind - start,
+                                            self._pdtypes[ptype], c)
                     mis = np.empty(3, dtype="float64")
                     mas = np.empty(3, dtype="float64")
                     for axi, ax in enumerate('xyz'):
@@ -277,6 +301,7 @@ class IOHandlerTipsyBinary(BaseIOHandler):
                         pos[:, 0], pos[:, 1], pos[:, 2],
                         DLE, DRE, data_file.ds.filter_bbox)
                     ind += c
+                offset += count * self._pdtypes[ptype].itemsize
         mylog.info("Adding %0.3e particles", morton.size)
         return morton
 
@@ -15,7 +15,9 @@ Tipsy tests using the AGORA dataset
 #-----------------------------------------------------------------------------
 
 from collections import OrderedDict
+import os
 
+from yt.config import ytcfg
 from yt.testing import \
     assert_equal, \
     requires_file
@@ -27,6 +29,7 @@ from yt.utilities.answer_testing.framework import \
     FieldValuesTest, \
     PixelizedProjectionValuesTest
 from yt.frontends.tipsy.api import TipsyDataset
+from yt.frontends.tipsy.io import IOHandlerTipsyBinary
 
 _fields = (("deposit", "all_density"),
            ("deposit", "all_count"),
@@ -115,8 +118,71 @@ def test_tipsy_galaxy():
         test_tipsy_galaxy.__name__ = test.description
         yield test
 
+@requires_file(tipsy_gal)
+def test_tipsy_memmap():
+    fields = [("Gas", "Coordinates"), ("Gas", "Density"),
+              ("Stars", "Metals"), ("DarkMatter", "Mass")]
+    values = []
+    options = ("memmap_particle_files", "skip_dataset_cache",
+               "particle_index_cache")
+    old = [ytcfg.get("yt", option) for option in options]
+    # Skip the dataset cache and the index sidecar, so that each pass makes
+    # its own IO handler and indexes the file with it.
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    ytcfg["yt", "particle_index_cache"] = "False"
+    try:
+        for memmap in ["False", "True"]:
+            ytcfg["yt", "memmap_particle_files"] = memmap
+            ds = data_dir_load(tipsy_gal, cls=TipsyDataset)
+            sp = ds.sphere("c", (20.0, "kpc"))
+            values.append([sp[field] for field in fields])
+            io = ds.index.io
+            assert_equal(io._use_memmap, memmap == "True")
+            assert_equal(len(io._memmaps) > 0, memmap == "True")
+            ds.close()
+            assert_equal(len(io._memmaps), 0)
+    finally:
+        for option, value in zip(options, old):
+            ytcfg["yt", option] = value
+    for v1, v2 in zip(*values):
+        assert_equal(v1, v2)
+
 @requires_file(gasoline_dmonly)
 @requires_file(pkdgrav)
 def test_TipsyDataset():
     assert isinstance(data_dir_load(pkdgrav), TipsyDataset)
     assert isinstance(data_dir_load(gasoline_dmonly), TipsyDataset)
+
+
+@requires_file(tipsy_gal)
+def test_tipsy_index_cache():
+    # Datasets indexed from the sidecar file never call _initialize_index,
+    # so their IO handlers mustn't need it to read fields.
+    fields = [("Gas", "Coordinates"), ("Gas", "Density"),
+              ("Stars", "Metals")]
+    options = ("skip_dataset_cache", "particle_index_cache")
+    old = [ytcfg.get("yt", option) for option in options]
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    ytcfg["yt", "particle_index_cache"] = "True"
+    initialize_index = vars(IOHandlerTipsyBinary)["_initialize_index"]
+    calls = []
+    def _initialize_index(self, data_file, regions):
+        calls.append(data_file.filename)
+        return initialize_index(self, data_file, regions)
+    IOHandlerTipsyBinary._initialize_index = _initialize_index
+    values = []
+    try:
+        for i in range(2):
+            del calls[:]
+            ds = data_dir_load(tipsy_gal, cls=TipsyDataset)
+            sp = ds.sphere("c", (20.0, "kpc"))
+            values.append([sp[field] for field in fields])
+            fn = ds.index.index_cache_filename
+            if i == 1 and os.path.isfile(fn):
+                assert_equal(len(calls), 0)
+    finally:
+        IOHandlerTipsyBinary._initialize_index = initialize_index
+        for option, value in zip(options, old):
+            ytcfg["yt", option] = value
+    for v1, v2 in zip(*values):
+        assert_equal(v1, v2)
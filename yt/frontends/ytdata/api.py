@@ -16,6 +16,7 @@ API for ytData frontend
 
 from .data_structures import \
     YTDataContainerDataset, \
+    YTSortedParticleDataset, \
     YTSpatialPlotDataset, \
     YTGridDataset, \
     YTGridHierarchy, \
@@ -29,6 +30,7 @@ from .data_structures import \
 
 from .io import \
     IOHandlerYTDataContainerHDF5, \
+    IOHandlerYTSortedParticleHDF5, \
     IOHandlerYTGridHDF5, \
     IOHandlerYTSpatialPlotHDF5, \
     IOHandlerYTNonspatialhdf5
@@ -38,4 +40,5 @@ from .fields import \
     YTGridFieldInfo
 
 from .utilities import \
-    save_as_dataset
+    save_as_dataset, \
+    save_sorted_particles
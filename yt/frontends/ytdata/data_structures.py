@@ -78,6 +78,8 @@ class SavedDataset(Dataset):
     Base dataset class for products of calling save_as_dataset.
     """
     _con_attrs = ()
+    _prefilter_suffixes = (".h5",)
+    _prefilter_hdf5_attrs = ("data_type",)
 
     def _parse_parameter_file(self):
         self.refine_by = 2
@@ -340,6 +342,42 @@ class YTDataLightRayDataset(YTDataContainerDataset):
                 return True
         return False
 
+class YTSortedParticleDataset(YTDataContainerDataset):
+    """Dataset for particles saved with save_sorted_particles."""
+
+    def __init__(self, filename, dataset_type="ytsortedparticle_hdf5",
+                 n_ref = 16, over_refine_factor = 1, units_override=None,
+                 unit_system="cgs"):
+        super(YTSortedParticleDataset, self).__init__(filename,
+            dataset_type=dataset_type, n_ref=n_ref,
+            over_refine_factor=over_refine_factor,
+            units_override=units_override, unit_system=unit_system)
+
+    def _with_parameter_file_open(self, f):
+        self.num_particles = \
+          dict([(group, parse_h5_attr(f[group], "num_elements"))
+                for group in f if group not in
+                (self.default_fluid_type, "morton_index")])
+        self.index_order = parse_h5_attr(f["morton_index"], "index_order")
+
+    @property
+    def data(self):
+        """
+        Return a data container for all of the particles.
+        """
+        if self._data_obj is None:
+            self._data_obj = self.all_data()
+        return self._data_obj
+
+    @classmethod
+    def _is_valid(self, *args, **kwargs):
+        if not args[0].endswith(".h5"): return False
+        with h5py.File(args[0], "r") as f:
+            data_type = parse_h5_attr(f, "data_type")
+            if data_type == "yt_sorted_particles":
+                return True
+        return False
+
 class YTSpatialPlotDataset(YTDataContainerDataset):
     """Dataset for saved slices and projections."""
     _field_info_class = YTGridFieldInfo
@@ -654,6 +692,7 @@ class YTNonspatialGrid(AMRGridPatch):
 
 class YTNonspatialHierarchy(YTDataHierarchy):
     grid = YTNonspatialGrid
+    _prefetch_supported = False
 
     def _populate_grid_objects(self):
         for g in self.grids:
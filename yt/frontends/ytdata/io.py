@@ -16,12 +16,17 @@ YTData data-file handling function
 
 import numpy as np
 
+from collections import \
+    defaultdict
 from yt.extern.six import \
     u
 from yt.funcs import \
     mylog, \
     parse_h5_attr
+from yt.geometry.particle_geometry_handler import \
+    ParticleCellRanges
 from yt.geometry.selection_routines import \
+    AlwaysSelector, \
     GridSelector
 from yt.utilities.exceptions import \
     YTDomainOverflow
@@ -32,6 +37,9 @@ from yt.utilities.lib.geometry_utils import \
 from yt.utilities.on_demand_imports import \
     _h5py as h5py
 
+from .utilities import \
+    _morton_index_cells
+
 class IOHandlerYTNonspatialhdf5(BaseIOHandler):
     _dataset_type = "ytnonspatialhdf5"
     _base = slice(None)
@@ -277,6 +285,92 @@ class IOHandlerYTDataContainerHDF5(BaseIOHandler):
                                    for field in f[ptype]]))
         return fields, units
 
+class IOHandlerYTSortedParticleHDF5(IOHandlerYTDataContainerHDF5):
+    _dataset_type = "ytsortedparticle_hdf5"
+
+    def _get_cell_ranges(self, data_file, ptype, f):
+        ranges = data_file.cell_ranges.get(ptype, None)
+        if ranges is None:
+            order = self.ds.index_order
+            g = f["morton_index"][ptype]
+            offsets = g["offsets"].value
+            cells = _morton_index_cells(g["keys"].value, order)
+            ranges = ParticleCellRanges.from_ranges(
+                self.ds.domain_left_edge.to("code_length").d,
+                self.ds.domain_right_edge.to("code_length").d,
+                1 << order, cells, offsets[:-1], offsets[1:])
+            data_file.cell_ranges[ptype] = ranges
+        return ranges
+
+    def _selected_slabs(self, data_file, f, ptype, selector):
+        if selector is None or isinstance(selector, AlwaysSelector):
+            return [(0, data_file.total_particles[ptype])]
+        ranges = self._get_cell_ranges(data_file, ptype, f)
+        return ranges.select_ranges(selector)
+
+    def _read_positions(self, f, ptype, slabs):
+        units = _get_position_array_units(ptype, f, "x")
+        return [self.ds.arr(self._read_slabs(
+                    f[ptype]["particle_position_%s" % ax], slabs),
+                    units).to("code_length").d.astype("float64")
+                for ax in "xyz"]
+
+    def _read_particle_coords(self, chunks, ptf, selector=None):
+        chunks = list(chunks)
+        data_files = set([])
+        for chunk in chunks:
+            for obj in chunk.objs:
+                data_files.update(obj.data_files)
+        for data_file in sorted(data_files):
+            with h5py.File(data_file.filename, "r") as f:
+                for ptype, field_list in sorted(ptf.items()):
+                    if data_file.total_particles[ptype] == 0: continue
+                    slabs = self._selected_slabs(
+                        data_file, f, ptype, selector)
+                    if len(slabs) == 0: continue
+                    x, y, z = self._read_positions(f, ptype, slabs)
+                    yield ptype, (x, y, z)
+
+    def _count_particles_chunks(self, chunks, ptf, selector):
+        psize = defaultdict(lambda: 0)
+        for ptype, (x, y, z) in self._read_particle_coords(
+                chunks, ptf, selector):
+            psize[ptype] += selector.count_points(x, y, z, 0.0)
+        return dict(psize.items())
+
+    def _read_particle_fields(self, chunks, ptf, selector):
+        chunks = list(chunks)
+        data_files = set([])
+        for chunk in chunks:
+            for obj in chunk.objs:
+                data_files.update(obj.data_files)
+        for data_file in sorted(data_files):
+            with h5py.File(data_file.filename, "r") as f:
+                for ptype, field_list in sorted(ptf.items()):
+                    if data_file.total_particles[ptype] == 0: continue
+                    slabs = self._selected_slabs(
+                        data_file, f, ptype, selector)
+                    if len(slabs) == 0: continue
+                    x, y, z = self._read_positions(f, ptype, slabs)
+                    mask = selector.select_points(x, y, z, 0.0)
+                    del x, y, z
+                    if mask is None: continue
+                    for field in field_list:
+                        data = self._read_slabs(f[ptype][field], slabs)
+                        yield (ptype, field), data[mask].astype("float64")
+
+    def _identify_fields(self, data_file):
+        fields = []
+        units = {}
+        with h5py.File(data_file.filename, "r") as f:
+            for ptype in f:
+                if ptype == "morton_index": continue
+                fields.extend([(ptype, str(field)) for field in f[ptype]])
+                units.update(dict([((ptype, str(field)),
+                                    parse_h5_attr(f[ptype][field], "units"))
+                                   for field in f[ptype]]))
+        return fields, units
+
 class IOHandlerYTSpatialPlotHDF5(IOHandlerYTDataContainerHDF5):
     _dataset_type = "ytspatialplot_hdf5"
 
@@ -23,18 +23,23 @@ from yt.frontends.ytdata.api import \
     YTGridDataset, \
     YTNonspatialDataset, \
     YTProfileDataset, \
-    save_as_dataset
+    YTSortedParticleDataset, \
+    save_as_dataset, \
+    save_sorted_particles
 from yt.testing import \
     assert_array_equal, \
     assert_allclose_units, \
     assert_equal, \
     assert_fname, \
+    fake_particle_ds, \
     fake_random_ds, \
     requires_module
 from yt.utilities.answer_testing.framework import \
     requires_ds, \
     data_dir_load, \
     AnswerTestingTest
+from yt.utilities.on_demand_imports import \
+    _h5py as h5py
 from yt.units.yt_array import \
     YTArray, \
     YTQuantity
@@ -273,3 +278,47 @@ def test_plot_data():
 
     os.chdir(curdir)
     shutil.rmtree(tmpdir)
+
+@requires_module('h5py')
+def test_sorted_particles():
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+    ds = fake_particle_ds(npart=32**3)
+    fn = save_sorted_particles(ds, "sorted.h5", index_order=3)
+    sorted_ds = load(fn)
+    assert isinstance(sorted_ds, YTSortedParticleDataset)
+    io = sorted_ds.index.io
+    assert_equal(sorted_ds.data["io", "particle_mass"].size, 32**3)
+    for center, radius in [([0.3, 0.3, 0.3], 0.1), ([0.8, 0.1, 0.5], 0.3)]:
+        sp1 = ds.sphere(center, radius)
+        sp2 = sorted_ds.sphere(center, radius)
+        for field in ["particle_mass", "particle_velocity_x"]:
+            v1 = np.sort(sp1["io", field].d)
+            v2 = np.sort(sp2["io", field].d)
+            assert_array_equal(v1, v2)
+        data_file = sorted_ds.index.data_files[0]
+        slabs = io._selected_slabs(data_file, None, "io", sp2.selector)
+        assert sum(stop - start for start, stop in slabs) < 32**3
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
+
+@requires_module('h5py')
+def test_sorted_particles_outside_domain():
+    tmpdir = tempfile.mkdtemp()
+    curdir = os.getcwd()
+    os.chdir(tmpdir)
+    ds = fake_particle_ds(npart=16**3)
+    # Particles past the domain edges go into the boundary cells.
+    ad = ds.all_data()
+    ds.all_data = lambda: ad
+    ds.domain_right_edge = ds.arr([0.9, 0.9, 0.9], "code_length")
+    fn = save_sorted_particles(ds, "sorted.h5", index_order=3)
+    with h5py.File(fn, "r") as fh:
+        keys = fh["morton_index/io/keys"][:]
+        offsets = fh["morton_index/io/offsets"][:]
+        assert_equal(fh["io/particle_mass"].size, 16**3)
+    assert keys.max() < 8**3
+    assert_equal(offsets[-1], 16**3)
+    os.chdir(curdir)
+    shutil.rmtree(tmpdir)
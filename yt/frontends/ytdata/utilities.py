@@ -17,6 +17,10 @@ Utility functions for ytdata frontend.
 import numpy as np
 
 from yt.funcs import iterable
+from yt.geometry.oct_container import \
+    _ORDER_MAX
+from yt.utilities.lib.geometry_utils import \
+    compute_morton
 from yt.units.yt_array import \
     YTArray
 from yt.utilities.logger import \
@@ -151,6 +155,133 @@ def save_as_dataset(ds, filename, data, field_types=None,
             fh[field_type].attrs["num_elements"] = data[field].size
     fh.close()
 
+def save_sorted_particles(ds, filename, ptypes=None, fields=None,
+                          index_order=6):
+    r"""Export the particles of a dataset sorted along a Morton curve.
+
+    Each particle type is sorted by the Morton key of its particles'
+    positions and written to a reloadable yt dataset together with an
+    offset index: the range of particles falling in each cell of a
+    2**index_order mesh over the domain.  When reloaded, selections only
+    read the particles in the cells they overlap instead of the whole
+    snapshot.  All selected particles are held in memory while sorting.
+
+    Parameters
+    ----------
+    ds : dataset
+        The particle dataset to be sorted.
+    filename : str
+        The name of the file to be written.
+    ptypes : list of str, optional
+        The particle types to be written.  Defaults to all on-disk
+        particle types.
+    fields : list of tuples, optional
+        The fields to be written.  Defaults to all on-disk fields of the
+        chosen particle types.  Particle positions are always written.
+    index_order : int, optional
+        The number of Morton levels in the offset index, so that the index
+        has at most 2**(3*index_order) cells.  Default: 6.
+
+    Returns
+    -------
+    filename : str
+        The name of the file that has been created.
+
+    Examples
+    --------
+
+    >>> import yt
+    >>> ds = yt.load("GadgetDiskGalaxy/snapshot_200.hdf5")
+    >>> fn = yt.save_sorted_particles(ds, "snapshot_200_sorted.h5")
+    >>> sorted_ds = yt.load(fn)
+    >>> sp = sorted_ds.sphere("c", (10, "kpc"))
+    >>> print (sp["PartType0", "Density"])
+
+    """
+
+    if index_order < 1 or index_order > _ORDER_MAX:
+        raise RuntimeError("index_order must be between 1 and %d." %
+                           _ORDER_MAX)
+    if ptypes is None:
+        ptypes = ds.particle_types_raw
+    if fields is None:
+        fields = ds.field_list
+    dle = ds.domain_left_edge.to("code_length").d
+    dre = ds.domain_right_edge.to("code_length").d
+    dims = 1 << index_order
+    shift = np.uint64(3 * (_ORDER_MAX - index_order))
+    ad = ds.all_data()
+    data = {}
+    field_types = {}
+    index = {}
+    for ptype in ptypes:
+        pos = [ad[ptype, "particle_position_%s" % ax].to("code_length")
+               for ax in "xyz"]
+        if pos[0].size == 0:
+            continue
+        mylog.info("Sorting %d %s particles." % (pos[0].size, ptype))
+        # Particles that have drifted out of the domain are kept in the
+        # boundary cells nearest to them.
+        keys = compute_morton(*[np.clip(pos[i].d, dle[i], dre[i])
+                                for i in range(3)],
+                              domain_left_edge=dle, domain_right_edge=dre)
+        order = np.argsort(keys, kind="mergesort")
+        keys = keys[order] >> shift
+        cells, starts = np.unique(keys, return_index=True)
+        del keys
+        index[ptype] = (cells, np.append(starts, pos[0].size))
+        ptype_fields = [("particle_position_%s" % ax, pos[i])
+                        for i, ax in enumerate("xyz")]
+        ptype_fields.extend(
+            (fname, None) for ftype, fname in fields
+            if ftype == ptype and not fname.startswith("particle_position_"))
+        for fname, arr in ptype_fields:
+            if arr is None:
+                arr = ad[ptype, fname]
+            data[ptype, fname] = arr[order]
+            field_types[ptype, fname] = ptype
+        del pos
+
+    extra_attrs = {"data_type": "yt_sorted_particles",
+                   "container_type": "all_data"}
+    save_as_dataset(ds, filename, data, field_types=field_types,
+                    extra_attrs=extra_attrs)
+    with h5py.File(filename, "a") as fh:
+        g = fh.create_group("morton_index")
+        g.attrs["index_order"] = index_order
+        for ptype, (cells, offsets) in index.items():
+            fh[ptype].attrs["num_elements"] = offsets[-1]
+            pg = g.create_group(ptype)
+            pg.create_dataset("keys", data=cells)
+            pg.create_dataset("offsets", data=offsets)
+    return filename
+
+def _morton_index_cells(keys, order):
+    r"""Convert Morton keys of a 2**order mesh to C-order cell ids.
+
+    Parameters
+    ----------
+    keys : array of uint64
+        The Morton keys, truncated to *order* levels.
+    order : int
+        The number of levels in the keys.
+
+    Returns
+    -------
+    An int64 array of cell ids on a (2**order)**3 mesh.
+
+    """
+
+    keys = np.asarray(keys, dtype="uint64")
+    ijk = np.zeros((3, keys.size), dtype="int64")
+    one = np.uint64(1)
+    for level in range(order):
+        for ax in range(3):
+            bit = (keys >> np.uint64(3 * level + 2 - ax)) & one
+            ijk[ax] |= bit.astype("int64") << level
+    dims = 1 << order
+    return np.ravel_multi_index(ijk, (dims, dims, dims))
+
 def _hdf5_yt_array(fh, field, ds=None):
     r"""Load an hdf5 dataset as a YTArray.
 
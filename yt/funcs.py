@@ -32,7 +32,6 @@ import numpy as np
 import itertools
 import base64
 import numpy
-import matplotlib
 import getpass
 from math import floor, ceil
 from numbers import Number as numeric_type
@@ -652,6 +651,7 @@ def get_yt_version():
         return version[:12].strip().decode('utf-8')
 
 def get_version_stack():
+    import matplotlib
     version_info = {}
     version_info['yt'] = get_yt_version()
     version_info['numpy'] = numpy.version.version
@@ -805,6 +805,14 @@ def get_num_threads():
         return os.environ.get("OMP_NUM_THREADS", 0)
     return nt
 
+def get_particle_nthreads():
+    from .config import ytcfg
+    nt = ytcfg.getint("yt", "particle_nthreads")
+    if nt <= 0:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    return nt
+
 def fix_axis(axis, ds):
     return ds.coordinates.axis_id.get(axis, axis)
 
@@ -15,31 +15,51 @@ Geometry container base class.
 #-----------------------------------------------------------------------------
 
 import os
+from collections import deque
+from multiprocessing.pool import ThreadPool
 from yt.extern.six.moves import cPickle
 import weakref
 from yt.utilities.on_demand_imports import _h5py as h5py
 import numpy as np
 
 from yt.config import ytcfg
-from yt.funcs import iterable
+from yt.funcs import \
+    dummy_context_manager, \
+    ensure_list, \
+    ensure_numpy_array, \
+    iterable
 from yt.units.yt_array import \
     YTArray, uconcatenate
 from yt.utilities.io_handler import io_registry
+from yt.utilities.lib.interpolators import \
+    cic_cell_centers, \
+    cic_combine
 from yt.utilities.logger import ytLogger as mylog
 from yt.utilities.parallel_tools.parallel_analysis_interface import \
     ParallelAnalysisInterface, parallel_root_only
-from yt.utilities.exceptions import YTFieldNotFound
+from yt.utilities.exceptions import \
+    YTFieldNotFound, \
+    YTPointSamplingParticleField
 
 class Index(ParallelAnalysisInterface):
     """The base index class"""
     _global_mesh = True
     _unsupported_objects = ()
     _index_properties = ()
+    # Number of io chunks to read ahead on background threads when iterating
+    # over a data object's io chunks.  Zero disables prefetching.
+    prefetch = 0
+    _prefetch_supported = True
+    # The most bytes a single field of an io chunk may take up; larger
+    # chunks are split up.  Zero means no limit.  Set from the
+    # max_chunk_bytes configuration option.
+    max_chunk_bytes = 0
 
     def __init__(self, ds, dataset_type):
         ParallelAnalysisInterface.__init__(self)
         self.dataset = weakref.proxy(ds)
         self.ds = self.dataset
+        self.max_chunk_bytes = ytcfg.getint("yt", "max_chunk_bytes")
 
         self._initialize_state_variables()
 
@@ -221,10 +241,11 @@ class Index(ParallelAnalysisInterface):
         selector = dobj.selector
         if chunk is None:
             self._identify_base_chunk(dobj)
-        fields_to_return = self.io._read_particle_selection(
-            self._chunk_io(dobj, cache = False),
-            selector,
-            fields_to_read)
+        with self._io_read_lock():
+            fields_to_return = self.io._read_particle_selection(
+                self._chunk_io(dobj, cache = False),
+                selector,
+                fields_to_read)
         return fields_to_return, fields_to_generate
 
     def _read_fluid_fields(self, fields, dobj, chunk = None):
@@ -238,13 +259,185 @@ class Index(ParallelAnalysisInterface):
             chunk_size = dobj.size
         else:
             chunk_size = chunk.data_size
-        fields_to_return = self.io._read_fluid_selection(
-            self._chunk_io(dobj),
-            selector,
-            fields_to_read,
-            chunk_size)
+        with self._io_read_lock():
+            fields_to_return = self.io._read_fluid_selection(
+                self._chunk_io(dobj),
+                selector,
+                fields_to_read,
+                chunk_size)
         return fields_to_return, fields_to_generate
 
+    def _io_read_lock(self):
+        # Reads made by prefetch threads and by the main thread go through
+        # the same io handler, so unless it declares its reads thread-safe
+        # they are made one at a time.
+        if self.io._thread_safe_reads:
+            return dummy_context_manager()
+        return self.io._read_lock
+
+    def _read_chunk_fields(self, dobj, chunk, fluids, particles):
+        # Unlike _read_fluid_fields and _read_particle_fields, this does not
+        # touch dobj._current_chunk, so it is safe to call from a thread while
+        # dobj is busy with a different chunk.
+        rv = {}
+        with self._io_read_lock():
+            if len(fluids) > 0:
+                rv.update(self.io._read_fluid_selection(
+                    [chunk], dobj.selector, fluids, chunk.data_size))
+            if len(particles) > 0:
+                rv.update(self.io._read_particle_selection(
+                    [chunk], dobj.selector, particles))
+        return rv
+
+    def _prefetch_chunks(self, dobj, chunks, fields, nahead):
+        """
+        Iterate over the io *chunks* of *dobj*, reading the on-disk *fields*
+        for up to *nahead* chunks beyond the current one on a pool of
+        background threads.  Each chunk is yielded with a ``_prefetched``
+        attribute whose ``get`` method returns a dict of the fields read.
+        The *fields* must already be ones in the index's ``field_list``.
+        """
+        fluids, particles = [], []
+        for field in fields:
+            if self.ds._get_field_info(*field).particle_type:
+                particles.append(field)
+            else:
+                fluids.append(field)
+        pool = ThreadPool(nahead)
+        pending = deque()
+        chunks = iter(chunks)
+        try:
+            while True:
+                while len(pending) < nahead + 1:
+                    try:
+                        chunk = next(chunks)
+                    except StopIteration:
+                        break
+                    chunk._prefetched = pool.apply_async(
+                        self._read_chunk_fields,
+                        (dobj, chunk, fluids, particles))
+                    pending.append(chunk)
+                if len(pending) == 0:
+                    break
+                yield pending.popleft()
+        finally:
+            # Reads already in flight are allowed to finish.
+            pool.close()
+            pool.join()
+
+    def _find_field_values_at_points(self, fields, coords):
+        r"""Find the value of fields at a set of coordinates.
+
+        The cells of a region bounding all of the points are read once, in
+        io chunks, and the points are matched to the leaf cells of each
+        chunk level by level by sorting and searching their integer
+        coordinates.  Points outside the domain are given NaN.
+        """
+        fields = ensure_list(fields)
+        finfos = [self.ds._get_field_info(field) for field in fields]
+        ptypes = [finfo.name for finfo in finfos if finfo.particle_type]
+        if len(ptypes) > 0:
+            raise YTPointSamplingParticleField(ptypes)
+        pos = self.ds.arr(ensure_numpy_array(coords), 'code_length').d
+        pos = pos.reshape((-1, 3))
+        out = []
+        for finfo in finfos:
+            out.append(self.ds.arr(np.empty(pos.shape[0]), finfo.units))
+            out[-1][:] = np.nan
+        for chunk, pts, cells in self._match_points_to_cells(pos):
+            for field_index, field in enumerate(fields):
+                out[field_index][pts] = chunk[field][cells]
+        if len(fields) == 1:
+            return out[0]
+        return out
+
+    def _match_points_to_cells(self, pos):
+        # Yields the io chunks of a region bounding the points in pos (in
+        # code_length), along with the points found in each chunk and the
+        # leaf cells of the chunk holding them.
+        dle = self.ds.domain_left_edge.to("code_length").d
+        dre = self.ds.domain_right_edge.to("code_length").d
+        pending = np.all((pos >= dle) & (pos <= dre), axis=1)
+        if not pending.any():
+            return
+        dims = self.ds.domain_dimensions.astype("int64")
+        refine_by = self.ds.refine_by
+        # Positions in units of root-level cells.
+        rel = (pos - dle) / (dre - dle) * dims
+        # Pad by the finest cell width, computed here rather than with
+        # get_smallest_dx, which some indexes return without units.
+        pad = ((dre - dle) / (dims * refine_by**self.max_level)).min()
+        le = np.maximum(pos[pending].min(axis=0) - pad, dle)
+        re = np.minimum(pos[pending].max(axis=0) + pad, dre)
+        dobj = self.ds.region((le + re) / 2.0, le, re)
+        for chunk in dobj.chunks([], "io"):
+            ires = chunk.ires
+            if ires.size == 0:
+                continue
+            icoords = chunk.icoords
+            matches = []
+            for level in np.unique(ires):
+                todo = np.flatnonzero(pending)
+                if todo.size == 0:
+                    break
+                ldims = dims * refine_by**int(level)
+                cells = np.flatnonzero(ires == level)
+                ipos = np.floor(rel[todo] * refine_by**int(level))
+                ipos = ipos.astype("int64")
+                np.clip(ipos, 0, ldims - 1, ipos)
+                pts, found = _match_coordinates(icoords[cells], ipos)
+                if pts.size == 0:
+                    continue
+                matches.append((todo[pts], cells[found]))
+                pending[todo[pts]] = False
+            if len(matches) == 0:
+                continue
+            yield (chunk, np.concatenate([m[0] for m in matches]),
+                   np.concatenate([m[1] for m in matches]))
+            if not pending.any():
+                break
+
+    def _interpolate_field_values_at_points(self, fields, coords):
+        r"""Interpolate the values of fields to a set of coordinates.
+
+        Each point is given the cloud-in-cell average of the values at the
+        eight cell centers around it, spaced like the leaf cell holding the
+        point.  The leaf cells are found first, which reads no fields, and
+        the values at all of the cell centers are then found together, so
+        that each io chunk is read at most once.  Points outside the domain
+        are given NaN.
+        """
+        fields = ensure_list(fields)
+        pos = self.ds.arr(ensure_numpy_array(coords), 'code_length').d
+        pos = pos.reshape((-1, 3))
+        levels = np.empty(pos.shape[0], dtype="int64")
+        levels[:] = -1
+        for chunk, pts, cells in self._match_points_to_cells(pos):
+            levels[pts] = chunk.ires[cells]
+        out = []
+        for field in fields:
+            funit = self.ds._get_field_info(field).units
+            out.append(self.ds.arr(np.empty(pos.shape[0]), funit))
+            out[-1][:] = np.nan
+        found = np.flatnonzero(levels >= 0)
+        if found.size > 0:
+            dle = self.ds.domain_left_edge.to("code_length").d
+            dre = self.ds.domain_right_edge.to("code_length").d
+            ldims = self.ds.domain_dimensions.astype("float64") * \
+                float(self.ds.refine_by)**levels[found, None]
+            cpos, weights = cic_cell_centers(
+                np.ascontiguousarray(pos[found], dtype="float64"), ldims,
+                dle.astype("float64"), dre.astype("float64"))
+            vals = ensure_list(self._find_field_values_at_points(
+                fields, self.ds.arr(cpos, "code_length")))
+            for field_index in range(len(fields)):
+                v = vals[field_index].d.astype("float64")
+                out[field_index][found] = cic_combine(
+                    v.reshape((8, found.size)), weights)
+        if len(fields) == 1:
+            return out[0]
+        return out
+
     def _chunk(self, dobj, chunking_style, ngz = 0, **kwargs):
         # A chunk is either None or (grids, size)
         if dobj._current_chunk is None:
@@ -260,6 +453,24 @@ class Index(ParallelAnalysisInterface):
         else:
             raise NotImplementedError
 
+def _match_coordinates(cells, points):
+    # Finds the points whose integer coordinates are those of one of the
+    # (distinct) cells, returning the indices of the points and of their
+    # cells.  The coordinates are sorted together one dimension at a time,
+    # with each cell placed before the points it holds, rather than as
+    # single keys, which overflow int64 on deep levels.
+    ncells = cells.shape[0]
+    coords = np.concatenate([cells, points])
+    is_point = np.arange(coords.shape[0]) >= ncells
+    order = np.lexsort((is_point, coords[:, 2], coords[:, 1], coords[:, 0]))
+    coords = coords[order]
+    # The last cell at or before each position in the sorted order.
+    last = np.where(is_point[order], -1, np.arange(order.size))
+    last = np.maximum.accumulate(last)
+    sel = is_point[order] & (last >= 0)
+    sel[sel] = (coords[sel] == coords[last[sel]]).all(axis=1)
+    return order[sel] - ncells, order[last[sel]]
+
 def cached_property(func):
     n = '_%s' % func.__name__
     def cached_func(self):
@@ -16,17 +16,20 @@ from __future__ import print_function
 
 from yt.utilities.on_demand_imports import _h5py as h5py
 import numpy as np
+import os
 import weakref
 
 from collections import defaultdict
 
 from yt.arraytypes import blankRecordArray
 from yt.config import ytcfg
+from yt.data_objects.grid_patch import split_grid
 from yt.funcs import \
     ensure_list, ensure_numpy_array
 from yt.geometry.geometry_handler import \
     Index, YTDataChunk, ChunkDataCache
 from yt.utilities.definitions import MAXLEVEL
+from yt.utilities.lib.particle_mesh_operations import CICSample_3
 from yt.utilities.logger import ytLogger as mylog
 from .grid_container import \
     GridTree, MatchPointsToGrids
@@ -39,6 +42,13 @@ class GridIndex(Index):
     _index_properties = ("grid_left_edge", "grid_right_edge",
                          "grid_levels", "grid_particle_count",
                          "grid_dimensions")
+    # Indices that can rebuild their grid objects from the grid arrays set
+    # this, and implement _grid_metadata and _restore_grid_objects, so that
+    # the grid arrays are kept in the data storage file (see the serialize
+    # option) and the index is not parsed again the next time.  Increase
+    # the version when what is stored changes.
+    _cache_grid_metadata = False
+    _grid_metadata_version = 1
 
     def _setup_geometry(self):
         mylog.debug("Counting grids.")
@@ -47,15 +57,81 @@ class GridIndex(Index):
         mylog.debug("Initializing grid arrays.")
         self._initialize_grid_arrays()
 
-        mylog.debug("Parsing index.")
-        self._parse_index()
+        if self._load_grid_metadata():
+            mylog.debug("Restored grid objects from the data storage file.")
+        else:
+            mylog.debug("Parsing index.")
+            self._parse_index()
+
+            mylog.debug("Constructing grid objects.")
+            self._populate_grid_objects()
 
-        mylog.debug("Constructing grid objects.")
-        self._populate_grid_objects()
+            self._save_grid_metadata()
 
         mylog.debug("Re-examining index")
         self._initialize_level_stats()
 
+    @property
+    def _grid_metadata_node(self):
+        return "/grid_metadata/%s" % self.__class__.__name__
+
+    def _grid_metadata_source(self):
+        # The file the index is parsed from.
+        return getattr(self, "index_filename", self.ds.parameter_filename)
+
+    def _grid_metadata_key(self):
+        # Stored grid metadata is only used if none of these have changed.
+        key = [self._grid_metadata_version, self.num_grids]
+        fn = self._grid_metadata_source()
+        if fn is not None and os.path.exists(fn):
+            st = os.stat(fn)
+            key += [st.st_mtime, st.st_size]
+        return np.array(key, dtype="float64")
+
+    def _grid_metadata(self):
+        """
+        Returns a dict of the arrays, besides the ones in _index_properties,
+        that _restore_grid_objects needs.
+        """
+        raise NotImplementedError
+
+    def _restore_grid_objects(self, metadata):
+        """
+        Sets up the grid objects, as _parse_index and _populate_grid_objects
+        do, from the dict of arrays returned by _grid_metadata.  The arrays
+        in _index_properties have already been filled in.
+        """
+        raise NotImplementedError
+
+    def _load_grid_metadata(self):
+        if not self._cache_grid_metadata or self._data_file is None:
+            return False
+        node = self._grid_metadata_node
+        key = self.get_data(node, "key")
+        if key is None or not np.array_equal(key, self._grid_metadata_key()):
+            return False
+        group = self._data_file[node]
+        metadata = dict((name, group[name][()]) for name in group
+                        if name != "key")
+        for attr in self._index_properties:
+            getattr(self, attr)[:] = metadata.pop(attr)
+        self._restore_grid_objects(metadata)
+        return True
+
+    def _save_grid_metadata(self):
+        if not self._cache_grid_metadata or self._data_mode != 'a':
+            return
+        node = self._grid_metadata_node
+        metadata = self._grid_metadata()
+        for attr in self._index_properties:
+            metadata[attr] = np.asarray(getattr(self, attr))
+        # The key is written last, so that the stored metadata is not used
+        # if this is interrupted.
+        self.save_data(np.zeros(0), node, "key", force=True)
+        for name, arr in sorted(metadata.items()):
+            self.save_data(arr, node, name, force=True)
+        self.save_data(self._grid_metadata_key(), node, "key", force=True)
+
     def __del__(self):
         del self.grid_dimensions
         del self.grid_left_edge
@@ -206,35 +282,81 @@ class GridIndex(Index):
         (x, y, z) points. Returns a numpy array of field values cross coords
         """
         coords = self.ds.arr(ensure_numpy_array(coords), 'code_length')
-        grids = self._find_points(coords[:, 0], coords[:, 1], coords[:, 2])[0]
+        pos = coords.d.reshape((-1, 3))
         fields = ensure_list(fields)
-        mark = np.zeros(3, dtype=np.int)
+
         out = []
+        for field in fields:
+            funit = self.ds._get_field_info(field).units
+            out.append(self.ds.arr(np.empty((pos.shape[0])), funit))
+            out[-1][:] = np.nan
+
+        for grid, pts in self._group_points_by_grid(pos):
+            cached = set(grid.field_data.keys())
+            mark = (pos[pts] - grid.LeftEdge.d) / grid.dds.d
+            mark = mark.astype("int64")
+            np.clip(mark, 0, grid.ActiveDimensions - 1, mark)
+            for field_index, field in enumerate(fields):
+                out[field_index][pts] = \
+                    grid[field][mark[:, 0], mark[:, 1], mark[:, 2]]
+            # Don't let sampling many points fill up every grid's cache.
+            for key in list(grid.field_data.keys()):
+                if key not in cached:
+                    grid.field_data.pop(key)
+        if len(fields) == 1:
+            return out[0]
+        return out
+
+    def _interpolate_field_values_at_points(self, fields, coords):
+        r"""Interpolate the values of fields to a set of coordinates.
 
-        # create point -> grid mapping
-        grid_index = {}
-        for coord_index, grid in enumerate(grids):
-            if grid not in grid_index:
-                grid_index[grid] = []
-            grid_index[grid].append(coord_index)
+        The points are grouped by the leaf grid holding them.  Each of these
+        grids is read once, with a layer of ghost zones, and its points are
+        given the cloud-in-cell average of the eight cell centers around
+        them.  Points outside of every grid are given NaN.
+        """
+        coords = self.ds.arr(ensure_numpy_array(coords), 'code_length')
+        pos = coords.d.reshape((-1, 3))
+        fields = ensure_list(fields)
 
         out = []
         for field in fields:
             funit = self.ds._get_field_info(field).units
-            out.append(self.ds.arr(np.empty((len(coords))), funit))
-
-        for grid in grid_index:
-            cellwidth = (grid.RightEdge - grid.LeftEdge) / grid.ActiveDimensions
+            out.append(self.ds.arr(np.empty((pos.shape[0])), funit))
+            out[-1][:] = np.nan
+
+        for grid, pts in self._group_points_by_grid(pos):
+            cube = grid.retrieve_ghost_zones(1, fields)
+            x, y, z = [np.ascontiguousarray(pos[pts, i]) for i in range(3)]
+            left_edge = np.array(cube.LeftEdge, dtype="float64")
+            dims = np.array(cube.ActiveDimensions, dtype="int32")
             for field_index, field in enumerate(fields):
-                for coord_index in grid_index[grid]:
-                    mark = ((coords[coord_index, :] - grid.LeftEdge) / cellwidth)
-                    mark = np.array(mark, dtype='int64')
-                    out[field_index][coord_index] = \
-                        grid[field][mark[0], mark[1], mark[2]]
+                sample = np.zeros(pts.size, dtype="float64")
+                CICSample_3(x, y, z, sample, pts.size,
+                            np.asarray(cube[field].d, dtype="float64"),
+                            left_edge, dims, grid.dds[0])
+                out[field_index][pts] = sample
         if len(fields) == 1:
             return out[0]
         return out
 
+    def _group_points_by_grid(self, pos):
+        # Group the points by their leaf grid, and visit the grids in file
+        # order so that each one is read exactly once.
+        valid = np.isfinite(pos).all(axis=1)
+        ind = np.empty(pos.shape[0], dtype="int64")
+        ind[:] = -1
+        if valid.any():
+            ind[valid] = self._find_points(
+                pos[valid, 0], pos[valid, 1], pos[valid, 2])[1]
+        order = np.argsort(ind, kind="mergesort")
+        gids, starts = np.unique(ind[order], return_index=True)
+        stops = np.append(starts[1:], order.size)
+        groups = [(self.grids[gid], order[start:stop])
+                  for gid, start, stop in zip(gids, starts, stops)
+                  if gid >= 0]
+        groups.sort(key=lambda g: (g[0].filename or "", g[0].id))
+        return groups
 
     def _find_points(self, x, y, z) :
         """
@@ -344,6 +466,25 @@ class GridIndex(Index):
             # individual grids.
             yield YTDataChunk(dobj, "spatial", [g], size, cache = False)
 
+    def _split_io_chunks(self, dobj, grids, size, max_cells):
+        # Group grids into chunks of at most size grids and max_cells
+        # selected cells, splitting grids that are larger than that on
+        # their own into slabs.
+        group = []
+        ncells = 0
+        for g in grids:
+            for obj in split_grid(g, dobj.selector, max_cells):
+                count = obj.count(dobj.selector)
+                if len(group) > 0 and (ncells + count > max_cells or
+                                       len(group) == size):
+                    yield group
+                    group = []
+                    ncells = 0
+                group.append(obj)
+                ncells += count
+        if len(group) > 0:
+            yield group
+
     _grid_chunksize = 1000
     def _chunk_io(self, dobj, cache=True, local_only=False,
                   preload_fields=None, chunk_sizing="auto"):
@@ -375,10 +516,17 @@ class GridIndex(Index):
             size = self._grid_chunksize
         else:
             raise RuntimeError("%s is an invalid value for the 'chunk_sizing' argument." % chunk_sizing)
+        max_cells = self.max_chunk_bytes // 8
+        if dobj._type_name == "grid":
+            max_cells = 0
         for fn in sorted(gfiles):
             gs = gfiles[fn]
-            for grids in (gs[pos:pos + size] for pos
-                          in range(0, len(gs), size)):
+            if max_cells > 0:
+                groups = self._split_io_chunks(dobj, gs, size, max_cells)
+            else:
+                groups = (gs[pos:pos + size] for pos
+                          in range(0, len(gs), size))
+            for grids in groups:
                 dc = YTDataChunk(dobj, "io", grids,
                         self._count_selection(dobj, grids),
                         cache = cache, fast_index = fast_index)
@@ -120,7 +120,7 @@ cdef class LoadOctree(OctVisitor):
     cdef np.uint64_t *nocts
     cdef np.uint64_t *nfinest
 
-cdef inline int cind(int i, int j, int k):
+cdef inline int cind(int i, int j, int k) nogil:
     # THIS ONLY WORKS FOR CHILDREN.  It is not general for zones.
     return (((i*2)+j)*2+k)
 
@@ -140,3 +140,19 @@ cdef class ParticleDepositOperation:
                      np.float64_t dds[3], np.int64_t offset,
                      np.float64_t ppos[3], np.float64_t[:] fields,
                      np.int64_t domain_ind) except -1
+    # The threaded path: setup_threads returns 1 if the operation supports
+    # it, after making a buffer per thread, and process_thread deposits a
+    # particle into the buffer of thread tid.
+    cdef int setup_threads(self, int nthreads) except -1
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil
+    cdef int reduce_threads(self) except -1
+    cdef int process_threaded(self, int dim[3], OctreeContainer octree,
+                              np.int64_t[:] dom_ind, np.int64_t moff,
+                              int domain_id, np.float64_t *left_edge,
+                              np.float64_t *right_edge, np.float64_t *dds,
+                              np.float64_t[:,::1] positions,
+                              np.float64_t[:,::1] fields,
+                              int nthreads) except -1
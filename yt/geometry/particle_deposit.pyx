@@ -26,6 +26,7 @@ from oct_container cimport \
     Oct, OctreeContainer, OctInfo
 from cpython.array cimport array, clone
 from cython.view cimport memoryview as cymemview
+from cython.parallel cimport prange, parallel, threadid
 from yt.utilities.lib.misc_utilities import OnceIndirect
 
 cdef append_axes(np.ndarray arr, int naxes):
@@ -36,6 +37,32 @@ cdef append_axes(np.ndarray arr, int naxes):
     arr2.shape = arr2.shape + (1,) * (naxes - arr2.ndim)
     return arr2
 
+cdef thread_buffers(arr, int nthreads, fill = 0):
+    # One buffer like arr for each thread, stacked along the first axis.
+    arr = np.asarray(arr)
+    tbuf = np.empty((nthreads,) + arr.shape, dtype=arr.dtype)
+    tbuf.fill(fill)
+    return tbuf
+
+cdef add_thread_buffers(arr, tbuf):
+    arr = np.asarray(arr)
+    arr += np.asarray(tbuf).sum(axis=0)
+
+@cython.cdivision(True)
+cdef inline void cell_index(int ii[3], int dim[3], np.float64_t *left_edge,
+                            np.float64_t *dds, np.float64_t *ppos) nogil:
+    # The cell that ppos falls in, clipped to the block.
+    cdef int i
+    for i in range(3):
+        ii[i] = iclip(<int>((ppos[i] - left_edge[i]) / dds[i]), 0, dim[i] - 1)
+
+cdef field_columns(fields, np.int64_t npart):
+    # The particle fields as the columns of one C-ordered array, so that the
+    # values of a particle are contiguous.
+    if len(fields) == 0:
+        return np.empty((npart, 0), dtype="float64")
+    return np.ascontiguousarray(np.column_stack(fields), dtype="float64")
+
 cdef class ParticleDepositOperation:
     def __init__(self, nvals, kernel_name):
         self.nvals = nvals
@@ -54,7 +81,7 @@ cdef class ParticleDepositOperation:
                      np.ndarray[np.int64_t, ndim=1] dom_ind,
                      np.ndarray[np.float64_t, ndim=2] positions,
                      fields = None, int domain_id = -1,
-                     int domain_offset = 0):
+                     int domain_offset = 0, int num_threads = 1):
         cdef int nf, i, j
         if fields is None:
             fields = []
@@ -69,8 +96,15 @@ cdef class ParticleDepositOperation:
         cdef OctInfo oi
         cdef np.int64_t offset, moff
         cdef Oct *oct
-        cdef np.int64_t numpart = positions.shape[0]
         moff = octree.get_domain_offset(domain_id + domain_offset)
+        if num_threads > 1 and self.update_values == 0 and \
+           self.setup_threads(num_threads):
+            self.process_threaded(dims, octree, dom_ind, moff, domain_id,
+                                  NULL, NULL, NULL,
+                                  np.ascontiguousarray(positions),
+                                  field_columns(fields, positions.shape[0]),
+                                  num_threads)
+            return
         for i in range(positions.shape[0]):
             # We should check if particle remains inside the Oct here
             for j in range(nf):
@@ -110,7 +144,7 @@ cdef class ParticleDepositOperation:
     @cython.wraparound(False)
     def process_grid(self, gobj,
                      np.ndarray[np.float64_t, ndim=2] positions,
-                     fields = None):
+                     fields = None, int num_threads = 1):
         cdef int nf, i, j
         if fields is None:
             fields = []
@@ -129,6 +163,14 @@ cdef class ParticleDepositOperation:
             left_edge[i] = gobj.LeftEdge[i]
             right_edge[i] = gobj.RightEdge[i]
             dims[i] = gobj.ActiveDimensions[i]
+        if num_threads > 1 and self.update_values == 0 and \
+           self.setup_threads(num_threads):
+            self.process_threaded(dims, None, None, 0, -1,
+                                  left_edge, right_edge, dds,
+                                  np.ascontiguousarray(positions),
+                                  field_columns(fields, positions.shape[0]),
+                                  num_threads)
+            return
         for i in range(positions.shape[0]):
             # Now we process
             for j in range(nf):
@@ -152,13 +194,105 @@ cdef class ParticleDepositOperation:
                      np.int64_t domain_ind) except -1:
         raise NotImplementedError
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        return 0
+
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        pass
+
+    cdef int reduce_threads(self) except -1:
+        return 0
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef int process_threaded(self, int dim[3], OctreeContainer octree,
+                              np.int64_t[:] dom_ind, np.int64_t moff,
+                              int domain_id, np.float64_t *left_edge,
+                              np.float64_t *right_edge, np.float64_t *dds,
+                              np.float64_t[:,::1] positions,
+                              np.float64_t[:,::1] fields,
+                              int nthreads) except -1:
+        # Each thread deposits into a buffer of its own, and the buffers are
+        # added up at the end.  The static schedule hands each thread a
+        # contiguous block of particles in order, so the results do not
+        # depend on the timing of the threads.  With an octree, each thread
+        # finds the octs of its own particles; otherwise the particles are
+        # deposited into the single block given by left_edge, right_edge and
+        # dds.
+        cdef np.int64_t i, offset
+        cdef np.int64_t npart = positions.shape[0]
+        cdef int tid, j, outside
+        cdef bint use_octree = octree is not None
+        cdef np.float64_t *fp
+        cdef np.float64_t *pp
+        cdef Oct *oct
+        cdef OctInfo *oinfo
+        cdef OctInfo *ois = <OctInfo *> malloc(nthreads * sizeof(OctInfo))
+        try:
+            if npart > 0:
+                with nogil, parallel(num_threads=nthreads):
+                    tid = threadid()
+                    oinfo = &ois[tid]
+                    for i in prange(npart, schedule="static"):
+                        pp = &positions[i, 0]
+                        fp = NULL
+                        if fields.shape[1] > 0:
+                            fp = &fields[i, 0]
+                        if use_octree:
+                            oct = octree.get(pp, oinfo)
+                            if oct == NULL or (domain_id > 0 and
+                                               oct.domain != domain_id):
+                                continue
+                            offset = dom_ind[oct.domain_ind - moff]
+                            if offset < 0:
+                                continue
+                            self.process_thread(tid, dim, oinfo.left_edge,
+                                                oinfo.dds, offset, pp, fp)
+                        else:
+                            outside = 0
+                            for j in range(3):
+                                if pp[j] < left_edge[j] or \
+                                   pp[j] > right_edge[j]:
+                                    outside = 1
+                            if outside:
+                                continue
+                            self.process_thread(tid, dim, left_edge, dds, 0,
+                                                pp, fp)
+        finally:
+            free(ois)
+        self.reduce_threads()
+        return 0
+
 cdef class CountParticles(ParticleDepositOperation):
     cdef np.int64_t[:,:,:,:] count
+    cdef np.int64_t[:,:,:,:,:] tcount
     def initialize(self):
         # Create a numpy array accessible to python
         self.count = append_axes(
             np.zeros(self.nvals, dtype="int64", order='F'), 4)
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        self.tcount = thread_buffers(self.count, nthreads)
+        return 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        cdef int ii[3]
+        cell_index(ii, dim, left_edge, dds, ppos)
+        self.tcount[tid, ii[2], ii[1], ii[0], offset] += 1
+
+    cdef int reduce_threads(self) except -1:
+        add_thread_buffers(self.count, self.tcount)
+        self.tcount = None
+        return 0
+
     @cython.cdivision(True)
     cdef int process(self, int dim[3],
                      np.float64_t left_edge[3],
@@ -251,10 +385,30 @@ deposit_simple_smooth = SimpleSmooth
 
 cdef class SumParticleField(ParticleDepositOperation):
     cdef np.float64_t[:,:,:,:] sum
+    cdef np.float64_t[:,:,:,:,:] tsum
     def initialize(self):
         self.sum = append_axes(
             np.zeros(self.nvals, dtype="float64", order='F'), 4)
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        self.tsum = thread_buffers(self.sum, nthreads)
+        return 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        cdef int ii[3]
+        cell_index(ii, dim, left_edge, dds, ppos)
+        self.tsum[tid, ii[2], ii[1], ii[0], offset] += fields[0]
+
+    cdef int reduce_threads(self) except -1:
+        add_thread_buffers(self.sum, self.tsum)
+        self.tsum = None
+        return 0
+
     @cython.cdivision(True)
     cdef int process(self, int dim[3],
                      np.float64_t left_edge[3],
@@ -338,6 +492,7 @@ deposit_std = StdParticleField
 
 cdef class CICDeposit(ParticleDepositOperation):
     cdef np.float64_t[:,:,:,:] field
+    cdef np.float64_t[:,:,:,:,:] tfield
     cdef public object ofield
     def initialize(self):
         if not all(_ > 1 for _ in self.nvals):
@@ -384,6 +539,39 @@ cdef class CICDeposit(ParticleDepositOperation):
 
         return 0
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        self.tfield = thread_buffers(self.field, nthreads)
+        return 1
+
+    @cython.cdivision(True)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        cdef int i, j, k
+        cdef int ind[3]
+        cdef np.float64_t rpos
+        cdef np.float64_t rdds[3][2]
+        for i in range(3):
+            rpos = (ppos[i] - left_edge[i]) / dds[i]
+            rpos = fclip(rpos, 0.5001, dim[i] - 0.5001)
+            ind[i] = <int> (rpos + 0.5)
+            rdds[i][1] = (<np.float64_t> ind[i]) + 0.5 - rpos
+            rdds[i][0] = 1.0 - rdds[i][1]
+        for i in range(2):
+            for j in range(2):
+                for k in range(2):
+                    self.tfield[tid, ind[2] - k, ind[1] - j, ind[0] - i,
+                                offset] += \
+                        fields[0]*rdds[0][i]*rdds[1][j]*rdds[2][k]
+
+    cdef int reduce_threads(self) except -1:
+        add_thread_buffers(self.field, self.tfield)
+        self.tfield = None
+        return 0
+
     def finalize(self):
         rv = np.asarray(self.field)
         rv.shape = self.nvals
@@ -396,12 +584,36 @@ cdef class WeightedMeanParticleField(ParticleDepositOperation):
     # then in finalize divide mass * field / mass
     cdef np.float64_t[:,:,:,:] wf
     cdef np.float64_t[:,:,:,:] w
+    cdef np.float64_t[:,:,:,:,:] twf
+    cdef np.float64_t[:,:,:,:,:] tw
     def initialize(self):
         self.wf = append_axes(
             np.zeros(self.nvals, dtype='float64', order='F'), 4)
         self.w = append_axes(
             np.zeros(self.nvals, dtype='float64', order='F'), 4)
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        self.twf = thread_buffers(self.wf, nthreads)
+        self.tw = thread_buffers(self.w, nthreads)
+        return 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        cdef int ii[3]
+        cell_index(ii, dim, left_edge, dds, ppos)
+        self.tw[tid, ii[2], ii[1], ii[0], offset] += fields[1]
+        self.twf[tid, ii[2], ii[1], ii[0], offset] += fields[0] * fields[1]
+
+    cdef int reduce_threads(self) except -1:
+        add_thread_buffers(self.wf, self.twf)
+        add_thread_buffers(self.w, self.tw)
+        self.twf = self.tw = None
+        return 0
+
     @cython.cdivision(True)
     cdef int process(self, int dim[3],
                      np.float64_t left_edge[3],
@@ -455,6 +667,8 @@ deposit_mesh_id = MeshIdentifier
 cdef class NNParticleField(ParticleDepositOperation):
     cdef np.float64_t[:,:,:,:] nnfield
     cdef np.float64_t[:,:,:,:] distfield
+    cdef np.float64_t[:,:,:,:,:] tnnfield
+    cdef np.float64_t[:,:,:,:,:] tdistfield
     def initialize(self):
         self.nnfield = append_axes(
             np.zeros(self.nvals, dtype="float64", order='F'), 4)
@@ -462,6 +676,51 @@ cdef class NNParticleField(ParticleDepositOperation):
             np.zeros(self.nvals, dtype="float64", order='F'), 4)
         self.distfield[:] = np.inf
 
+    cdef int setup_threads(self, int nthreads) except -1:
+        self.tnnfield = thread_buffers(self.nnfield, nthreads)
+        self.tdistfield = thread_buffers(self.distfield, nthreads, np.inf)
+        return 1
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cdef void process_thread(self, int tid, int dim[3],
+                             np.float64_t *left_edge, np.float64_t *dds,
+                             np.int64_t offset, np.float64_t *ppos,
+                             np.float64_t *fields) nogil:
+        cdef int i, j, k
+        cdef np.float64_t r2
+        cdef np.float64_t gpos[3]
+        gpos[0] = left_edge[0] + 0.5 * dds[0]
+        for i in range(dim[0]):
+            gpos[1] = left_edge[1] + 0.5 * dds[1]
+            for j in range(dim[1]):
+                gpos[2] = left_edge[2] + 0.5 * dds[2]
+                for k in range(dim[2]):
+                    r2 = ((ppos[0] - gpos[0])*(ppos[0] - gpos[0]) +
+                          (ppos[1] - gpos[1])*(ppos[1] - gpos[1]) +
+                          (ppos[2] - gpos[2])*(ppos[2] - gpos[2]))
+                    if r2 < self.tdistfield[tid,k,j,i,offset]:
+                        self.tdistfield[tid,k,j,i,offset] = r2
+                        self.tnnfield[tid,k,j,i,offset] = fields[0]
+                    gpos[2] += dds[2]
+                gpos[1] += dds[1]
+            gpos[0] += dds[0]
+
+    cdef int reduce_threads(self) except -1:
+        # The threads hold the particles in order, so taking the first of
+        # equally near particles gives the same result as a single thread.
+        cdef int t
+        nn = np.asarray(self.nnfield)
+        dist = np.asarray(self.distfield)
+        tnn = np.asarray(self.tnnfield)
+        tdist = np.asarray(self.tdistfield)
+        for t in range(tdist.shape[0]):
+            closer = tdist[t] < dist
+            dist[closer] = tdist[t][closer]
+            nn[closer] = tnn[t][closer]
+        self.tnnfield = self.tdistfield = None
+        return 0
+
     @cython.cdivision(True)
     cdef int process(self, int dim[3],
                      np.float64_t left_edge[3],
@@ -15,17 +15,223 @@ Particle-only geometry handler
 #-----------------------------------------------------------------------------
 
 import collections
+import hashlib
+import json
+import multiprocessing
 import numpy as np
 import os
 import weakref
 
-from yt.funcs import only_on_root
+from yt.config import ytcfg
+from yt.data_objects.static_output import ParticleFileRange
+from yt.funcs import only_on_root, is_root
 from yt.utilities.logger import ytLogger as mylog
-from yt.data_objects.octree_subset import ParticleOctreeSubset
+from yt.data_objects.octree_subset import \
+    ParticleOctreeSubset, \
+    ParticleOctreeSubsetPart
 from yt.geometry.geometry_handler import Index, YTDataChunk
 from yt.geometry.particle_oct_container import \
     ParticleOctreeContainer, ParticleRegions
 
+# Bump this whenever the layout of the index sidecar file changes.
+_INDEX_CACHE_VERSION = 1
+_INDEX_CACHE_MAGIC = b"YTPIDX01"
+
+def _write_index_cache(filename, key, morton, masks):
+    """
+    Write the sorted Morton keys and the region masks of a particle index to
+    *filename*, tagged with the validation string *key*.
+
+    The file starts with an eight byte magic string, followed by the length
+    of a JSON header and the header itself.  The arrays follow, each aligned
+    to eight bytes, so they can be memory-mapped on read.
+    """
+    masks = [np.ascontiguousarray(m, dtype="uint64") for m in masks]
+    header = {"version": _INDEX_CACHE_VERSION,
+              "key": key,
+              "nmorton": int(morton.size),
+              "nmasks": len(masks),
+              "mask_shape": [int(d) for d in masks[0].shape]}
+    header = json.dumps(header).encode("ascii")
+    header += b" " * (-len(header) % 8)
+    tmpname = "%s.%s.tmp" % (filename, os.getpid())
+    with open(tmpname, "wb") as f:
+        f.write(_INDEX_CACHE_MAGIC)
+        f.write(np.array([len(header)], dtype="<u8").tobytes())
+        f.write(header)
+        np.ascontiguousarray(morton, dtype="<u8").tofile(f)
+        for mask in masks:
+            mask.astype("<u8").tofile(f)
+    os.rename(tmpname, filename)
+
+def _read_index_cache(filename, key):
+    """
+    Read a particle index written by :func:`_write_index_cache`.  Returns a
+    tuple of the (memory-mapped) sorted Morton keys and the list of region
+    masks, or None if the file does not exist or does not match *key*.
+    """
+    if not os.path.isfile(filename):
+        return None
+    with open(filename, "rb") as f:
+        if f.read(len(_INDEX_CACHE_MAGIC)) != _INDEX_CACHE_MAGIC:
+            return None
+        hlen = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        try:
+            header = json.loads(f.read(hlen).decode("ascii"))
+        except ValueError:
+            return None
+    if header.get("version") != _INDEX_CACHE_VERSION or \
+       header.get("key") != key:
+        return None
+    offset = len(_INDEX_CACHE_MAGIC) + 8 + hlen
+    nmorton = header["nmorton"]
+    # Copy-on-write keeps the pages backed by the file while still handing
+    # the oct container a writeable buffer.
+    if nmorton > 0:
+        morton = np.memmap(filename, dtype="<u8", mode="c",
+                           offset=offset, shape=(nmorton,))
+    else:
+        morton = np.empty(0, dtype="uint64")
+    offset += 8 * nmorton
+    shape = tuple(header["mask_shape"])
+    masks = []
+    for i in range(header["nmasks"]):
+        mask = np.memmap(filename, dtype="<u8", mode="r",
+                         offset=offset, shape=shape)
+        masks.append(np.array(mask, dtype="uint64"))
+        offset += 8 * mask.size
+    return morton, masks
+
+class _SingleFileRegions(object):
+    """
+    Stand-in for :class:`ParticleRegions` used by index worker processes.
+    It records which coarse cells a single data file touches, so that only
+    the (small) list of touched cells has to be sent back to the parent.
+    """
+    def __init__(self, left_edge, right_edge, dims):
+        self.regions = ParticleRegions(left_edge, right_edge, dims, 1)
+
+    def add_data_file(self, pos, file_id, filter = 0):
+        self.regions.add_data_file(pos, 0, filter)
+
+    def touched_cells(self):
+        return np.flatnonzero(self.regions.masks[0])
+
+# Set by the parent immediately before forking the index worker pool, so the
+# (unpicklable) IO handler and data files are inherited by the workers.
+_morton_worker_state = None
+
+def _get_fork_context():
+    if not hasattr(os, "fork"):
+        return None
+    try:
+        return multiprocessing.get_context("fork")
+    except AttributeError:
+        # Python 2 always forks on the platforms that support it.
+        return multiprocessing
+    except ValueError:
+        return None
+
+def _morton_worker(file_index):
+    io, data_files, regions_args = _morton_worker_state
+    regions = _SingleFileRegions(*regions_args)
+    morton = io._initialize_index(data_files[file_index], regions)
+    morton.sort()
+    return file_index, morton, regions.touched_cells()
+
+class ParticleCellRanges(object):
+    """
+    For the particles of one type in one data file, the range of particle
+    indices [start, stop) spanned by the particles that fall in each
+    occupied cell of a coarse mesh over the domain.  Simulation codes often
+    write particles roughly in spatial order, in which case these ranges
+    are short and a selector only needs the particles inside the ranges of
+    the cells it touches.
+
+    Parameters
+    ----------
+    left_edge, right_edge : array_like
+        The domain edges, in code units.
+    dims : int
+        The number of coarse cells along each axis.
+    pos : array_like
+        The (N, 3) positions of the particles, in file order.
+    """
+    def __init__(self, left_edge, right_edge, dims, pos=None):
+        self.left_edge = np.asarray(left_edge, dtype="float64")
+        self.right_edge = np.asarray(right_edge, dtype="float64")
+        self.dims = dims
+        self.dds = (self.right_edge - self.left_edge) / dims
+        if pos is None:
+            self.npart = 0
+            self.cells = self.starts = self.stops = np.empty(0, "int64")
+            return
+        self.npart = pos.shape[0]
+        ijk = np.floor((pos - self.left_edge) / self.dds).astype("int64")
+        np.clip(ijk, 0, dims - 1, ijk)
+        cells = np.ravel_multi_index(ijk.T, (dims, dims, dims))
+        del ijk
+        # The first and last particle of each cell, found in a single pass
+        # over the particles rather than by sorting them.
+        index = np.arange(self.npart, dtype="int64")
+        starts = np.empty(dims**3, dtype="int64")
+        starts[:] = self.npart
+        stops = np.zeros(dims**3, dtype="int64")
+        np.minimum.at(starts, cells, index)
+        index += 1
+        np.maximum.at(stops, cells, index)
+        del cells, index
+        self.cells = np.flatnonzero(stops)
+        self.starts = starts[self.cells]
+        self.stops = stops[self.cells]
+
+    @classmethod
+    def from_ranges(cls, left_edge, right_edge, dims, cells, starts, stops):
+        """
+        Create from precomputed cell ids (flattened in C order over a
+        dims**3 mesh) and the [start, stop) ranges of each cell.
+        """
+        obj = cls(left_edge, right_edge, dims)
+        obj.cells = np.asarray(cells, dtype="int64")
+        obj.starts = np.asarray(starts, dtype="int64")
+        obj.stops = np.asarray(stops, dtype="int64")
+        obj.npart = int(obj.stops.max()) if obj.stops.size > 0 else 0
+        return obj
+
+    @property
+    def coverage(self):
+        """
+        The total length of all the ranges, relative to the number of
+        particles.  This is one for a perfectly spatially sorted file and
+        approaches the number of occupied cells for an unsorted one.
+        """
+        if self.npart == 0:
+            return 0.0
+        return (self.stops - self.starts).sum() / float(self.npart)
+
+    def select_ranges(self, selector):
+        """
+        Return a list of disjoint, sorted (start, stop) index ranges that
+        together contain every particle that *selector* may select.
+        """
+        if self.cells.size == 0:
+            return []
+        ijk = np.array(np.unravel_index(self.cells, (self.dims,) * 3)).T
+        left_edges = self.left_edge + ijk * self.dds
+        right_edges = left_edges + self.dds
+        levels = np.zeros((ijk.shape[0], 1), dtype="int32")
+        sel = selector.select_grids(left_edges, right_edges, levels)
+        starts = self.starts[sel]
+        stops = self.stops[sel]
+        order = np.argsort(starts)
+        ranges = []
+        for start, stop in zip(starts[order], stops[order]):
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], stop)
+            else:
+                ranges.append([start, stop])
+        return [(int(start), int(stop)) for start, stop in ranges]
+
 class ParticleIndex(Index):
     """The Index subclass for particle datasets"""
     _global_mesh = False
@@ -36,6 +242,7 @@ class ParticleIndex(Index):
         self.index_filename = self.dataset.parameter_filename
         self.directory = os.path.dirname(self.index_filename)
         self.float_type = np.float64
+        self._max_smoothing_lengths = {}
         super(ParticleIndex, self).__init__(ds, dataset_type)
 
     @property
@@ -59,6 +266,18 @@ class ParticleIndex(Index):
                    self.dataset.domain_left_edge)
         return dx.min()
 
+    def _get_max_smoothing_length(self, ptype, hsml):
+        """
+        Returns (in code units) the largest smoothing length of the
+        particles of type *ptype*, given by their *hsml* field.
+        """
+        key = (ptype, hsml)
+        if key not in self._max_smoothing_lengths:
+            hmax = self.dataset.all_data().max(key)
+            self._max_smoothing_lengths[key] = \
+                float(hmax.in_units("code_length"))
+        return self._max_smoothing_lengths[key]
+
     def _get_particle_type_counts(self):
         result = collections.defaultdict(lambda: 0)
         for df in self.data_files:
@@ -98,10 +317,16 @@ class ParticleIndex(Index):
                      self.total_particles, index_ptype)
         # No more than 256^3 in the region finder.
         N = min(len(self.data_files), 256) 
+        self._regions_dims = [N, N, N]
         self.regions = ParticleRegions(
                 ds.domain_left_edge, ds.domain_right_edge,
-                [N, N, N], len(self.data_files))
-        self._initialize_indices()
+                self._regions_dims, len(self.data_files))
+        morton = self._load_index_cache()
+        if morton is None:
+            morton = self._initialize_indices()
+            self._save_index_cache(morton)
+        # Now we add them all at once.
+        self.oct_handler.add(morton)
         self.oct_handler.finalize()
         self.max_level = self.oct_handler.max_level
         self.dataset.max_level = self.max_level
@@ -109,33 +334,137 @@ class ParticleIndex(Index):
         only_on_root(mylog.info, "Identified %0.3e octs", tot)
 
     def _initialize_indices(self):
-        # This will be replaced with a parallel-aware iteration step.
-        # Roughly outlined, what we will do is:
-        #   * Generate Morton indices on each set of files that belong to
-        #     an individual processor
-        #   * Create a global, accumulated histogram
-        #   * Cut based on estimated load balancing
-        #   * Pass particles to specific processors, along with NREF buffer
-        #   * Broadcast back a serialized octree to join
-        #
-        # For now we will do this in serial.
+        # Morton keys are computed for each data file independently, either
+        # in serial, in a pool of worker processes on this node (set by the
+        # particle_index_nprocs option), or split across MPI ranks.  Each
+        # file's keys are sorted where they are computed, so that the final
+        # sort only has to merge presorted runs.
         index_ptype = self.index_ptype
         # Set the index_ptype attribute of self.io dynamically here, so we don't
         # need to assume that the dataset has the attribute.
         self.io.index_ptype = index_ptype
-        morton = np.empty(self.total_particles, dtype="uint64")
-        ind = 0
+        file_indices = list(range(len(self.data_files)))
+        if self.comm.size > 1:
+            file_indices = file_indices[self.comm.rank::self.comm.size]
+        mortons = []
+        nprocs = self._index_nprocs(len(file_indices))
+        if nprocs > 1:
+            for fi, morton, touched in self._pool_morton(file_indices, nprocs):
+                file_id = self.data_files[fi].file_id
+                mask = self.regions.masks[file_id // 64].reshape(-1)
+                mask[touched] |= np.uint64(1) << np.uint64(file_id % 64)
+                mortons.append(morton)
+        else:
+            for fi in file_indices:
+                morton = self.io._initialize_index(self.data_files[fi],
+                                                   self.regions)
+                morton.sort()
+                mortons.append(morton)
+        if len(mortons) > 0:
+            morton = np.concatenate(mortons)
+        else:
+            morton = np.empty(0, dtype="uint64")
+        del mortons
+        if self.comm.size > 1:
+            morton = self.comm.par_combine_object(
+                morton.view("int64"), datatype="array", op="cat")
+            morton = morton.view("uint64")
+            for i, mask in enumerate(self.regions.masks):
+                # Every data file belongs to exactly one rank, so each bit is
+                # set on at most one rank and summing is the same as OR-ing.
+                mask = self.comm.mpi_allreduce(mask.view("int64"), op="sum")
+                self.regions.masks[i] = mask.view("uint64")
+        morton.sort(kind="mergesort")
+        return morton
+
+    def _index_nprocs(self, nfiles):
+        nprocs = ytcfg.getint("yt", "particle_index_nprocs")
+        if nprocs <= 0:
+            nprocs = multiprocessing.cpu_count()
+        nprocs = min(nprocs, nfiles)
+        if nprocs > 1 and _get_fork_context() is None:
+            mylog.warning("Process-parallel indexing requires fork; "
+                          "indexing in serial.")
+            nprocs = 1
+        return nprocs
+
+    def _pool_morton(self, file_indices, nprocs):
+        global _morton_worker_state
+        only_on_root(mylog.info, "Indexing %s data files with %s processes",
+                     len(file_indices), nprocs)
+        ds = self.dataset
+        _morton_worker_state = (
+            self.io, self.data_files,
+            (ds.domain_left_edge, ds.domain_right_edge, self._regions_dims))
+        pool = _get_fork_context().Pool(nprocs)
+        try:
+            for rv in pool.imap_unordered(_morton_worker, file_indices):
+                yield rv
+        finally:
+            pool.close()
+            pool.join()
+            _morton_worker_state = None
+
+    @property
+    def index_cache_filename(self):
+        ds = self.dataset
+        return "%s.index%s_%s.pidx" % (self.index_filename, ds.n_ref,
+                                       ds.over_refine_factor)
+
+    def _index_cache_key(self):
+        # The sidecar is only valid for exactly the same set of files, with
+        # the same sizes and modification times, indexed the same way.
+        ds = self.dataset
+        items = [_INDEX_CACHE_VERSION, ds.n_ref, ds.over_refine_factor,
+                 self.index_ptype, bool(ds.filter_bbox),
+                 [float(v) for v in ds.domain_left_edge],
+                 [float(v) for v in ds.domain_right_edge],
+                 [int(d) for d in self.regions.masks[0].shape]]
         for data_file in self.data_files:
-            if index_ptype == "all":
-                npart = sum(data_file.total_particles.values())
-            else:
-                npart = data_file.total_particles[index_ptype]
-            morton[ind:ind + npart] = \
-                self.io._initialize_index(data_file, self.regions)
-            ind += npart
-        morton.sort()
-        # Now we add them all at once.
-        self.oct_handler.add(morton)
+            st = os.stat(data_file.filename)
+            items.append([os.path.basename(data_file.filename),
+                          st.st_size, st.st_mtime])
+        return hashlib.sha1(repr(items).encode("utf-8")).hexdigest()
+
+    def _use_index_cache(self):
+        if not ytcfg.getboolean("yt", "particle_index_cache"):
+            return False
+        # In-memory datasets (e.g. the stream frontend) have nothing on disk
+        # to key the sidecar on.
+        return all(os.path.isfile(df.filename) for df in self.data_files)
+
+    def _load_index_cache(self):
+        if not self._use_index_cache():
+            return None
+        fn = self.index_cache_filename
+        try:
+            rv = _read_index_cache(fn, self._index_cache_key())
+        except (IOError, OSError, KeyError, ValueError) as e:
+            mylog.warning("Could not read particle index from %s: %s", fn, e)
+            return None
+        if rv is None:
+            return None
+        morton, masks = rv
+        if len(masks) != len(self.regions.masks) or \
+           morton.size != self.total_particles:
+            return None
+        only_on_root(mylog.info, "Loading particle index from %s", fn)
+        self.regions.masks = masks
+        return morton
+
+    def _save_index_cache(self, morton):
+        if not self._use_index_cache() or not is_root():
+            return
+        fn = self.index_cache_filename
+        if not os.access(os.path.dirname(os.path.abspath(fn)), os.W_OK):
+            return
+        try:
+            _write_index_cache(fn, self._index_cache_key(), morton,
+                               self.regions.masks)
+        except (IOError, OSError) as e:
+            mylog.warning("Could not save particle index to %s: %s", fn, e)
+            return
+        only_on_root(mylog.info, "Saved particle index to %s", fn)
 
     def _detect_output_fields(self):
         # TODO: Add additional fields
@@ -180,6 +509,9 @@ class ParticleIndex(Index):
         # load-balancing.  That may require a specialized selector object to
         # cut based on some space-filling curve index.
         for i,og in enumerate(sobjs):
+            if isinstance(og, ParticleOctreeSubsetPart):
+                if not og.owns_mesh: continue
+                og = og.subset
             if ngz > 0:
                 g = og.retrieve_ghost_zones(ngz, [], smoothed=True)
             else:
@@ -188,8 +520,46 @@ class ParticleIndex(Index):
 
     def _chunk_io(self, dobj, cache = True, local_only = False):
         oobjs = getattr(dobj._current_chunk, "objs", dobj._chunk_info)
+        max_particles = self.max_chunk_bytes // 8
         for subset in oobjs:
-            yield YTDataChunk(dobj, "io", [subset], None, cache = cache)
+            if max_particles > 0:
+                parts = self._split_subset(subset, max_particles)
+            else:
+                parts = [subset]
+            for part in parts:
+                yield YTDataChunk(dobj, "io", [part], None, cache = cache)
+
+    def _split_subset(self, subset, max_particles):
+        # Divide the data files of subset into groups of at most
+        # max_particles particles.  Files that hold more than that are split
+        # into ranges if the IO handler can read those.
+        if isinstance(subset, ParticleOctreeSubsetPart):
+            return [subset]
+        groups = []
+        group = []
+        nparticles = 0
+        for data_file in subset.data_files:
+            count = sum(data_file.total_particles.values())
+            if count > max_particles and self.io._particle_ranges_supported:
+                n = int(np.ceil(float(count) / max_particles))
+                pieces = [ParticleFileRange(data_file, i, n)
+                          for i in range(n)]
+            else:
+                pieces = [data_file]
+            for piece in pieces:
+                count = sum(piece.total_particles.values())
+                if len(group) > 0 and nparticles + count > max_particles:
+                    groups.append(group)
+                    group = []
+                    nparticles = 0
+                group.append(piece)
+                nparticles += count
+        if len(group) > 0:
+            groups.append(group)
+        if len(groups) < 2:
+            return [subset]
+        return [ParticleOctreeSubsetPart(subset, files, i == 0)
+                for i, files in enumerate(groups)]
 
 class ParticleDataChunk(YTDataChunk):
     def __init__(self, oct_handler, regions, *args, **kwargs):
@@ -25,6 +25,7 @@ from oct_container cimport Oct, OctreeContainer
 from .particle_deposit cimport kernel_func, get_kernel_func, gind
 from yt.utilities.lib.distance_queue cimport NeighborList, Neighbor_compare, \
     r2dist, DistanceQueue
+from yt.utilities.lib.particle_kdtree cimport ParticleKDTree
 
 cdef extern from "platform_dep.h":
     void *alloca(int)
@@ -71,6 +72,19 @@ cdef class ParticleSmoothOperation:
                             np.float64_t cpos[3],
                             np.float64_t[:,:] oct_left_edges,
                             np.float64_t[:,:] oct_dds, DistanceQueue dq)
+    cdef void kdtree_process_octree(self, OctreeContainer mesh_octree,
+                               np.int64_t[:] mdom_ind,
+                               np.float64_t[:,:] oct_positions,
+                               np.float64_t **fields,
+                               np.float64_t **index_fields,
+                               np.int64_t moff_m, ParticleKDTree kdtree)
+    cdef void neighbor_process_kdtree(self, int dim[3],
+                               np.float64_t left_edge[3],
+                               np.float64_t dds[3], np.float64_t **fields,
+                               np.int64_t offset, np.float64_t **index_fields,
+                               ParticleKDTree kdtree, DistanceQueue dq)
+    cdef void kdtree_process_particles(self, np.float64_t[:,:] positions,
+                               np.float64_t **fields, ParticleKDTree kdtree)
     cdef void process(self, np.int64_t offset, int i, int j, int k,
                       int dim[3], np.float64_t cpos[3], np.float64_t **fields,
                       np.float64_t **index_fields, DistanceQueue dq)
@@ -66,7 +66,8 @@ cdef class ParticleSmoothOperation:
                      index_fields = None,
                      OctreeContainer particle_octree = None,
                      np.int64_t [:] pdom_ind = None,
-                     geometry = "cartesian"):
+                     geometry = "cartesian",
+                     ParticleKDTree kdtree = None):
         # This will be a several-step operation.
         #
         # We first take all of our particles and assign them to Octs.  If they
@@ -91,6 +92,10 @@ cdef class ParticleSmoothOperation:
         # is not the most efficient yet.  We will also need to handle some
         # mechanism of an expandable array for holding pointers to Octs, so
         # that we can deal with >27 neighbors.
+        #
+        # If a KD-tree built on the (cartesian) positions is supplied, none of
+        # the above is needed: the neighbors of each cell are found by
+        # querying the tree directly.
         if particle_octree is None:
             particle_octree = mesh_octree
             pdom_ind = mdom_ind
@@ -165,6 +170,10 @@ cdef class ParticleSmoothOperation:
         for i in range(3):
             self.DW[i] = (mesh_octree.DRE[i] - mesh_octree.DLE[i])
             self.periodicity[i] = periodicity[i]
+        if kdtree is not None:
+            self.kdtree_process_octree(mesh_octree, mdom_ind, oct_positions,
+                field_pointers, index_field_pointers, moff_m, kdtree)
+            return
         cdef np.float64_t factor = (1 << (particle_octree.oref))
         for i in range(positions.shape[0]):
             for j in range(3):
@@ -240,7 +249,8 @@ cdef class ParticleSmoothOperation:
                      fields = None, int domain_id = -1,
                      int domain_offset = 0,
                      periodicity = (True, True, True),
-                     geometry = "cartesian"):
+                     geometry = "cartesian",
+                     ParticleKDTree kdtree = None):
         # The other functions in this base class process particles in a way
         # that results in a modification to the *mesh*.  This function is
         # designed to process neighboring particles in such a way that a new
@@ -283,11 +293,6 @@ cdef class ParticleSmoothOperation:
             periodicity = (False, False, False)
         else:
             raise NotImplementedError
-        numpart = positions.shape[0]
-        pcount = np.zeros_like(pdom_ind)
-        doff = np.zeros_like(pdom_ind) - 1
-        moff_p = particle_octree.get_domain_offset(domain_id + domain_offset)
-        pdoms = np.zeros(positions.shape[0], dtype="int64") - 1
         nf = len(fields)
         if fields is None:
             fields = []
@@ -295,6 +300,20 @@ cdef class ParticleSmoothOperation:
         for i in range(nf):
             tarr = fields[i]
             field_pointers[i] = <np.float64_t *> tarr.data
+        if kdtree is not None:
+            # The tree has been built on these particles, so there is no need
+            # to assign them to octs.
+            for i in range(3):
+                self.DW[i] = kdtree.DW[i]
+                self.periodicity[i] = periodicity[i]
+            self.kdtree_process_particles(cart_positions, field_pointers,
+                                          kdtree)
+            return
+        numpart = positions.shape[0]
+        pcount = np.zeros_like(pdom_ind)
+        doff = np.zeros_like(pdom_ind) - 1
+        moff_p = particle_octree.get_domain_offset(domain_id + domain_offset)
+        pdoms = np.zeros(positions.shape[0], dtype="int64") - 1
         for i in range(3):
             self.DW[i] = (particle_octree.DRE[i] - particle_octree.DLE[i])
             self.periodicity[i] = periodicity[i]
@@ -353,6 +372,67 @@ cdef class ParticleSmoothOperation:
         if nind != NULL:
             free(nind)
 
+    @cython.cdivision(True)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.initializedcheck(False)
+    cdef void kdtree_process_octree(self, OctreeContainer mesh_octree,
+                                    np.int64_t[:] mdom_ind,
+                                    np.float64_t[:,:] oct_positions,
+                                    np.float64_t **fields,
+                                    np.float64_t **index_fields,
+                                    np.int64_t moff_m, ParticleKDTree kdtree):
+        # This visits the mesh octs in the same order as process_octree, but
+        # gets the neighbors of each cell from the KD-tree.
+        cdef int i, j
+        cdef int dims[3]
+        cdef np.float64_t pos[3]
+        cdef np.int64_t offset
+        cdef Oct *oct
+        cdef OctInfo moi
+        cdef np.uint8_t[:] visited
+        dims[0] = dims[1] = dims[2] = (1 << mesh_octree.oref)
+        cdef int nz = dims[0] * dims[1] * dims[2]
+        visited = np.zeros(mdom_ind.shape[0], dtype="uint8")
+        cdef DistanceQueue dist_queue = DistanceQueue(self.maxn)
+        dist_queue._setup(self.DW, self.periodicity)
+        for i in range(oct_positions.shape[0]):
+            if (i % 10000) == 0:
+                PyErr_CheckSignals()
+            for j in range(3):
+                pos[j] = oct_positions[i, j]
+            oct = mesh_octree.get(pos, &moi)
+            offset = mdom_ind[oct.domain_ind - moff_m] * nz
+            if visited[oct.domain_ind - moff_m] == 1: continue
+            visited[oct.domain_ind - moff_m] = 1
+            if offset < 0: continue
+            self.neighbor_process_kdtree(dims, moi.left_edge, moi.dds,
+                fields, offset, index_fields, kdtree, dist_queue)
+
+    @cython.cdivision(True)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.initializedcheck(False)
+    cdef void kdtree_process_particles(self, np.float64_t[:,:] positions,
+                                       np.float64_t **fields,
+                                       ParticleKDTree kdtree):
+        cdef int dim[3]
+        cdef np.int64_t i
+        cdef int j
+        cdef np.float64_t pos[3]
+        cdef np.float64_t opos[3]
+        dim[0] = dim[1] = dim[2] = 1
+        cdef DistanceQueue dist_queue = DistanceQueue(self.maxn)
+        dist_queue._setup(self.DW, self.periodicity)
+        for i in range(positions.shape[0]):
+            if (i % 10000) == 0:
+                PyErr_CheckSignals()
+            for j in range(3):
+                pos[j] = positions[i, j]
+            self.pos_setup(pos, opos)
+            kdtree.knn(opos, dist_queue)
+            self.process(i, 0, 0, 0, dim, opos, fields, NULL, dist_queue)
+
     cdef int neighbor_search(self, np.float64_t pos[3], OctreeContainer octree,
                              np.int64_t **nind, int *nsize,
                              np.int64_t nneighbors, np.int64_t domain_id,
@@ -549,6 +629,32 @@ cdef class ParticleSmoothOperation:
                 cpos[1] += dds[1]
             cpos[0] += dds[0]
 
+    @cython.cdivision(True)
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.initializedcheck(False)
+    cdef void neighbor_process_kdtree(self, int dim[3],
+                               np.float64_t left_edge[3],
+                               np.float64_t dds[3], np.float64_t **fields,
+                               np.int64_t offset, np.float64_t **index_fields,
+                               ParticleKDTree kdtree, DistanceQueue dq):
+        cdef int i, j, k
+        cdef np.float64_t cpos[3]
+        cdef np.float64_t opos[3]
+        cpos[0] = left_edge[0] + 0.5*dds[0]
+        for i in range(dim[0]):
+            cpos[1] = left_edge[1] + 0.5*dds[1]
+            for j in range(dim[1]):
+                cpos[2] = left_edge[2] + 0.5*dds[2]
+                for k in range(dim[2]):
+                    self.pos_setup(cpos, opos)
+                    kdtree.knn(opos, dq)
+                    self.process(offset, i, j, k, dim, opos, fields,
+                                 index_fields, dq)
+                    cpos[2] += dds[2]
+                cpos[1] += dds[1]
+            cpos[0] += dds[0]
+
     @cython.cdivision(True)
     @cython.boundscheck(False)
     @cython.wraparound(False)
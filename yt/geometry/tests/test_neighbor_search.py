@@ -56,3 +56,14 @@ def test_neighbor_search():
         #dd.field_data.pop(("all", "particle_radius"))
     assert_equal((min_in == 63).sum(), min_in.size)
     assert_array_almost_equal(nearest_neighbors, all_neighbors)
+
+def test_neighbor_search_kdtree():
+    np.random.seed(0x4d3d3d3)
+    ds = fake_particle_ds(npart = 16**3)
+    ds.periodicity = (True, True, True)
+    ds.index
+    fn, = add_nearest_neighbor_field("all", "particle_position", ds)
+    octree_neighbors = ds.all_data()[fn]
+    ds.neighbor_backend = "kdtree"
+    kdtree_neighbors = ds.all_data()[fn]
+    assert_array_almost_equal(kdtree_neighbors, octree_neighbors)
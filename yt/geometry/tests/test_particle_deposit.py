@@ -1,7 +1,10 @@
 from yt.utilities.exceptions import \
     YTBoundsDefinitionError
 
+from yt.config import ytcfg
 from yt.testing import \
+    assert_almost_equal, \
+    fake_particle_ds, \
     fake_random_ds
 from numpy.testing import \
     assert_raises
@@ -12,3 +15,23 @@ def test_cic_deposit():
             dims=[1, 800, 800])
     f = ("deposit", "all_cic")
     assert_raises(YTBoundsDefinitionError, my_reg.__getitem__, f)
+
+def _threaded_deposits(make_ds, nthreads):
+    old = ytcfg.get("yt", "particle_nthreads")
+    ytcfg["yt", "particle_nthreads"] = str(nthreads)
+    try:
+        ds = make_ds()
+        fields = [ds.add_deposited_particle_field(("io", "particle_mass"), m)
+                  for m in ["count", "sum", "cic", "weighted_mean", "nearest"]]
+        ad = ds.all_data()
+        return [ad[f] for f in fields]
+    finally:
+        ytcfg["yt", "particle_nthreads"] = old
+
+def test_threaded_deposit():
+    for make_ds in [lambda: fake_random_ds(16, nprocs=4, particles=16**3),
+                    lambda: fake_particle_ds(npart=16**3)]:
+        serial = _threaded_deposits(make_ds, 1)
+        threaded = _threaded_deposits(make_ds, 4)
+        for v1, v4 in zip(serial, threaded):
+            assert_almost_equal(v1, v4, 10)
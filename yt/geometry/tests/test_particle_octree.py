@@ -13,6 +13,9 @@ Tests for particle octree
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+import os
+import shutil
+import tempfile
 
 import numpy as np
 
@@ -22,11 +25,18 @@ from yt.geometry.oct_container import \
 from yt.geometry.particle_oct_container import \
     ParticleOctreeContainer, \
     ParticleRegions
+from yt.geometry.particle_geometry_handler import \
+    _write_index_cache, \
+    _read_index_cache, \
+    _SingleFileRegions, \
+    _get_fork_context, \
+    ParticleCellRanges
 from yt.geometry.oct_container import _ORDER_MAX
 from yt.geometry.selection_routines import RegionSelector, AlwaysSelector
 from yt.testing import \
     assert_equal, \
     requires_file
+from yt.config import ytcfg
 from yt.units.unit_registry import UnitRegistry
 from yt.units.yt_array import YTArray
 from yt.utilities.lib.geometry_utils import get_morton_indices
@@ -94,6 +104,41 @@ def test_save_load_octree():
     fw2 = loaded.fwidth(always)
     assert_equal(fw1, fw2)
 
+def test_index_cache_roundtrip():
+    np.random.seed(int(0x4d3d3d3))
+    pos = np.random.normal(0.5, scale=0.05, size=(NPART,3)) * (DRE-DLE) + DLE
+    for i in range(3):
+        np.clip(pos[:,i], DLE[i], DRE[i], pos[:,i])
+    reg = ParticleRegions(DLE, DRE, [4, 4, 4], 70)
+    reg.add_data_file(pos, 0)
+    reg.add_data_file(pos[:NPART//2], 65)
+    ipos = np.floor((pos - DLE)/dx).astype("uint64")
+    morton = get_morton_indices(ipos)
+    morton.sort()
+    tmpdir = tempfile.mkdtemp()
+    fn = os.path.join(tmpdir, "snap.pidx")
+    try:
+        _write_index_cache(fn, "abc", morton, reg.masks)
+        assert_equal(_read_index_cache(fn, "def"), None)
+        morton2, masks2 = _read_index_cache(fn, "abc")
+        assert_equal(morton2, morton)
+        assert_equal(len(masks2), len(reg.masks))
+        for m1, m2 in zip(reg.masks, masks2):
+            assert_equal(m1, m2)
+        # The cached keys must build exactly the same octree.
+        octrees = []
+        for m in (morton, morton2):
+            octree = ParticleOctreeContainer((1, 1, 1), DLE, DRE)
+            octree.n_ref = 32
+            octree.add(m)
+            octree.finalize()
+            octrees.append(octree)
+        assert_equal(octrees[0].nocts, octrees[1].nocts)
+        del morton2
+    finally:
+        shutil.rmtree(tmpdir)
+    assert_equal(_read_index_cache(fn, "abc"), None)
+
 def test_particle_octree_counts():
     np.random.seed(int(0x4d3d3d3))
     # Eight times as many!
@@ -158,6 +203,95 @@ def test_particle_index_ptype():
     assert_equal(cv.shape, cv_all.shape)
     assert_equal(cv.sum(dtype="float64"), cv_pt0.sum(dtype="float64"))
 
+def _index_with_nprocs(fn, nprocs):
+    options = ("particle_index_nprocs", "particle_index_cache",
+               "skip_dataset_cache")
+    old = [ytcfg.get("yt", option) for option in options]
+    ytcfg["yt", "particle_index_nprocs"] = str(nprocs)
+    ytcfg["yt", "particle_index_cache"] = "False"
+    ytcfg["yt", "skip_dataset_cache"] = "True"
+    try:
+        ds = yt.load(fn)
+        ds.index
+    finally:
+        for option, value in zip(options, old):
+            ytcfg["yt", option] = value
+    return ds
+
+@requires_file(index_ptype_snap)
+def test_particle_index_nprocs():
+    serial_ds = _index_with_nprocs(index_ptype_snap, 1)
+    pool_ds = _index_with_nprocs(index_ptype_snap, 4)
+    serial, pool = serial_ds.index, pool_ds.index
+    assert(len(serial.data_files) > 1)
+    assert_equal(len(serial.regions.masks), len(pool.regions.masks))
+    for mask1, mask2 in zip(serial.regions.masks, pool.regions.masks):
+        assert_equal(mask1, mask2)
+    assert_equal(serial.oct_handler.nocts, pool.oct_handler.nocts)
+    assert_equal(serial.oct_handler.recursively_count(),
+                 pool.oct_handler.recursively_count())
+    for field in [("all", "particle_mass"), ("PartType0", "Density")]:
+        assert_equal(serial_ds.all_data()[field], pool_ds.all_data()[field])
+
+def check_pool_reads(ds, fields):
+    # Index a data file in a worker process with an IO handler that has
+    # never indexed anything here, as the parent process does when the
+    # index is built in a pool, and check that it reads fields the same.
+    index = ds.index
+    if _get_fork_context() is None:
+        return
+    sp = ds.sphere("c", 0.25 * ds.domain_width.min())
+    expected = [sp[field] for field in fields]
+    io = index.io
+    index.io = type(io)(ds)
+    index.io.index_ptype = io.index_ptype
+    try:
+        rv = list(index._pool_morton([0], 2))
+        assert_equal(len(rv), 1)
+        sp = ds.sphere("c", 0.25 * ds.domain_width.min())
+        for field, values in zip(fields, expected):
+            assert_equal(sp[field], values)
+    finally:
+        index.io = io
+
+isothermal_bin = "IsothermalCollapse/snap_505"
+
+@requires_file(isothermal_bin)
+def test_pool_reads_gadget_binary():
+    ds = yt.load(isothermal_bin,
+                 bounding_box=[[-3, 3], [-3, 3], [-3, 3]])
+    check_pool_reads(ds, [("Gas", "Coordinates"), ("Gas", "Density")])
+
+tipsy_gal = "TipsyGalaxy/galaxy.00300"
+
+@requires_file(tipsy_gal)
+def test_pool_reads_tipsy():
+    ds = yt.load(tipsy_gal)
+    check_pool_reads(ds, [("Gas", "Coordinates"), ("Stars", "Metals")])
+
+def test_pool_morton():
+    np.random.seed(int(0x4d3d3d3))
+    pos = np.random.normal(0.5, scale=0.05, size=(NPART, 3)) * (DRE-DLE) + DLE
+    for i in range(3):
+        np.clip(pos[:,i], DLE[i], DRE[i], pos[:,i])
+    data = {"particle_position_%s" % ax: pos[:,i]
+            for i, ax in enumerate("xyz")}
+    ds = load_particles(data, 1.0, bbox=np.array([DLE, DRE]).T)
+    index = ds.index
+    if _get_fork_context() is None:
+        return
+    serial = ParticleRegions(ds.domain_left_edge, ds.domain_right_edge,
+                             index._regions_dims, 1)
+    morton = index.io._initialize_index(index.data_files[0], serial)
+    morton.sort()
+    rv = list(index._pool_morton([0], 2))
+    assert_equal(len(rv), 1)
+    fi, pool_morton, touched = rv[0]
+    assert_equal(fi, 0)
+    assert_equal(pool_morton, morton)
+    assert_equal(touched, np.flatnonzero(serial.masks[0]))
+    assert_equal(touched, np.flatnonzero(index.regions.masks[0]))
+
 class FakeDS:
     domain_left_edge = None
     domain_right_edge = None
@@ -218,6 +352,53 @@ def test_particle_regions():
             assert_equal(maxs, mins)
             assert_equal(maxs, np.unique(mask))
 
+def test_single_file_regions():
+    np.random.seed(int(0x4d3d3d3))
+    nfiles = 130
+    pos = np.random.normal(0.5, scale=0.05, size=(NPART,3)) * (DRE-DLE) + DLE
+    for i in range(3):
+        np.clip(pos[:,i], DLE[i], DRE[i], pos[:,i])
+    reg = ParticleRegions(DLE, DRE, [16, 16, 16], nfiles)
+    reg.add_data_file(pos, 129)
+    sreg = _SingleFileRegions(DLE, DRE, [16, 16, 16])
+    sreg.add_data_file(pos, 129)
+    touched = np.flatnonzero(reg.masks[129 // 64])
+    assert_equal(sreg.touched_cells(), touched)
+
+def test_particle_cell_ranges():
+    np.random.seed(int(0x4d3d3d3))
+    pos = np.random.random((NPART, 3)) * (DRE-DLE) + DLE
+    data = dict(("particle_position_%s" % ax, pos[:,i])
+                for i, ax in enumerate('xyz'))
+    bbox = np.array([DLE, DRE]).T
+    ds = load_particles(data, 1.0, bbox = bbox)
+    sp = ds.sphere([2.0, 3.0, 4.0], 1.5)
+    # Unsorted particles spread over the whole file.
+    ranges = ParticleCellRanges(DLE, DRE, 16, pos)
+    assert(ranges.coverage > 2.0)
+    ijk = np.floor((pos - DLE) / ((DRE - DLE) / 16)).astype("int64")
+    cells = np.ravel_multi_index(ijk.T, (16, 16, 16))
+    assert_equal(ranges.cells, np.unique(cells))
+    for i in [0, ranges.cells.size // 2, ranges.cells.size - 1]:
+        members = np.flatnonzero(cells == ranges.cells[i])
+        assert_equal(ranges.starts[i], members[0])
+        assert_equal(ranges.stops[i], members[-1] + 1)
+    # Sorting by coarse cell makes the ranges tight.
+    ijk = np.floor((pos - DLE) / ((DRE - DLE) / 16)).astype("int64")
+    pos = pos[np.argsort(np.ravel_multi_index(ijk.T, (16, 16, 16)))]
+    ranges = ParticleCellRanges(DLE, DRE, 16, pos)
+    assert_equal(ranges.coverage, 1.0)
+    for selector in [sp.selector, AlwaysSelector(ds)]:
+        mask = selector.select_points(pos[:,0], pos[:,1], pos[:,2], 0.0)
+        covered = np.zeros(NPART, dtype="bool")
+        last = -1
+        for start, stop in ranges.select_ranges(selector):
+            assert(start > last)
+            covered[start:stop] = True
+            last = stop
+        assert_equal(mask & ~covered, np.zeros(NPART, dtype="bool"))
+    assert(covered.all())
+
 def test_position_location():
     np.random.seed(int(0x4d3d3d3))
     pos = np.random.normal(0.5, scale=0.05, size=(NPART,3)) * (DRE-DLE) + DLE
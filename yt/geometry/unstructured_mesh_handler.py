@@ -26,6 +26,9 @@ class UnstructuredIndex(Index):
     """The Index subclass for unstructured and hexahedral mesh datasets. """
     _global_mesh = False
     _unsupported_objects = ('proj', 'covering_grid', 'smoothed_covering_grid')
+    # Mesh elements have no integer cell coordinates to match points against,
+    # so Dataset.find_field_values_at_points samples them one at a time.
+    _find_field_values_at_points = None
 
     def __init__(self, ds, dataset_type):
         self.dataset_type = dataset_type
@@ -21,6 +21,10 @@ from __future__ import absolute_import
 #
 
 import os
+import yt as __yt
+from yt.utilities.lazy_imports import load_lazy_attributes
+# Make the names that yt imports lazily part of the star import as well.
+load_lazy_attributes(__yt)
 from yt import *
 
 # This next item will handle most of the actual startup procedures, but it will
@@ -28,12 +28,13 @@ from yt.testing import \
 from yt.units.unit_registry import UnitRegistry
 from yt.units import electrostatic_unit, elementary_charge
 from yt.units.unit_object import default_unit_registry
+from yt.units.yt_array import YTArray
 
 # dimensions
 from yt.units.dimensions import \
     mass, length, time, temperature, energy, magnetic_field, power, rate
 # functions
-from yt.units.unit_object import get_conversion_factor
+from yt.units.unit_object import get_conversion_factor, _parse_unit_string
 # classes
 from yt.units.unit_object import Unit, UnitParseError, InvalidUnitOperation
 # objects
@@ -535,3 +536,28 @@ def test_list_same_dimensions():
             else:
                 _, dim2, _, _ = reg.lut[name2]
             assert_true(u1.dimensions is dim2)
+
+def test_unit_caches():
+    reg1 = UnitRegistry()
+    reg2 = UnitRegistry()
+    for reg in (reg1, reg2):
+        reg.add("code_length", 1.0, length)
+        reg.add("code_time", 1.0, time)
+    _parse_unit_string.cache_clear()
+    u1 = Unit("code_length/code_time", registry=reg1)
+    u2 = Unit("code_length/code_time", registry=reg2)
+    # The string is only parsed once, but each registry has its own units.
+    assert_equal(_parse_unit_string.cache_info().misses, 1)
+    assert_true(u1.registry is reg1)
+    assert_true(u2.registry is reg2)
+    assert_true(Unit("code_length/code_time", registry=reg1) is u1)
+
+    # Units that use a modified symbol are not reused.
+    reg1.modify("code_length", 10.0)
+    u3 = Unit("code_length/code_time", registry=reg1)
+    assert_equal(u3.base_value, 10.0)
+    assert_equal(u2.base_value, 1.0)
+    a = YTArray([1.0, 2.0], "cm", registry=reg1)
+    assert_equal(a.in_units("code_length").d, [0.1, 0.2])
+    reg1.modify("code_length", 2.0)
+    assert_equal(a.in_units("code_length").d, [0.5, 1.0])
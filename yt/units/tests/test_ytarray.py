@@ -37,7 +37,8 @@ from yt.units.yt_array import \
     unary_operators, binary_operators, \
     uconcatenate, uintersect1d, \
     uhstack, uvstack, ustack, \
-    uunion1d, loadtxt, savetxt
+    uunion1d, loadtxt, savetxt, \
+    binary_unit_result, value_conversion_count
 from yt.utilities.exceptions import \
     YTUnitOperationError, YTUfuncUnitError
 from yt.testing import \
@@ -1379,3 +1380,29 @@ def test_ones_and_zeros_like():
     assert_equal(zd.units, data.units)
     assert_equal(od, YTArray([1, 1, 1], 'cm'))
     assert_equal(od.units, data.units)
+
+def test_memoized_unit_algebra():
+    from yt.units import km
+
+    a = YTArray([1., 2., 3.], 'cm')
+    b = YTArray([4., 5., 6.], 'g')
+    binary_unit_result.cache_clear()
+    for i in range(3):
+        c = a * b
+    assert_equal(c.units, a.units * b.units)
+    info = binary_unit_result.cache_info()
+    assert_equal(info.misses, 1)
+    assert_equal(info.hits, 2)
+    # Mixed units of the same dimensions collapse to a dimensionless number.
+    assert_equal(binary_unit_result(np.divide, km.units, cm.units),
+                 (YTArray(1, '').units, 1e5))
+
+    # Operations that only combine units do not change any values...
+    count = value_conversion_count()
+    a * b + a * b
+    np.sqrt(a * a)
+    assert_equal(value_conversion_count(), count)
+    # ...but unit conversions do.
+    assert_array_equal(a + [1, 2, 3]*km, YTArray([100001., 200002., 300003.],
+                                                 'cm'))
+    assert_equal(value_conversion_count(), count + 1)
@@ -35,6 +35,7 @@ from yt.units.unit_registry import \
     UnitRegistry, \
     UnitParseError
 from yt.utilities.exceptions import YTUnitsNotReducible
+from yt.utilities.lru_cache import lru_cache
 
 import copy
 import token
@@ -148,6 +149,24 @@ def get_latex_representation(expr, registry):
 
 unit_text_transform = (auto_positive_symbol, rationalize, auto_number)
 
+@lru_cache(maxsize=1024, typed=False)
+def _parse_unit_string(unit_string):
+    """
+    Parse a unit string into a sympy expression.  This does not depend on
+    any unit registry, so the result is cached for every registry.
+    """
+    if not unit_string:
+        # Bug catch...
+        # if unit_string is an empty string, parse_expr fails hard...
+        unit_string = "1"
+    try:
+        return parse_expr(unit_string, global_dict=global_dict,
+                          transformations=unit_text_transform)
+    except SyntaxError as e:
+        msg = ("Unit expression %s raised an error "
+               "during parsing:\n%s" % (unit_string, repr(e)))
+        raise UnitParseError(msg)
+
 class Unit(Expr):
     """
     A symbolic unit, using sympy functionality. We only add "dimensions" so
@@ -198,21 +217,13 @@ class Unit(Expr):
             if isinstance(unit_expr, bytes):
                 unit_expr = unit_expr.decode("utf-8")
 
-            if registry and unit_expr in registry.unit_objs:
+            if registry is None:
+                registry = default_unit_registry
+            if unit_expr in registry.unit_objs:
                 return registry.unit_objs[unit_expr]
             else:
                 unit_key = unit_expr
-                if not unit_expr:
-                    # Bug catch...
-                    # if unit_expr is an empty string, parse_expr fails hard...
-                    unit_expr = "1"
-                try:
-                    unit_expr = parse_expr(unit_expr, global_dict=global_dict,
-                                           transformations=unit_text_transform)
-                except SyntaxError as e:
-                    msg = ("Unit expression %s raised an error "
-                           "during parsing:\n%s" % (unit_expr, repr(e)))
-                    raise UnitParseError(msg)
+                unit_expr = _parse_unit_string(unit_expr)
         elif isinstance(unit_expr, Unit):
             # grab the unit object's sympy expression.
             unit_expr = unit_expr.expr
@@ -30,6 +30,11 @@ SYMPY_VERSION = LooseVersion(sympy_version)
 def positive_symbol_replacer(match):
     return match.group().replace(')\')', ')\', positive=True)')
 
+# Caches of unit conversions that depend on the contents of unit registries.
+# These are cleared whenever a symbol is added to, modified in or removed
+# from any registry.
+registry_caches = []
+
 class SymbolNotFoundError(Exception):
     pass
 
@@ -98,6 +103,7 @@ class UnitRegistry:
 
         # Add to lut
         self.lut.update({symbol: (base_value, dimensions, offset, tex_repr)})
+        self._clear_caches()
 
     def remove(self, symbol):
         """
@@ -110,8 +116,7 @@ class UnitRegistry:
                 "in this registry." % symbol)
 
         del self.lut[symbol]
-        if symbol in self.unit_objs:
-            del self.unit_objs[symbol]
+        self._clear_caches()
 
     def modify(self, symbol, base_value):
         """
@@ -133,9 +138,14 @@ class UnitRegistry:
 
         self.lut[symbol] = ((float(base_value), new_dimensions) +
                             self.lut[symbol][2:])
-
-        if symbol in self.unit_objs:
-            del self.unit_objs[symbol]
+        self._clear_caches()
+
+    def _clear_caches(self):
+        # Any cached unit may refer to the symbol that changed, for instance
+        # code_length/code_time after code_length is modified.
+        self.unit_objs.clear()
+        for cache in registry_caches:
+            cache.cache_clear()
 
     def keys(self):
         """
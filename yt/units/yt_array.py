@@ -13,6 +13,7 @@ from __future__ import print_function
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+import contextlib
 import copy
 import numpy as np
 
@@ -36,8 +37,13 @@ try:
 except ImportError:
     positive, divmod_, isnat, heaviside = (None,)*4
 
-from yt.units.unit_object import Unit, UnitParseError
-from yt.units.unit_registry import UnitRegistry
+from yt.units.unit_object import \
+    Unit, \
+    UnitParseError, \
+    get_conversion_factor
+from yt.units.unit_registry import \
+    UnitRegistry, \
+    registry_caches
 from yt.units.dimensions import \
     angle, \
     current_mks, \
@@ -130,6 +136,7 @@ def get_inp_u_unary(ufunc, inputs, out_arr=None):
     if u is None:
         u = NULL_UNIT
     if u.dimensions is angle and ufunc in trigonometric_operators:
+        _note_value_conversion()
         inp = inp.in_units('radian').v
         if out_arr is not None:
             out_arr = ufunc(inp).view(np.ndarray)
@@ -156,18 +163,79 @@ def get_inp_u_binary(ufunc, inputs):
             unit2 = 1.0
     return (inp1, inp2), (unit1, unit2), ret_class
 
+# The number of times an operation on YTArrays has changed the values of its
+# operands or result because of their units, either by converting between
+# units or by letting an all-zero operand take the units of the other one.
+# Derived fields use this to tell whether the result of a field function
+# depends on anything but the units of its inputs.
+_value_conversions = [0]
+
+def value_conversion_count():
+    return _value_conversions[0]
+
+def _note_value_conversion():
+    _value_conversions[0] += 1
+
+@contextlib.contextmanager
+def uncounted_value_conversions():
+    """
+    Conversions made within this context are not counted, for instance
+    those of the fields a derived field depends on, made as they are read or
+    generated rather than by the derived field's function.
+    """
+    count = _value_conversions[0]
+    try:
+        yield
+    finally:
+        _value_conversions[0] = count
+
+@lru_cache(maxsize=512, typed=False)
+def binary_unit_result(ufunc, unit1, unit2):
+    """
+    Returns the units of the result of the binary *ufunc* applied to arrays
+    in *unit1* and *unit2*, and the factor the result needs to be multiplied
+    by, or None.  This is memoized on the ufunc and the units, so the unit
+    algebra is only done once for each combination.
+    """
+    unit_operator = YTArray._ufunc_registry[ufunc]
+    unit = unit_operator(unit1, unit2)
+    if unit_operator in (multiply_units, divide_units):
+        if unit.is_dimensionless and unit.base_value != 1.0:
+            if not unit1.is_dimensionless:
+                if unit1.dimensions == unit2.dimensions:
+                    return Unit(registry=unit.registry), unit.base_value
+    return unit, None
+
+@lru_cache(maxsize=512, typed=False)
+def operand_conversion(ufunc, unit1, unit2):
+    """
+    Returns the conversion factor and offset that bring the second operand
+    of *ufunc*, in *unit2*, to the units of the first, *unit1*.  This is
+    memoized on the ufunc and the units.
+    """
+    if not unit1.same_dimensions_as(unit2):
+        raise YTUnitOperationError(ufunc, unit1, unit2)
+    return get_conversion_factor(unit2, unit1)
+
+def _convert_operand(inp, units, ufunc, ret_class):
+    factor, offset = operand_conversion(ufunc, units[0], units[1])
+    _note_value_conversion()
+    if offset is not None:
+        return ret_class(inp).to(units[0])
+    return np.asarray(inp) * factor
+
 def handle_preserve_units(inps, units, ufunc, ret_class):
     if units[0] != units[1]:
         any_nonzero = [np.any(inps[0]), np.any(inps[1])]
         if any_nonzero[0] == np.bool_(False):
+            _note_value_conversion()
             units = (units[1], units[1])
         elif any_nonzero[1] == np.bool_(False):
+            _note_value_conversion()
             units = (units[0], units[0])
         else:
-            if not units[0].same_dimensions_as(units[1]):
-                raise YTUnitOperationError(ufunc, *units)
-            inps = (inps[0], ret_class(inps[1]).to(
-                ret_class(inps[0]).units))
+            inps = (inps[0], _convert_operand(inps[1], units, ufunc,
+                                              ret_class))
     return inps, units
 
 def handle_comparison_units(inps, units, ufunc, ret_class, raise_error=False):
@@ -176,8 +244,10 @@ def handle_comparison_units(inps, units, ufunc, ret_class, raise_error=False):
         u2d = units[1].is_dimensionless
         any_nonzero = [np.any(inps[0]), np.any(inps[1])]
         if any_nonzero[0] == np.bool_(False):
+            _note_value_conversion()
             units = (units[1], units[1])
         elif any_nonzero[1] == np.bool_(False):
+            _note_value_conversion()
             units = (units[0], units[0])
         elif not any([u1d, u2d]):
             if not units[0].same_dimensions_as(units[1]):
@@ -185,14 +255,15 @@ def handle_comparison_units(inps, units, ufunc, ret_class, raise_error=False):
             else:
                 if raise_error:
                     raise YTUfuncUnitError(ufunc, *units)
-                inps = (inps[0], ret_class(inps[1]).to(
-                    ret_class(inps[0]).units))
+                inps = (inps[0], _convert_operand(inps[1], units, ufunc,
+                                                  ret_class))
     return inps, units
 
 def handle_multiply_divide_units(unit, units, out, out_arr):
     if unit.is_dimensionless and unit.base_value != 1.0:
         if not units[0].is_dimensionless:
             if units[0].dimensions == units[1].dimensions:
+                _note_value_conversion()
                 out_arr = np.multiply(out_arr.view(np.ndarray),
                                       unit.base_value, out=out)
                 unit = Unit(registry=unit.registry)
@@ -233,10 +304,14 @@ def sanitize_units_add(this_object, other_object, op_string):
             # handle special case of adding or subtracting with zero or
             # array filled with zero
             if not np.any(other_object):
+                _note_value_conversion()
                 return ret.view(np.ndarray)
             elif not np.any(this_object):
+                _note_value_conversion()
                 return ret
             raise YTUnitOperationError(op_string, inp.units, ret.units)
+        if ret.units != inp.units:
+            _note_value_conversion()
         ret = ret.in_units(inp.units)
     else:
         # If the other object is not a YTArray, then one of the arrays must be
@@ -253,6 +328,7 @@ def validate_comparison_units(this, other, op_string):
                 return other
         if not this.units.same_dimensions_as(other.units):
             raise YTUnitOperationError(op_string, this.units, other.units)
+        _note_value_conversion()
         return other.in_units(this.units)
 
     return other
@@ -282,6 +358,18 @@ def _unit_repr_check_same(my_units, other_units):
 
     return other_units
 
+@lru_cache(maxsize=512, typed=False)
+def unit_conversion(old_units, new_units):
+    """
+    Returns the Unit object for *new_units*, which may be a string that is
+    interpreted with the registry of *old_units*, and the conversion factor
+    and offset from *old_units* to it.
+    """
+    new_units = _unit_repr_check_same(old_units, new_units)
+    return (new_units, ) + old_units.get_conversion_factor(new_units)
+
+registry_caches.extend([_unit_repr_check_same, unit_conversion])
+
 unary_operators = (
     negative, absolute, rint, sign, conj, exp, exp2, log, log2,
     log10, expm1, log1p, sqrt, square, reciprocal, sin, cos, tan, arcsin,
@@ -545,8 +633,10 @@ class YTArray(np.ndarray):
             The units you want to convert to.
 
         """
-        new_units = _unit_repr_check_same(self.units, units)
-        (conversion_factor, offset) = self.units.get_conversion_factor(new_units)
+        new_units, conversion_factor, offset = unit_conversion(self.units,
+                                                               units)
+        if conversion_factor != 1.0 or offset:
+            _note_value_conversion()
 
         self.units = new_units
         values = self.d
@@ -618,8 +708,10 @@ class YTArray(np.ndarray):
         YTArray
         """
         if equivalence is None:
-            new_units = _unit_repr_check_same(self.units, units)
-            (conversion_factor, offset) = self.units.get_conversion_factor(new_units)
+            new_units, conversion_factor, offset = unit_conversion(
+                self.units, units)
+            if conversion_factor != 1.0 or offset:
+                _note_value_conversion()
 
             new_array = type(self)(self.ndview * conversion_factor, new_units)
 
@@ -743,6 +835,7 @@ class YTArray(np.ndarray):
         if self.units.same_dimensions_as(conv_unit):
             return self.in_units(conv_unit)
         this_equiv = equivalence_registry[equiv]()
+        _note_value_conversion()
         oneway_or_equivalent = (
             conv_unit.has_equivalent(equiv) or this_equiv._one_way)
         if self.has_equivalent(equiv) and oneway_or_equivalent:
@@ -1367,12 +1460,17 @@ class YTArray(np.ndarray):
                 elif unit_operator is preserve_units:
                     inps, units = handle_preserve_units(
                          inps, units, ufunc, ret_class)
-                unit = unit_operator(*units)
+                if ufunc is power:
+                    unit = unit_operator(*units)
+                    factor = None
+                else:
+                    unit, factor = binary_unit_result(ufunc, *units)
                 out_arr = func(np.asarray(inps[0]), np.asarray(inps[1]),
                                out=out, **kwargs)
-                if unit_operator in (multiply_units, divide_units):
-                    out, out_arr, unit = handle_multiply_divide_units(
-                        unit, units, out, out_arr)
+                if factor is not None:
+                    _note_value_conversion()
+                    out_arr = np.multiply(out_arr.view(np.ndarray), factor,
+                                          out=out)
             else:
                 raise RuntimeError(
                     "Support for the %s ufunc with %i inputs has not been"
@@ -1065,6 +1065,29 @@ class YTNotebookCmd(YTCommand):
 
 
 
+class YTSortParticlesCmd(YTCommand):
+    args = ('outputfn', 'ds',
+            dict(longname="--index-order", action="store", type=int,
+                 default=6, dest="index_order",
+                 help="Number of Morton levels in the offset index."))
+    name = "sort_particles"
+    description = \
+        """
+        Rewrite a particle dataset sorted along a Morton curve, with an
+        offset index for fast spatial selections
+
+        """
+
+    def __call__(self, args):
+        from yt.frontends.ytdata.utilities import save_sorted_particles
+        ds = args.ds
+        if args.output is None:
+            output = "%s_sorted.h5" % ds.basename.rsplit(".", 1)[0]
+        else:
+            output = args.output
+        save_sorted_particles(ds, output, index_order=args.index_order)
+        print("Wrote %s" % output)
+
 class YTStatsCmd(YTCommand):
     args = ('outputfn','bn','skip','ds','field',
             dict(longname="--max", action='store_true', default=False,
@@ -1302,6 +1325,8 @@ class YTSearchCmd(YTCommand):
     def __call__(self, args):
         from yt.utilities.parameter_file_storage import \
             output_type_registry
+        from yt.frontends.api import import_frontends
+        import_frontends()
         candidates = []
         for base, dirs, files in os.walk(".", followlinks=True):
             print("(% 10i candidates) Examining %s" % (len(candidates), base))
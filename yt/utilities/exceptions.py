@@ -583,6 +583,19 @@ class YTInvalidFieldType(YTException):
                "field instead?" % self.fields)
         return msg
 
+class YTPointSamplingParticleField(YTException):
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        msg = ("\nField values can only be sampled at points for fields "
+               "defined on a mesh,\nbut received the following particle "
+               "fields:\n\n"
+               "    %s\n\n"
+               "Did you mean to sample a deposited or smoothed particle "
+               "field instead?" % self.fields)
+        return msg
+
 class YTUnknownUniformKind(YTException):
     def __init__(self, kind):
         self.kind = kind
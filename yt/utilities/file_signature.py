@@ -0,0 +1,127 @@
+"""
+Cheap, shared information about a file or directory passed to yt.load
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import os
+
+from yt.utilities.on_demand_imports import _h5py as h5py
+
+# The HDF5 superblock signature, which is found at offset 0 or, when the
+# file has a user block, at offset 512, 1024, 2048, ...
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+
+class FileSignature(object):
+    """
+    Describes the path given to yt.load by its extension, its first bytes
+    and, for HDF5 files, the names of the groups and attributes in its root.
+    Each of these is read at most once, so they can be shared between the
+    prefilters of every frontend.
+
+    Parameters
+    ----------
+    path : string
+        The file or directory.
+    header_size : int
+        The number of bytes at the start of the file available in
+        ``header``.
+    """
+    def __init__(self, path, header_size=1024):
+        self.path = path
+        self.header_size = header_size
+        self.is_dir = os.path.isdir(path)
+        self.is_file = os.path.isfile(path)
+        self._header = None
+        self._is_hdf5 = None
+        self._hdf5_root = None
+
+    @property
+    def header(self):
+        """The first bytes of the file, or b"" if it cannot be read."""
+        if self._header is None:
+            self._header = b""
+            if self.is_file:
+                try:
+                    with open(self.path, "rb") as f:
+                        self._header = f.read(self.header_size)
+                except (IOError, OSError):
+                    pass
+        return self._header
+
+    def endswith(self, suffixes):
+        """Whether the path ends with any of the strings in *suffixes*."""
+        return self.path.endswith(tuple(suffixes))
+
+    def startswith(self, prefixes):
+        """Whether the file starts with any of the byte strings *prefixes*."""
+        return self.header.startswith(tuple(prefixes))
+
+    @property
+    def is_hdf5(self):
+        if self._is_hdf5 is None:
+            self._is_hdf5 = self._find_hdf5_signature()
+        return self._is_hdf5
+
+    def _find_hdf5_signature(self):
+        if not self.is_file:
+            return False
+        if self.header.startswith(HDF5_SIGNATURE):
+            return True
+        try:
+            size = os.path.getsize(self.path)
+            offset = 512
+            with open(self.path, "rb") as f:
+                while offset + len(HDF5_SIGNATURE) <= size:
+                    f.seek(offset)
+                    if f.read(len(HDF5_SIGNATURE)) == HDF5_SIGNATURE:
+                        return True
+                    offset *= 2
+        except (IOError, OSError):
+            pass
+        return False
+
+    def _read_hdf5_root(self):
+        if self._hdf5_root is None:
+            self._hdf5_root = (None, None)
+            if self.is_hdf5:
+                try:
+                    with h5py.File(self.path, "r") as f:
+                        self._hdf5_root = (frozenset(f["/"].keys()),
+                                           frozenset(f.attrs.keys()))
+                except Exception:
+                    pass
+        return self._hdf5_root
+
+    @property
+    def hdf5_groups(self):
+        """
+        The names of the members of the root group of an HDF5 file, or None
+        if they cannot be read.
+        """
+        return self._read_hdf5_root()[0]
+
+    @property
+    def hdf5_attrs(self):
+        """
+        The names of the attributes of the root group of an HDF5 file, or
+        None if they cannot be read.
+        """
+        return self._read_hdf5_root()[1]
+
+    def stat_key(self):
+        """
+        A key that changes when the file or directory is modified, for
+        caching what has been learned about it.
+        """
+        st = os.stat(self.path)
+        return (os.path.abspath(self.path), st.st_mtime, st.st_size)
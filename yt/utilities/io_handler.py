@@ -13,36 +13,127 @@ The data-file handling functions
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from contextlib import contextmanager
 
 import os
+import threading
 from yt.utilities.on_demand_imports import _h5py as h5py
 import numpy as np
+from yt.config import ytcfg
 from yt.extern.six import add_metaclass
-from yt.utilities.lru_cache import \
-    local_lru_cache, _make_key
 from yt.geometry.selection_routines import GridSelector
 
 _axis_ids = {0:2,1:1,2:0}
 
 io_registry = {}
 
-use_caching = 0
-
-def _make_io_key( args, *_args, **kwargs):
-    self, obj, field, ctx = args
-    # Ignore self because we have a self-specific cache
-    return _make_key((obj.id, field), *_args, **kwargs)
+def _io_key(obj):
+    # The key of the data read for obj.  Grid slabs share the id of their
+    # grid, but are read separately when the IO handler reads hyperslabs.
+    return getattr(obj, "io_key", obj.id)
 
 class RegisteredIOHandler(type):
     def __init__(cls, name, b, d):
         type.__init__(cls, name, b, d)
         if hasattr(cls, "_dataset_type"):
             io_registry[cls._dataset_type] = cls
-        if use_caching and hasattr(cls, "_read_obj_field"):
-            cls._read_obj_field = local_lru_cache(maxsize=use_caching, 
-                    typed=True, make_key=_make_io_key)(cls._read_obj_field)
+
+class FieldCache(object):
+    """
+    A least-recently-used cache of raw on-disk field data, keyed by
+    (object id, field) and bounded by the total number of bytes it holds.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The memory budget of the cache.  Zero or less disables caching.
+    """
+    def __init__(self, max_bytes = 0):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # The cache may be used by io prefetching threads.
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key):
+        """
+        Return the data stored under *key*, or None, marking it as the most
+        recently used entry.
+        """
+        with self._lock:
+            data = self._data.pop(key, None)
+            if data is None:
+                self.misses += 1
+                return None
+            self._data[key] = data
+            self.hits += 1
+            return data
+
+    def get_all(self, keys):
+        """
+        Return a list of the data stored under each of *keys*, or None if
+        any of them is missing.
+        """
+        with self._lock:
+            if any(key not in self._data for key in keys):
+                self.misses += 1
+                return None
+            rv = []
+            for key in keys:
+                data = self._data.pop(key)
+                self._data[key] = data
+                rv.append(data)
+            self.hits += 1
+            return rv
+
+    def put(self, key, data):
+        """
+        Store *data* under *key*, evicting the least recently used entries
+        until the cache fits in its budget.  Returns the array that was
+        stored, which is a compact copy if *data* was a view of a larger
+        buffer.
+        """
+        base = getattr(data, "base", None)
+        if isinstance(base, np.ndarray) and base.nbytes != data.nbytes:
+            # Don't pin a larger buffer (e.g. a multi-grid slab) in memory.
+            data = data.copy()
+        if data.nbytes > self.max_bytes:
+            return data
+        data.flags.writeable = False
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            while len(self._data) > 0 and \
+                  self.nbytes + data.nbytes > self.max_bytes:
+                _, evicted = self._data.popitem(last = False)
+                self.nbytes -= evicted.nbytes
+            self._data[key] = data
+            self.nbytes += data.nbytes
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def __repr__(self):
+        return "FieldCache(%s entries, %s of %s bytes, %s hits, %s misses)" \
+            % (len(self._data), self.nbytes, self.max_bytes, self.hits,
+               self.misses)
 
 @add_metaclass(RegisteredIOHandler)
 class BaseIOHandler(object):
@@ -52,6 +143,17 @@ class BaseIOHandler(object):
     _cache_on = False
     _misses = 0
     _hits = 0
+    # Whether the particle readers only read the particles of a data file
+    # given by its _particle_slabs, so ParticleFileRange objects can be used
+    # to split up large files and ParticleFileSlabs objects to read just
+    # some particles.
+    _particle_ranges_supported = False
+    # Whether _read_fluid_selection and _read_particle_selection may be
+    # called from several threads at once.  Most handlers keep state between
+    # reads (open files, the last data file read, selector counts), so by
+    # default the reads made while prefetching are serialized.
+    _thread_safe_reads = False
+    _memmaps = None
 
     def __init__(self, ds):
         self.queue = defaultdict(dict)
@@ -60,6 +162,10 @@ class BaseIOHandler(object):
         self._last_selector_counts = None
         self._array_fields = {}
         self._cached_fields = {}
+        self.field_cache = FieldCache(ytcfg.getint("yt", "field_cache_size"))
+        self._read_lock = threading.RLock()
+        self._use_memmap = ytcfg.getboolean("yt", "memmap_particle_files")
+        self._memmaps = {}
         # Make sure _vector_fields is a dict of fields and their dimension
         # and assume all non-specified vector fields are 3D
         if not isinstance(self._vector_fields, dict):
@@ -100,6 +206,57 @@ class BaseIOHandler(object):
         else:
             return False
 
+    def _map_array(self, filename, offset, dtype, count):
+        """
+        Return *count* records of *dtype* starting *offset* bytes into
+        *filename* as a view of a memory map of the file, without reading
+        or copying them.  Each file is mapped once per IO handler, until
+        :meth:`close` is called.  The map is copy-on-write, so the view is
+        writeable but changes never reach the file.
+        """
+        dtype = np.dtype(dtype)
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        mm = self._memmaps.get(filename, None)
+        if mm is None:
+            mm = np.memmap(filename, dtype="uint8", mode="c")
+            self._memmaps[filename] = mm
+        return np.ndarray((count,), dtype=dtype, buffer=mm, offset=offset)
+
+    def close(self):
+        """
+        Release the memory maps made by :meth:`_map_array`.  Arrays already
+        handed out keep their own reference to the map, so they stay valid;
+        the file is unmapped once the last of them is gone.
+        """
+        if self._memmaps:
+            self._memmaps.clear()
+
+    def _read_slabs(self, dset, slabs, col=None):
+        """
+        Read and concatenate the (start, stop) ranges *slabs* along the
+        first axis of *dset*, optionally only column *col* of the second
+        axis.
+        """
+        if len(slabs) == 1:
+            start, stop = slabs[0]
+            if col is None:
+                return dset[start:stop]
+            return dset[start:stop, col]
+        npart = sum(stop - start for start, stop in slabs)
+        shape = (npart,) + dset.shape[1:]
+        if col is not None:
+            shape = (npart,)
+        data = np.empty(shape, dtype=dset.dtype)
+        ind = 0
+        for start, stop in slabs:
+            if col is None:
+                data[ind:ind + stop - start] = dset[start:stop]
+            else:
+                data[ind:ind + stop - start] = dset[start:stop, col]
+            ind += stop - start
+        return data
+
     def _read_data_set(self, grid, field):
         # check backup file first. if field not found,
         # call frontend-specific io method
@@ -138,16 +295,103 @@ class BaseIOHandler(object):
             else:
                 rv[field] = np.empty(size, dtype="=f8")
         ind = {field: 0 for field in fields}
-        for field, obj, data in self.io_iter(chunks, fields):
+        for field, obj, data in self._cached_io_iter(chunks, fields):
             if data is None:
                 continue
             if isinstance(selector, GridSelector) and field not in nodal_fields:
                 ind[field] += data.size
                 rv[field] = data.copy()
             else:
-                ind[field] += obj.select(selector, data, rv[field], ind[field])
+                ind[field] += self._select_into(
+                    obj, selector, data, rv[field], ind[field])
         return rv
 
+    def _fully_selected(self, obj, selector, dest):
+        # Returns the number of cells of the grid *obj* that *selector*
+        # selects, and whether that is every one of them (i.e. no cells are
+        # masked by the selector or by child grids) so the selected values
+        # occupy a C-ordered block of the 1D *dest*.
+        count = obj.count(selector)
+        full = count > 0 and count == obj.ActiveDimensions.prod() and \
+            dest.ndim == 1 and dest.flags.c_contiguous
+        return count, full
+
+    def _select_into(self, obj, selector, source, dest, offset):
+        """
+        Copy the values of *source* selected from the grid *obj* into *dest*,
+        starting at *offset*, and return the number of values copied.  This
+        is the same as ``obj.select``, except that grids that are selected
+        in their entirety are copied with a single (strided) assignment
+        rather than a boolean gather into a temporary array.
+        """
+        count, full = self._fully_selected(obj, selector, dest)
+        if count == 0:
+            return 0
+        if full and source.shape == tuple(obj.ActiveDimensions):
+            dest[offset:offset + count].reshape(source.shape)[...] = source
+            return count
+        return obj.select(selector, source, dest, offset)
+
+    def _read_into_selection(self, obj, selector, dest, offset, read_func):
+        """
+        Read the values of the grid *obj* selected by *selector* into
+        *dest*, starting at *offset*, and return the number of values read.
+
+        *read_func* is called with either None, in which case it must return
+        a newly read array shaped like ``obj.ActiveDimensions``, or with such
+        an array to read into.  Grids selected in their entirety are read
+        straight into *dest*, with no intermediate array at all.
+        """
+        count, full = self._fully_selected(obj, selector, dest)
+        if count == 0:
+            return 0
+        if full and dest.dtype == np.float64:
+            read_func(dest[offset:offset + count].reshape(
+                obj.ActiveDimensions))
+            return count
+        return obj.select(selector, read_func(None), dest, offset)
+
+    def _cached_io_iter(self, chunks, fields):
+        # This wraps io_iter, serving (obj, field) pairs from the field cache
+        # where possible and only handing io_iter the objects with something
+        # left to read.  Within a field, objects are yielded in chunk order.
+        cache = self.field_cache
+        if not cache.enabled:
+            for rv in self.io_iter(chunks, fields):
+                yield rv
+            return
+        from yt.geometry.geometry_handler import YTDataChunk
+        for chunk in chunks:
+            # We hold on to the cached arrays for this chunk, so that reading
+            # the missing objects can't evict them before they are used.
+            found = {}
+            missing = []
+            for obj in chunk.objs:
+                data = cache.get_all([(_io_key(obj), field)
+                                      for field in fields])
+                if data is None:
+                    missing.append(obj)
+                else:
+                    found[_io_key(obj)] = data
+            if len(missing) > 0:
+                sub = YTDataChunk(chunk.dobj, chunk.chunk_type, missing,
+                                  cache = False)
+                fetched = defaultdict(dict)
+                for field, obj, data in self.io_iter([sub], fields):
+                    if data is not None:
+                        data = cache.put((_io_key(obj), field), data)
+                    fetched[_io_key(obj)][field] = data
+                for obj_id, data in fetched.items():
+                    found[obj_id] = [data.get(field) for field in fields]
+                del fetched
+            for obj in chunk.objs:
+                # Objects io_iter skipped (e.g. with no data file) are
+                # skipped here as well.
+                for field, data in zip(fields, found.pop(_io_key(obj), ())):
+                    if data is None:
+                        continue
+                    yield field, obj, data
+
     def _read_data_slice(self, grid, field, axis, coord):
         sl = [slice(None), slice(None), slice(None)]
         sl[axis] = slice(coord, coord + 1)
@@ -0,0 +1,81 @@
+"""
+Attributes of a module that are imported the first time they are used.
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import importlib
+import sys
+import types
+
+def _resolve(spec):
+    if callable(spec):
+        return spec()
+    module_name, attribute = spec
+    module = importlib.import_module(module_name)
+    if attribute is None:
+        return module
+    return getattr(module, attribute)
+
+class LazyModule(types.ModuleType):
+    """
+    A module some of whose attributes, listed in its ``_lazy_attributes``,
+    are only imported the first time they are accessed.
+    """
+    _lazy_attributes = {}
+
+    def __getattr__(self, name):
+        # This is only called for attributes that are not set yet.
+        if name not in self._lazy_attributes:
+            raise AttributeError("module '%s' has no attribute '%s'" %
+                                 (self.__name__, name))
+        value = _resolve(self._lazy_attributes[name])
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+def add_lazy_attributes(module_name, attributes):
+    """
+    Add attributes to the module *module_name* that are imported the first
+    time they are accessed.
+
+    Parameters
+    ----------
+    module_name : string
+        The name of the module, usually ``__name__``.
+    attributes : dict
+        Maps the name of each attribute to either a tuple of the name of the
+        module it is imported from and its name in that module (None for the
+        module itself), or a function of no arguments that returns it.
+
+    Python versions before 3.5 do not allow the class of a module to be
+    changed, so there the attributes are imported right away.
+    """
+    module = sys.modules[module_name]
+    if sys.version_info < (3, 5):
+        for name, spec in attributes.items():
+            setattr(module, name, _resolve(spec))
+        return
+    lazy_attributes = dict(getattr(module, "_lazy_attributes", {}))
+    lazy_attributes.update(attributes)
+    module.__class__ = LazyModule
+    module._lazy_attributes = lazy_attributes
+
+def load_lazy_attributes(module):
+    """
+    Import every lazy attribute of *module*, for instance so that they are
+    included in ``from module import *``.
+    """
+    for name in getattr(module, "_lazy_attributes", {}):
+        getattr(module, name)
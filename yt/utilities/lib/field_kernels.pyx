@@ -0,0 +1,140 @@
+"""
+Fused kernels for frequently used derived fields
+
+These evaluate a derived field in a single pass over bare float64 buffers,
+instead of as a chain of array operations that each allocate a temporary.
+Units are the responsibility of the caller.
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+cimport numpy as np
+cimport cython
+from libc.math cimport sqrt
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def product(np.float64_t[:] a, np.float64_t[:] b, np.float64_t[:] out):
+    """
+    Fill *out* with the elementwise product of *a* and *b*.
+    """
+    cdef Py_ssize_t i
+    with nogil:
+        for i in range(out.shape[0]):
+            out[i] = a[i] * b[i]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def magnitude(components, np.float64_t[:] bulk, np.float64_t[:] out):
+    """
+    Fill *out* with the magnitude of the vector whose components are the
+    1D arrays in the list *components*, less the *bulk* vector.
+    """
+    cdef int ndim = len(components)
+    cdef np.float64_t[:] vx = components[0]
+    cdef np.float64_t[:] vy = components[min(1, ndim - 1)]
+    cdef np.float64_t[:] vz = components[ndim - 1]
+    cdef np.float64_t v, tr
+    cdef Py_ssize_t i
+    with nogil:
+        for i in range(out.shape[0]):
+            v = vx[i] - bulk[0]
+            tr = v * v
+            if ndim > 1:
+                v = vy[i] - bulk[1]
+                tr = tr + v * v
+            if ndim > 2:
+                v = vz[i] - bulk[2]
+                tr = tr + v * v
+            out[i] = sqrt(tr)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def kinetic_energy(np.float64_t[:] rho, np.float64_t[:] vx,
+                   np.float64_t[:] vy, np.float64_t[:] vz,
+                   np.float64_t[:] bulk, np.float64_t[:] out):
+    """
+    Fill *out* with 0.5 * rho * |v - bulk|**2.
+    """
+    cdef np.float64_t v, tr
+    cdef Py_ssize_t i
+    with nogil:
+        for i in range(out.shape[0]):
+            v = vx[i] - bulk[0]
+            tr = v * v
+            v = vy[i] - bulk[1]
+            tr = tr + v * v
+            v = vz[i] - bulk[2]
+            tr = tr + v * v
+            out[i] = 0.5 * rho[i] * tr
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef inline np.float64_t _diff(np.float64_t[:,:,:] f, int axis, int i, int j,
+                               int k, int il, int ir) nogil:
+    # The one-sided or centered difference of f along axis at the interior
+    # cell (i, j, k).  il and ir are the offsets of the left and right
+    # values from the cell before (i, j, k) along the axis.
+    if axis == 0:
+        return f[i - 1 + ir, j, k] - f[i - 1 + il, j, k]
+    elif axis == 1:
+        return f[i, j - 1 + ir, k] - f[i, j - 1 + il, k]
+    return f[i, j, k - 1 + ir] - f[i, j, k - 1 + il]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def divergence(np.float64_t[:,:,:] vx, np.float64_t[:,:,:] vy,
+               np.float64_t[:,:,:] vz, np.float64_t[:] ds, int il, int ir,
+               np.float64_t[:,:,:] out):
+    """
+    Fill the interior of *out* with the divergence of (vx, vy, vz), using
+    differences between the values *il* and *ir* cells after the previous
+    cell along each axis and the spacings (times the difference factor)
+    *ds*.  The outermost layer of cells is set to zero.
+    """
+    cdef int i, j, k
+    out[:, :, :] = 0.0
+    with nogil:
+        for i in range(1, out.shape[0] - 1):
+            for j in range(1, out.shape[1] - 1):
+                for k in range(1, out.shape[2] - 1):
+                    out[i, j, k] = _diff(vx, 0, i, j, k, il, ir) / ds[0] \
+                                 + _diff(vy, 1, i, j, k, il, ir) / ds[1] \
+                                 + _diff(vz, 2, i, j, k, il, ir) / ds[2]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def curl_component(np.float64_t[:,:,:] a, int axis_a, np.float64_t ds_a,
+                   np.float64_t[:,:,:] b, int axis_b, np.float64_t ds_b,
+                   int il, int ir, np.float64_t[:,:,:] out):
+    """
+    Fill the interior of *out* with d(a)/d(axis_a) - d(b)/d(axis_b), which
+    is one component of the curl of a vector field.  The differences are
+    taken as in :func:`divergence`.  The outermost layer of cells is set to
+    zero.
+    """
+    cdef int i, j, k
+    out[:, :, :] = 0.0
+    with nogil:
+        for i in range(1, out.shape[0] - 1):
+            for j in range(1, out.shape[1] - 1):
+                for k in range(1, out.shape[2] - 1):
+                    out[i, j, k] = \
+                        _diff(a, axis_a, i, j, k, il, ir) / ds_a \
+                      - _diff(b, axis_b, i, j, k, il, ir) / ds_b
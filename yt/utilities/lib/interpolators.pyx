@@ -16,6 +16,7 @@ Simple interpolators
 import numpy as np
 cimport numpy as np
 cimport cython
+from libc.math cimport floor
 from yt.utilities.lib.fp_utils cimport imax, fmax, imin, fmin, iclip, fclip
 
 @cython.cdivision(True)
@@ -165,3 +166,62 @@ def ghost_zone_interpolate(int rf,
                 opos[2] += ods[2]
             opos[1] += ods[1]
         opos[0] += ods[0]
+
+@cython.cdivision(True)
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def cic_cell_centers(np.ndarray[np.float64_t, ndim=2] pos,
+                     np.ndarray[np.float64_t, ndim=2] ldims,
+                     np.ndarray[np.float64_t, ndim=1] left_edge,
+                     np.ndarray[np.float64_t, ndim=1] right_edge):
+    # For each of the n positions in pos, finds the eight cell centers of
+    # a grid of ldims cells around it and their cloud-in-cell weights.
+    # The centers are returned as an (8*n, 3) array, ordered by corner and
+    # then by position, and the weights as an (8, n) array.  Positions are
+    # kept half a cell inside the domain so the centers are all in it.
+    cdef int n = pos.shape[0]
+    cdef int i, j, c
+    cdef np.float64_t rel, width, w
+    cdef np.ndarray[np.float64_t, ndim=2] i0 = np.empty((n, 3), "float64")
+    cdef np.ndarray[np.float64_t, ndim=2] frac = np.empty((n, 3), "float64")
+    cdef np.ndarray[np.float64_t, ndim=2] cpos = \
+        np.empty((8 * n, 3), "float64")
+    cdef np.ndarray[np.float64_t, ndim=2] weights = \
+        np.empty((8, n), "float64")
+    for i in range(n):
+        for j in range(3):
+            width = right_edge[j] - left_edge[j]
+            rel = (pos[i, j] - left_edge[j]) / width * ldims[i, j] - 0.5
+            rel = fclip(rel, 0.0, fmax(ldims[i, j] - 1.0, 0.0))
+            i0[i, j] = fclip(floor(rel), 0.0, fmax(ldims[i, j] - 2.0, 0.0))
+            frac[i, j] = fclip(rel - i0[i, j], 0.0, 1.0)
+        for c in range(8):
+            w = 1.0
+            for j in range(3):
+                # Corner c is offset by its bits, x being the highest.
+                if (c >> (2 - j)) & 1:
+                    w *= frac[i, j]
+                    rel = i0[i, j] + 1.5
+                else:
+                    w *= 1.0 - frac[i, j]
+                    rel = i0[i, j] + 0.5
+                cpos[c * n + i, j] = left_edge[j] + rel / ldims[i, j] * \
+                    (right_edge[j] - left_edge[j])
+            weights[c, i] = w
+    return cpos, weights
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def cic_combine(np.ndarray[np.float64_t, ndim=2] values,
+                np.ndarray[np.float64_t, ndim=2] weights):
+    # Sums the (8, n) values at the cell centers found by cic_cell_centers
+    # with their weights.  Centers with no weight are skipped, since they
+    # may be outside the domain and have no value.
+    cdef int n = values.shape[1]
+    cdef int i, c
+    cdef np.ndarray[np.float64_t, ndim=1] out = np.zeros(n, "float64")
+    for i in range(n):
+        for c in range(8):
+            if weights[c, i] > 0:
+                out[i] += values[c, i] * weights[c, i]
+    return out
@@ -0,0 +1,36 @@
+"""
+A KD-tree for finding the nearest neighbors of points among particles
+
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+cimport numpy as np
+from yt.utilities.lib.distance_queue cimport DistanceQueue
+
+cdef class ParticleKDTree:
+    cdef readonly np.int64_t npart
+    cdef readonly int leafsize
+    cdef np.int64_t nleaves
+    cdef np.float64_t DW[3]
+    cdef bint periodicity[3]
+    # The particle positions, in the order of the leaves of the tree, and
+    # their indices in the array the tree was built from.
+    cdef np.float64_t[:,:] positions
+    cdef np.int64_t[:] pinds
+    # Node i has children 2i + 1 and 2i + 2; the last nleaves are leaves.
+    cdef np.int64_t[:] node_start
+    cdef np.int64_t[:] node_end
+    cdef np.float64_t[:,:] node_left_edge
+    cdef np.float64_t[:,:] node_right_edge
+    cdef np.float64_t min_r2(self, np.int64_t node, np.float64_t pos[3])
+    cdef void knn(self, np.float64_t pos[3], DistanceQueue dq)
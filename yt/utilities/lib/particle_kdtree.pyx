@@ -0,0 +1,249 @@
+"""
+A KD-tree for finding the nearest neighbors of points among particles
+
+The tree is stored in flat arrays: the particle positions are copied into
+the order of the leaves, so that a leaf is a contiguous block of memory, and
+the nodes form an implicit, balanced binary tree.  Each node keeps the tight
+bounding box of its particles, which is used to skip nodes that cannot hold
+any of the nearest neighbors, taking periodic boundaries into account.
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+cimport numpy as np
+import numpy as np
+cimport cython
+from libc.math cimport sqrt
+
+from yt.utilities.lib.fp_utils cimport fmin, fmax
+
+cdef np.float64_t FAR = 1e300
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void select_nth(np.int64_t[:] inds, np.float64_t[:,:] pos, int dim,
+                     np.int64_t left, np.int64_t right,
+                     np.int64_t nth) nogil:
+    # Reorders inds[left:right] so that inds[nth] is the particle that would
+    # be there if they were sorted along dim, with no particle before it
+    # further along dim and no particle after it less far along.
+    cdef np.int64_t i, j, tmp
+    cdef np.float64_t pivot
+    right -= 1
+    while right > left:
+        pivot = pos[inds[(left + right) // 2], dim]
+        i = left
+        j = right
+        while i <= j:
+            while pos[inds[i], dim] < pivot:
+                i += 1
+            while pos[inds[j], dim] > pivot:
+                j -= 1
+            if i <= j:
+                tmp = inds[i]
+                inds[i] = inds[j]
+                inds[j] = tmp
+                i += 1
+                j -= 1
+        if nth <= j:
+            right = j
+        elif nth >= i:
+            left = i
+        else:
+            return
+
+cdef class ParticleKDTree:
+    """
+    A KD-tree of particle positions for k-nearest neighbor queries.
+
+    Parameters
+    ----------
+    positions : array_like (Nx3)
+        The positions of the particles.
+    left_edge, right_edge : array_like (3)
+        The edges of the domain, used for periodic boundaries.
+    periodicity : tuple of bools
+        Whether the domain is periodic along each axis.
+    leafsize : int
+        The largest number of particles in a leaf of the tree.
+
+    Examples
+    --------
+    >>> tree = ParticleKDTree(pos, [0, 0, 0], [1, 1, 1])
+    >>> dist, ind = tree.query(points, 32)
+    """
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    def __init__(self, positions, left_edge, right_edge,
+                 periodicity = (True, True, True), int leafsize = 16):
+        cdef np.float64_t[:,:] pos = np.asarray(positions, dtype="float64")
+        cdef np.int64_t node, nnodes, s, e, mid, i, child
+        cdef np.float64_t le[3]
+        cdef np.float64_t re[3]
+        cdef int j, dim
+        for j in range(3):
+            self.DW[j] = right_edge[j] - left_edge[j]
+            self.periodicity[j] = periodicity[j]
+        self.npart = pos.shape[0]
+        self.leafsize = leafsize
+        self.nleaves = 1
+        while self.nleaves * leafsize < self.npart:
+            self.nleaves *= 2
+        nnodes = 2 * self.nleaves - 1
+        self.pinds = np.arange(self.npart, dtype="int64")
+        self.node_start = np.zeros(nnodes, dtype="int64")
+        self.node_end = np.zeros(nnodes, dtype="int64")
+        self.node_end[0] = self.npart
+        # Split each node at its median along the axis where its particles
+        # extend furthest; this keeps the tree balanced.
+        with nogil:
+            for node in range(self.nleaves - 1):
+                s = self.node_start[node]
+                e = self.node_end[node]
+                mid = s + (e - s) // 2
+                if e - s > 1:
+                    for j in range(3):
+                        le[j] = FAR
+                        re[j] = -FAR
+                    for i in range(s, e):
+                        for j in range(3):
+                            le[j] = fmin(le[j], pos[self.pinds[i], j])
+                            re[j] = fmax(re[j], pos[self.pinds[i], j])
+                    dim = 0
+                    for j in range(1, 3):
+                        if re[j] - le[j] > re[dim] - le[dim]:
+                            dim = j
+                    select_nth(self.pinds, pos, dim, s, e, mid)
+                child = 2 * node + 1
+                self.node_start[child] = s
+                self.node_end[child] = mid
+                self.node_start[child + 1] = mid
+                self.node_end[child + 1] = e
+        self.positions = np.ascontiguousarray(
+            np.asarray(pos)[np.asarray(self.pinds)])
+        self.node_left_edge = np.empty((nnodes, 3), dtype="float64")
+        self.node_right_edge = np.empty((nnodes, 3), dtype="float64")
+        with nogil:
+            for node in range(nnodes - 1, -1, -1):
+                for j in range(3):
+                    self.node_left_edge[node, j] = FAR
+                    self.node_right_edge[node, j] = -FAR
+                if node >= self.nleaves - 1:
+                    for i in range(self.node_start[node], self.node_end[node]):
+                        for j in range(3):
+                            self.node_left_edge[node, j] = fmin(
+                                self.node_left_edge[node, j],
+                                self.positions[i, j])
+                            self.node_right_edge[node, j] = fmax(
+                                self.node_right_edge[node, j],
+                                self.positions[i, j])
+                    continue
+                for child in range(2 * node + 1, 2 * node + 3):
+                    for j in range(3):
+                        self.node_left_edge[node, j] = fmin(
+                            self.node_left_edge[node, j],
+                            self.node_left_edge[child, j])
+                        self.node_right_edge[node, j] = fmax(
+                            self.node_right_edge[node, j],
+                            self.node_right_edge[child, j])
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef np.float64_t min_r2(self, np.int64_t node, np.float64_t pos[3]):
+        # The smallest squared distance from pos to the bounding box of the
+        # node, over the periodic images of pos.
+        cdef int j, k
+        cdef np.float64_t r2 = 0.0, dist, d, x, le, re
+        for j in range(3):
+            le = self.node_left_edge[node, j]
+            re = self.node_right_edge[node, j]
+            if le > re:
+                return FAR
+            dist = FAR
+            for k in range(-1, 2):
+                if k != 0 and not self.periodicity[j]:
+                    continue
+                x = pos[j] + k * self.DW[j]
+                d = fmax(fmax(le - x, x - re), 0.0)
+                dist = fmin(dist, d)
+            r2 += dist * dist
+        return r2
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    @cython.cdivision(True)
+    cdef void knn(self, np.float64_t pos[3], DistanceQueue dq):
+        # Fills dq with the nearest neighbors of pos.  The queue must have
+        # been set up with the same domain width and periodicity.
+        cdef np.int64_t stack[128]
+        cdef np.int64_t node, near, far, i
+        cdef np.float64_t ppos[3]
+        cdef int sp = 1, j
+        dq.neighbor_reset()
+        stack[0] = 0
+        while sp > 0:
+            sp -= 1
+            node = stack[sp]
+            if dq.curn == dq.maxn and \
+               self.min_r2(node, pos) > dq.neighbors[dq.curn - 1].r2:
+                continue
+            if node >= self.nleaves - 1:
+                for i in range(self.node_start[node], self.node_end[node]):
+                    for j in range(3):
+                        ppos[j] = self.positions[i, j]
+                    dq.neighbor_eval(self.pinds[i], ppos, pos)
+                continue
+            # Visit the nearer child first, so that the queue fills up with
+            # close neighbors early and more nodes are skipped.
+            near = 2 * node + 1
+            far = near + 1
+            if self.min_r2(far, pos) < self.min_r2(near, pos):
+                near, far = far, near
+            stack[sp] = far
+            stack[sp + 1] = near
+            sp += 2
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    def query(self, np.float64_t[:,:] points, int k):
+        """
+        Find the *k* nearest particles to each of *points*.
+
+        Returns
+        -------
+        The (N, k) arrays of the distances to the neighbors, in increasing
+        order, and of their indices in the positions the tree was built from.
+        Missing neighbors, if there are fewer than *k* particles, have an
+        index of -1.
+        """
+        cdef np.int64_t i
+        cdef int j
+        cdef np.float64_t pos[3]
+        cdef np.float64_t[:,:] dist = np.empty((points.shape[0], k), "float64")
+        cdef np.int64_t[:,:] inds = np.empty((points.shape[0], k), "int64")
+        cdef DistanceQueue dq = DistanceQueue(k)
+        dq._setup(self.DW, self.periodicity)
+        for i in range(points.shape[0]):
+            for j in range(3):
+                pos[j] = points[i, j]
+            self.knn(pos, dq)
+            for j in range(k):
+                if j < dq.curn:
+                    dist[i, j] = sqrt(dq.neighbors[j].r2)
+                    inds[i, j] = dq.neighbors[j].pn
+                else:
+                    dist[i, j] = np.inf
+                    inds[i, j] = -1
+        return np.asarray(dist), np.asarray(inds)
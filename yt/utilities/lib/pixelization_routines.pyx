@@ -22,7 +22,9 @@ from yt.utilities.exceptions import \
     YTPixelizeError, \
     YTElementTypeNotRecognized
 from libc.stdlib cimport malloc, free
+from cython.parallel import prange, parallel, threadid
 from vec3_ops cimport dot, cross, subtract
+from yt.geometry.particle_deposit cimport kernel_func, get_kernel_func
 from yt.utilities.lib.element_mappings cimport \
     ElementSampler, \
     P1Sampler1D, \
@@ -230,6 +232,122 @@ def pixelize_cartesian(np.float64_t[:,:] buff,
                             else:
                                 buff[i,j] = dsp
 
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def pixelize_projection(np.float64_t[:,:,:] buff,
+                        np.float64_t[:,:] wbuff,
+                        np.float64_t[:] px,
+                        np.float64_t[:] py,
+                        np.float64_t[:] pdx,
+                        np.float64_t[:] pdy,
+                        np.float64_t[:,:] data,
+                        np.float64_t[:] weight,
+                        bounds,
+                        int mip = 0,
+                        period = None,
+                        int check_period = 1):
+    # This deposits cells seen along the line of sight straight into an
+    # image, accumulating rather than replacing, so that a projection can be
+    # built up chunk by chunk without a QuadTree.  buff has one plane per
+    # field; data has one column per field.  When mip is zero, data (already
+    # multiplied by the path length and weight) and weight are summed into
+    # buff and wbuff in proportion to the fraction of each pixel a cell
+    # covers, so that cells spanning pixel edges are not counted twice.
+    # Otherwise buff holds the running maximum of data and wbuff is
+    # set to one wherever a cell has been deposited.  The row/column layout
+    # matches pixelize_cartesian.
+    cdef np.float64_t x_min, x_max, y_min, y_max
+    cdef np.float64_t period_x = 0.0, period_y = 0.0
+    cdef np.float64_t width, height, px_dx, px_dy, ipx_dx, ipx_dy
+    cdef int i, j, p, f, xi, yi, nf
+    cdef int lc, lr, rc, rr
+    cdef np.float64_t lypx, rypx, lxpx, rxpx, overlap1, overlap2, ov
+    cdef np.float64_t oxsp, oysp, xsp, ysp, dxsp, dysp
+    cdef int xiter[2]
+    cdef int yiter[2]
+    cdef np.float64_t xiterv[2]
+    cdef np.float64_t yiterv[2]
+    if period is not None:
+        period_x = period[0]
+        period_y = period[1]
+    x_min = bounds[0]
+    x_max = bounds[1]
+    y_min = bounds[2]
+    y_max = bounds[3]
+    width = x_max - x_min
+    height = y_max - y_min
+    px_dx = width / (<np.float64_t> buff.shape[1])
+    px_dy = height / (<np.float64_t> buff.shape[0])
+    ipx_dx = 1.0 / px_dx
+    ipx_dy = 1.0 / px_dy
+    nf = buff.shape[2]
+    if px.shape[0] != py.shape[0] or \
+       px.shape[0] != pdx.shape[0] or \
+       px.shape[0] != pdy.shape[0] or \
+       px.shape[0] != data.shape[0] or \
+       px.shape[0] != weight.shape[0] or \
+       data.shape[1] != nf or \
+       buff.shape[0] != wbuff.shape[0] or \
+       buff.shape[1] != wbuff.shape[1]:
+        raise YTPixelizeError("Arrays are not of correct shape.")
+    xiter[0] = yiter[0] = 0
+    xiterv[0] = yiterv[0] = 0.0
+    with nogil:
+        for p in range(px.shape[0]):
+            xiter[1] = yiter[1] = 999
+            oxsp = px[p]
+            oysp = py[p]
+            dxsp = pdx[p]
+            dysp = pdy[p]
+            if check_period == 1:
+                if (oxsp - dxsp < x_min):
+                    xiter[1] = +1
+                    xiterv[1] = period_x
+                elif (oxsp + dxsp > x_max):
+                    xiter[1] = -1
+                    xiterv[1] = -period_x
+                if (oysp - dysp < y_min):
+                    yiter[1] = +1
+                    yiterv[1] = period_y
+                elif (oysp + dysp > y_max):
+                    yiter[1] = -1
+                    yiterv[1] = -period_y
+            for xi in range(2):
+                if xiter[xi] == 999: continue
+                xsp = oxsp + xiterv[xi]
+                if (xsp + dxsp < x_min) or (xsp - dxsp > x_max): continue
+                for yi in range(2):
+                    if yiter[yi] == 999: continue
+                    ysp = oysp + yiterv[yi]
+                    if (ysp + dysp < y_min) or (ysp - dysp > y_max): continue
+                    lc = <int> fmax(((xsp-dxsp-x_min)*ipx_dx),0)
+                    lr = <int> fmax(((ysp-dysp-y_min)*ipx_dy),0)
+                    rc = <int> fmin(((xsp+dxsp-x_min)*ipx_dx + 1), buff.shape[1])
+                    rr = <int> fmin(((ysp+dysp-y_min)*ipx_dy + 1), buff.shape[0])
+                    for i in range(lr, rr):
+                        lypx = px_dy * i + y_min
+                        rypx = px_dy * (i+1) + y_min
+                        overlap2 = ((fmin(rypx, ysp+dysp)
+                                   - fmax(lypx, (ysp-dysp)))*ipx_dy)
+                        if overlap2 <= 0.0: continue
+                        for j in range(lc, rc):
+                            lxpx = px_dx * j + x_min
+                            rxpx = px_dx * (j+1) + x_min
+                            overlap1 = ((fmin(rxpx, xsp+dxsp)
+                                       - fmax(lxpx, (xsp-dxsp)))*ipx_dx)
+                            if overlap1 <= 0.0: continue
+                            if mip == 1:
+                                for f in range(nf):
+                                    if data[p,f] > buff[i,j,f]:
+                                        buff[i,j,f] = data[p,f]
+                                wbuff[i,j] = 1.0
+                            else:
+                                ov = overlap1 * overlap2
+                                for f in range(nf):
+                                    buff[i,j,f] += data[p,f] * ov
+                                wbuff[i,j] += weight[p] * ov
+
 @cython.cdivision(True)
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -481,6 +599,233 @@ def pixelize_off_axis_cartesian(
             if mask[i,j] == 0: continue
             buff[i,j] /= mask[i,j]
 
+# Kernel tables for the SPH pixelizers are sampled uniformly in q**2, where q
+# is the distance in units of the smoothing length.
+DEF SPH_TABLE_SIZE = 1024
+DEF SPH_COLUMN_STEPS = 256
+
+_sph_kernel_tables = {}
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def get_sph_kernel_tables(str kernel_name):
+    # Returns tables of the kernel W(q) and of its integral along a line of
+    # sight passing a distance q from the particle, both for a smoothing
+    # length of one, so that they integrate to one over the volume and the
+    # plane respectively.  They are made once per kernel.
+    cdef kernel_func kernel
+    cdef np.float64_t q2, dz, z, col
+    cdef int i, k
+    cdef np.float64_t[:] w3, w2
+    if kernel_name in _sph_kernel_tables:
+        return _sph_kernel_tables[kernel_name]
+    kernel = get_kernel_func(kernel_name)
+    w3 = np.zeros(SPH_TABLE_SIZE + 1, dtype="float64")
+    w2 = np.zeros(SPH_TABLE_SIZE + 1, dtype="float64")
+    for i in range(SPH_TABLE_SIZE + 1):
+        q2 = i / (<np.float64_t> SPH_TABLE_SIZE)
+        w3[i] = kernel(math.sqrt(q2))
+        dz = math.sqrt(1.0 - q2) / SPH_COLUMN_STEPS
+        col = 0.0
+        for k in range(SPH_COLUMN_STEPS):
+            z = (k + 0.5) * dz
+            col += kernel(math.sqrt(q2 + z*z))
+        w2[i] = 2.0 * col * dz
+    tables = (np.asarray(w3), np.asarray(w2))
+    _sph_kernel_tables[kernel_name] = tables
+    return tables
+
+@cython.cdivision(True)
+cdef inline np.float64_t interpolate_sph_kernel(np.float64_t *table,
+                                                np.float64_t q2) nogil:
+    cdef np.float64_t t = q2 * SPH_TABLE_SIZE
+    cdef int i = <int> t
+    if i >= SPH_TABLE_SIZE:
+        return 0.0
+    t -= i
+    return table[i] * (1.0 - t) + table[i + 1] * t
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void sph_splat(np.float64_t[:,:,:] buff, np.float64_t[:,:] wbuff,
+                    np.float64_t[:] px, np.float64_t[:] py,
+                    np.float64_t[:] pdz, np.float64_t[:] hsml,
+                    np.float64_t[:] pvol, np.float64_t[:,:] data,
+                    np.float64_t[:] weight, np.float64_t[:] table,
+                    int ndim, bounds, period, int check_period,
+                    int num_threads):
+    # Adds the kernel of every particle to the pixels whose centers it
+    # covers.  For slices (ndim == 3) the kernel is evaluated at the pixel
+    # centers, which are pdz out of the plane of the particle.  For
+    # projections (ndim == 2) its column through the pixel centers is used
+    # instead, and particles smaller than a pixel are added whole to the
+    # pixel they are in, so that nothing is lost.  Each thread adds into its
+    # own copy of the image and the copies are summed at the end.
+    cdef np.float64_t x_min, x_max, y_min, y_max
+    cdef np.float64_t period_x = 0.0, period_y = 0.0
+    cdef np.float64_t px_dx, px_dy, ipx_dx, ipx_dy, px_max, px_area
+    cdef np.float64_t h, ih2, hnorm, q2z, xsp, ysp, dx, dy, q2, w
+    cdef np.int64_t p
+    cdef int i, j, f, xi, yi, lc, lr, rc, rr, nf, nx, ny, tid
+    cdef np.float64_t *tab = &table[0]
+    cdef np.float64_t[:,:,:,:] lbuff
+    cdef np.float64_t[:,:,:] lwbuff
+    if period is not None:
+        period_x = period[0]
+        period_y = period[1]
+    x_min = bounds[0]
+    x_max = bounds[1]
+    y_min = bounds[2]
+    y_max = bounds[3]
+    ny = buff.shape[0]
+    nx = buff.shape[1]
+    nf = buff.shape[2]
+    px_dx = (x_max - x_min) / (<np.float64_t> nx)
+    px_dy = (y_max - y_min) / (<np.float64_t> ny)
+    ipx_dx = 1.0 / px_dx
+    ipx_dy = 1.0 / px_dy
+    px_max = fmax(px_dx, px_dy)
+    px_area = px_dx * px_dy
+    if num_threads < 1:
+        num_threads = 1
+    if num_threads == 1:
+        lbuff = np.asarray(buff)[None]
+        lwbuff = np.asarray(wbuff)[None]
+    else:
+        lbuff = np.zeros((num_threads, ny, nx, nf), dtype="float64")
+        lwbuff = np.zeros((num_threads, ny, nx), dtype="float64")
+    with nogil, parallel(num_threads = num_threads):
+        tid = threadid()
+        for p in prange(px.shape[0], schedule="dynamic", chunksize=256):
+            h = hsml[p]
+            if h <= 0.0:
+                continue
+            ih2 = 1.0 / (h * h)
+            if ndim == 2:
+                hnorm = pvol[p] * weight[p] * ih2
+                q2z = 0.0
+            else:
+                hnorm = pvol[p] * weight[p] * ih2 / h
+                q2z = pdz[p] * pdz[p] * ih2
+                if q2z >= 1.0:
+                    continue
+            for xi in range(-1, 2):
+                if xi != 0 and (check_period == 0 or period_x == 0.0):
+                    continue
+                xsp = px[p] + xi * period_x
+                if xsp + h < x_min or xsp - h > x_max:
+                    continue
+                for yi in range(-1, 2):
+                    if yi != 0 and (check_period == 0 or period_y == 0.0):
+                        continue
+                    ysp = py[p] + yi * period_y
+                    if ysp + h < y_min or ysp - h > y_max:
+                        continue
+                    if ndim == 2 and h < px_max:
+                        if xsp < x_min or xsp >= x_max or \
+                           ysp < y_min or ysp >= y_max:
+                            continue
+                        j = imin(<int> ((xsp - x_min) * ipx_dx), nx - 1)
+                        i = imin(<int> ((ysp - y_min) * ipx_dy), ny - 1)
+                        w = pvol[p] * weight[p] / px_area
+                        for f in range(nf):
+                            lbuff[tid, i, j, f] += w * data[p, f]
+                        lwbuff[tid, i, j] += w
+                        continue
+                    lc = <int> fmax((xsp - h - x_min) * ipx_dx, 0)
+                    lr = <int> fmax((ysp - h - y_min) * ipx_dy, 0)
+                    rc = <int> fmin((xsp + h - x_min) * ipx_dx + 1, nx)
+                    rr = <int> fmin((ysp + h - y_min) * ipx_dy + 1, ny)
+                    for i in range(lr, rr):
+                        dy = y_min + (i + 0.5) * px_dy - ysp
+                        for j in range(lc, rc):
+                            dx = x_min + (j + 0.5) * px_dx - xsp
+                            q2 = (dx * dx + dy * dy) * ih2 + q2z
+                            if q2 >= 1.0:
+                                continue
+                            w = hnorm * interpolate_sph_kernel(tab, q2)
+                            for f in range(nf):
+                                lbuff[tid, i, j, f] += w * data[p, f]
+                            lwbuff[tid, i, j] += w
+    if num_threads > 1:
+        np.asarray(buff)[...] += np.asarray(lbuff).sum(axis=0)
+        np.asarray(wbuff)[...] += np.asarray(lwbuff).sum(axis=0)
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def pixelize_sph_kernel_projection(np.float64_t[:,:,:] buff,
+                                   np.float64_t[:,:] wbuff,
+                                   np.float64_t[:] px,
+                                   np.float64_t[:] py,
+                                   np.float64_t[:] hsml,
+                                   np.float64_t[:] pvol,
+                                   np.float64_t[:,:] data,
+                                   np.float64_t[:] weight,
+                                   bounds,
+                                   kernel_name = "cubic",
+                                   period = None,
+                                   int check_period = 1,
+                                   int num_threads = 1):
+    # This integrates the SPH interpolant of data along the line of sight
+    # through every pixel center, accumulating into buff so that an image
+    # can be built up chunk by chunk.  pvol is the volume (mass over
+    # density) of each particle, in the cube of the units of px, py and
+    # hsml.  buff has one plane per field and data one column per field, as
+    # for pixelize_projection; the integral of weight * data goes to buff
+    # and that of weight to wbuff.  The row/column layout matches
+    # pixelize_cartesian.
+    if px.shape[0] != py.shape[0] or \
+       px.shape[0] != hsml.shape[0] or \
+       px.shape[0] != pvol.shape[0] or \
+       px.shape[0] != data.shape[0] or \
+       px.shape[0] != weight.shape[0] or \
+       data.shape[1] != buff.shape[2] or \
+       buff.shape[0] != wbuff.shape[0] or \
+       buff.shape[1] != wbuff.shape[1]:
+        raise YTPixelizeError("Arrays are not of correct shape.")
+    w3, w2 = get_sph_kernel_tables(kernel_name)
+    # The offsets out of the plane are not used by projections.
+    sph_splat(buff, wbuff, px, py, hsml, hsml, pvol, data, weight, w2,
+              2, bounds, period, check_period, num_threads)
+
+@cython.cdivision(True)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def pixelize_sph_kernel_slice(np.float64_t[:,:,:] buff,
+                              np.float64_t[:,:] wbuff,
+                              np.float64_t[:] px,
+                              np.float64_t[:] py,
+                              np.float64_t[:] pdz,
+                              np.float64_t[:] hsml,
+                              np.float64_t[:] pvol,
+                              np.float64_t[:,:] data,
+                              bounds,
+                              kernel_name = "cubic",
+                              period = None,
+                              int check_period = 1,
+                              int num_threads = 1):
+    # This evaluates the SPH interpolant of data at every pixel center of a
+    # slice, accumulating into buff as pixelize_sph_kernel_projection does.
+    # pdz is the distance of each particle from the plane of the slice.
+    # wbuff gets the sum of the kernel weights, which is close to one
+    # wherever the particles sample the slice well.
+    if px.shape[0] != py.shape[0] or \
+       px.shape[0] != pdz.shape[0] or \
+       px.shape[0] != hsml.shape[0] or \
+       px.shape[0] != pvol.shape[0] or \
+       px.shape[0] != data.shape[0] or \
+       data.shape[1] != buff.shape[2] or \
+       buff.shape[0] != wbuff.shape[0] or \
+       buff.shape[1] != wbuff.shape[1]:
+        raise YTPixelizeError("Arrays are not of correct shape.")
+    w3, w2 = get_sph_kernel_tables(kernel_name)
+    weight = np.ones(px.shape[0], dtype="float64")
+    sph_splat(buff, wbuff, px, py, pdz, hsml, pvol, data, weight, w3,
+              3, bounds, period, check_period, num_threads)
+
 @cython.cdivision(True)
 @cython.boundscheck(False)
 @cython.wraparound(False)
@@ -0,0 +1,62 @@
+"""
+Tests for the particle KD-tree
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+from yt.testing import \
+    assert_array_almost_equal, \
+    assert_equal
+from yt.utilities.lib.particle_kdtree import \
+    ParticleKDTree
+
+def brute_force_neighbors(pos, points, k, periodicity):
+    dist = np.empty((points.shape[0], k))
+    for i in range(points.shape[0]):
+        DR = np.abs(pos - points[i])
+        for j in range(3):
+            if periodicity[j]:
+                DR[:,j] = np.minimum(DR[:,j], 1.0 - DR[:,j])
+        r = np.sqrt((DR*DR).sum(axis=1))
+        r.sort()
+        dist[i] = r[:k]
+    return dist
+
+def test_particle_kdtree():
+    np.random.seed(0x4d3d3d3)
+    # Clustered particles, so that the tree is unbalanced in space.
+    pos = np.concatenate([np.random.random((1000, 3)),
+                          0.45 + 0.1 * np.random.random((3000, 3))])
+    points = np.random.random((100, 3))
+    for periodicity in [(True, True, True), (False, True, False)]:
+        for leafsize in [1, 16, 64]:
+            tree = ParticleKDTree(pos, [0.0, 0.0, 0.0], [1.0, 1.0, 1.0],
+                                  periodicity, leafsize)
+            assert_equal(tree.npart, pos.shape[0])
+            dist, ind = tree.query(points, 32)
+            assert_array_almost_equal(
+                dist, brute_force_neighbors(pos, points, 32, periodicity))
+            DR = np.abs(pos[ind] - points[:,None,:])
+            for j in range(3):
+                if periodicity[j]:
+                    DR[...,j] = np.minimum(DR[...,j], 1.0 - DR[...,j])
+            assert_array_almost_equal(np.sqrt((DR*DR).sum(axis=-1)), dist)
+
+def test_particle_kdtree_few_particles():
+    pos = np.random.random((5, 3))
+    tree = ParticleKDTree(pos, [0.0, 0.0, 0.0], [1.0, 1.0, 1.0])
+    dist, ind = tree.query(np.random.random((3, 3)), 8)
+    assert_equal(np.sort(ind[:,:5], axis=1), [np.arange(5)] * 3)
+    assert_equal(ind[:,5:], -1)
+    assert_equal(np.isinf(dist[:,5:]), True)
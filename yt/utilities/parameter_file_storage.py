@@ -123,6 +123,9 @@ class ParameterFileStore(object):
         fp = ds_dict['fp']
         fn = os.path.join(fp, bn)
         class_name = ds_dict['class_name']
+        if class_name not in output_type_registry:
+            from yt.frontends.api import import_frontends
+            import_frontends()
         if class_name not in output_type_registry:
             raise UnknownDatasetType(class_name)
         mylog.info("Checking %s", fn)
@@ -0,0 +1,119 @@
+"""
+Tests for the IO handler field cache and selection helpers
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import numpy as np
+
+from yt.testing import \
+    assert_equal, \
+    fake_random_ds
+from yt.utilities.io_handler import \
+    BaseIOHandler, \
+    FieldCache
+
+def test_field_cache_eviction():
+    cache = FieldCache(3 * 8 * 100)
+    for i in range(4):
+        cache.put((i, "density"), np.ones(100) * i)
+    assert_equal(len(cache), 3)
+    assert_equal(cache.nbytes, 3 * 8 * 100)
+    assert_equal(cache.get((0, "density")), None)
+    # Touch 1 so that 2 is the least recently used entry.
+    assert_equal(cache.get((1, "density")), np.ones(100))
+    cache.put((4, "density"), np.ones(100) * 4)
+    assert_equal((2, "density") in cache, False)
+    assert_equal((1, "density") in cache, True)
+    assert_equal(cache.hits, 1)
+    assert_equal(cache.misses, 1)
+    # Anything bigger than the whole budget is never stored.
+    cache.put((5, "density"), np.ones(1000))
+    assert_equal((5, "density") in cache, False)
+    cache.clear()
+    assert_equal(len(cache), 0)
+    assert_equal(cache.nbytes, 0)
+
+def test_field_cache_views():
+    cache = FieldCache(8 * 1000)
+    slab = np.arange(8 * 64, dtype="float64").reshape((8, 4, 4, 4))
+    data = cache.put((0, "density"), slab[3])
+    assert_equal(data, slab[3])
+    assert_equal(data.base is None, True)
+    assert_equal(cache.nbytes, 8 * 64)
+    assert_equal(data.flags.writeable, False)
+
+class FakeObj(object):
+    def __init__(self, id):
+        self.id = id
+
+class FakeChunk(object):
+    dobj = None
+    chunk_type = "io"
+    def __init__(self, objs):
+        self.objs = objs
+
+class CountingIOHandler(BaseIOHandler):
+    def __init__(self, ds):
+        super(CountingIOHandler, self).__init__(ds)
+        self.reads = 0
+
+    def io_iter(self, chunks, fields):
+        for chunk in chunks:
+            for obj in chunk.objs:
+                for field in fields:
+                    self.reads += 1
+                    yield field, obj, np.ones(10) * obj.id
+
+def test_cached_io_iter():
+    io = CountingIOHandler(None)
+    io.field_cache.max_bytes = 8 * 10 * 2 * 4
+    fields = [("gas", "density"), ("gas", "temperature")]
+    objs = [FakeObj(i) for i in range(4)]
+    rv1 = list(io._cached_io_iter([FakeChunk(objs)], fields))
+    assert_equal(io.reads, 8)
+    rv2 = list(io._cached_io_iter([FakeChunk(objs)], fields))
+    assert_equal(io.reads, 8)
+    assert_equal(len(rv1), len(rv2))
+    for (f1, o1, d1), (f2, o2, d2) in zip(rv1, rv2):
+        assert_equal(f1, f2)
+        assert_equal(o1.id, o2.id)
+        assert_equal(d1, d2)
+    # Only the new object is read.
+    objs.append(FakeObj(4))
+    rv3 = list(io._cached_io_iter([FakeChunk(objs)], fields))
+    assert_equal(io.reads, 10)
+    assert_equal([o.id for f, o, d in rv3 if f == fields[0]],
+                 [0, 1, 2, 3, 4])
+
+def test_select_into():
+    ds = fake_random_ds(32, nprocs=8)
+    io = ds.index.io
+    for dobj in [ds.all_data(), ds.sphere("c", 0.3), ds.r[0.0:0.5, :, :]]:
+        selector = dobj.selector
+        for g in ds.index.grids:
+            source = g["density"].d
+            count = g.count(selector)
+            dest1 = np.zeros(count + 3)
+            dest2 = np.zeros(count + 3)
+            assert_equal(io._select_into(g, selector, source, dest1, 3),
+                         g.select(selector, source, dest2, 3))
+            assert_equal(dest1, dest2)
+            dest3 = np.zeros(count + 3)
+            def _read(out):
+                if out is None:
+                    return source.copy()
+                out[...] = source
+                return out
+            assert_equal(io._read_into_selection(g, selector, dest3, 3,
+                                                 _read), count)
+            assert_equal(dest3, dest2)
@@ -0,0 +1,90 @@
+"""
+Tests for the prefilters that narrow down the output types tried by yt.load
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import os
+import shutil
+import struct
+import tempfile
+
+from yt.convenience import \
+    load, \
+    _output_type_cache
+from yt.frontends.api import import_frontends
+from yt.testing import \
+    assert_equal, \
+    fake_random_ds, \
+    requires_module
+from yt.utilities.file_signature import FileSignature
+from yt.utilities.on_demand_imports import _h5py as h5py
+from yt.utilities.parameter_file_storage import output_type_registry
+
+def test_binary_prefilter():
+    import_frontends()
+    tmpdir = tempfile.mkdtemp()
+    fn = os.path.join(tmpdir, "snapshot_000")
+    with open(fn, "wb") as f:
+        f.write(struct.pack(">I", 256) + b"\0" * 256)
+    sig = FileSignature(fn)
+    assert_equal(sig.is_file, True)
+    assert_equal(sig.is_hdf5, False)
+    assert_equal(sig.hdf5_groups, None)
+    assert_equal(output_type_registry["GadgetDataset"]._prefilter(sig), True)
+    for n in ["GadgetHDF5Dataset", "RockstarDataset", "BoxlibDataset",
+              "YTDataContainerDataset"]:
+        assert_equal(output_type_registry[n]._prefilter(sig), False)
+    assert_equal(output_type_registry["BoxlibDataset"]._prefilter(
+        FileSignature(tmpdir)), True)
+    shutil.rmtree(tmpdir)
+
+@requires_module("h5py")
+def test_hdf5_prefilter():
+    import_frontends()
+    tmpdir = tempfile.mkdtemp()
+    fn = os.path.join(tmpdir, "snapshot_000.hdf5")
+    with h5py.File(fn, "w") as f:
+        f.create_group("Header")
+        f.create_group("PartType0")
+        f.attrs["data_type"] = "yt_light_ray"
+    sig = FileSignature(fn)
+    assert_equal(sig.is_hdf5, True)
+    assert_equal(sig.hdf5_groups, set(["Header", "PartType0"]))
+    assert_equal(sig.hdf5_attrs, set(["data_type"]))
+    passed = set(n for n, c in output_type_registry.items()
+                 if n is not None and c._prefilter(sig))
+    for n in ["GadgetHDF5Dataset", "GizmoDataset"]:
+        assert n in passed
+    # Missing groups, the wrong suffix and the wrong file type.
+    for n in ["OWLSDataset", "EagleDataset", "GDFDataset", "ChomboDataset",
+              "YTDataLightRayDataset", "GadgetDataset", "RockstarDataset"]:
+        assert n not in passed
+    shutil.rmtree(tmpdir)
+
+@requires_module("h5py")
+def test_output_type_cache():
+    tmpdir = tempfile.mkdtemp()
+    ds = fake_random_ds(16)
+    fn = ds.all_data().save_as_dataset(os.path.join(tmpdir, "data.h5"),
+                                       fields=["density"])
+    key = FileSignature(fn).stat_key()
+    ds1 = load(fn)
+    assert_equal(_output_type_cache[key], "YTDataContainerDataset")
+    ds2 = load(fn)
+    assert_equal(type(ds2), type(ds1))
+    # A stale entry is checked before it is used.
+    _output_type_cache[key] = "GDFDataset"
+    ds3 = load(fn)
+    assert_equal(type(ds3), type(ds1))
+    assert_equal(_output_type_cache[key], "YTDataContainerDataset")
+    shutil.rmtree(tmpdir)
@@ -0,0 +1,66 @@
+"""
+Tests for lazily imported module attributes
+
+
+
+"""
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+
+import subprocess
+import sys
+import types
+
+from yt.testing import \
+    assert_equal, \
+    assert_raises
+from yt.utilities.lazy_imports import \
+    add_lazy_attributes, \
+    load_lazy_attributes
+
+def test_lazy_attributes():
+    calls = []
+    def _answer():
+        calls.append(1)
+        return 42
+    module = types.ModuleType("yt_lazy_test_module")
+    sys.modules[module.__name__] = module
+    try:
+        add_lazy_attributes(module.__name__, {
+            "answer": _answer,
+            "lazy_imports": ("yt.utilities.lazy_imports", None),
+            "add": ("yt.utilities.lazy_imports", "add_lazy_attributes")})
+        if sys.version_info >= (3, 5):
+            assert_equal(calls, [])
+        assert_equal(module.answer, 42)
+        assert_equal(module.answer, 42)
+        assert_equal(calls, [1])
+        assert_equal(module.lazy_imports.__name__,
+                     "yt.utilities.lazy_imports")
+        assert module.add is add_lazy_attributes
+        assert "answer" in dir(module)
+        assert_raises(AttributeError, getattr, module, "question")
+        load_lazy_attributes(module)
+        assert "add" in module.__dict__
+    finally:
+        del sys.modules[module.__name__]
+
+def test_import_yt_is_lazy():
+    if sys.version_info < (3, 5):
+        return
+    code = ("import sys, yt; "
+            "print('yt.visualization.plot_window' in sys.modules, "
+            "'yt.frontends.enzo.api' in sys.modules)")
+    out = subprocess.check_output([sys.executable, "-c", code])
+    assert_equal(out.decode("utf-8").split(), ["False", "False"])
+    code = ("import sys, yt; yt.SlicePlot; yt.frontends.enzo; "
+            "print('yt.visualization.plot_window' in sys.modules, "
+            "'yt.frontends.enzo.api' in sys.modules)")
+    out = subprocess.check_output([sys.executable, "-c", code])
+    assert_equal(out.decode("utf-8").split(), ["True", "True"])
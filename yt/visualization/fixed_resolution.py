@@ -13,25 +13,103 @@ Fixed resolution buffer support, along with a primitive image analysis tool.
 # The full license is in the file COPYING.txt, distributed with this software.
 #-----------------------------------------------------------------------------
 
+from yt.config import ytcfg
 from yt.frontends.ytdata.utilities import \
     save_as_dataset
 from yt.funcs import \
     get_output_filename, \
     mylog, \
     ensure_list, \
-    deprecate
+    deprecate, \
+    fix_axis, \
+    get_particle_nthreads
 from .volume_rendering.api import off_axis_projection
 from .fixed_resolution_filters import apply_filter, filter_registry
 from yt.data_objects.image_array import ImageArray
 from yt.utilities.lib.pixelization_routines import \
-    pixelize_cylinder
+    pixelize_cylinder, \
+    pixelize_projection, \
+    pixelize_sph_kernel_projection, \
+    pixelize_sph_kernel_slice
+from yt.utilities.parallel_tools.parallel_analysis_interface import \
+    communication_system, \
+    parallel_objects
 from yt.utilities.lib.api import add_points_to_greyscale_image
 from yt.frontends.stream.api import load_uniform_grid
+from yt.units.unit_object import Unit
 
 import numpy as np
 import weakref
 import types
 
+def get_sph_source(ds, field, weight_field=None, method="integrate"):
+    """
+    Returns the SPH particle fields, as given by
+    :meth:`~yt.fields.field_info_container.FieldInfoContainer.get_sph_source`,
+    from which images of *field* are made by adding up particle kernels, or
+    None if they should be made from the mesh.  Projections must integrate
+    along the line of sight, and may only be weighted by a field of the same
+    particles.
+    """
+    if ds.geometry != "cartesian" or \
+       not ytcfg.getboolean("yt", "sph_pixelization"):
+        return None
+    if method != "integrate":
+        return None
+    sph = ds.field_info.get_sph_source(field)
+    if sph is None or weight_field is None:
+        return sph
+    wsph = ds.field_info.get_sph_source(weight_field)
+    if wsph is None or wsph[0] != sph[0]:
+        return None
+    return sph
+
+def _sph_particles(chunk, sph, units):
+    # The positions, smoothing lengths, volumes and values of the particles
+    # of an io chunk, in code units and *units*.
+    ptype, fname, mass, hsml, dens, kernel_name = sph
+    pos = chunk[ptype, "particle_position"].in_units("code_length").d
+    h = chunk[ptype, hsml].in_units("code_length").d
+    pvol = (chunk[ptype, mass] / chunk[ptype, dens])
+    pvol = pvol.in_units("code_length**3").d
+    data = chunk[ptype, fname]
+    if units is None:
+        units = str(data.units)
+    return pos, h, pvol, data.in_units(units).d, units
+
+def _sph_slice_region(ds, ptype, hsml, ax, coord):
+    # Only the particles whose kernels reach the slice add to it, so only
+    # the slab within the largest smoothing length of the slice is read.
+    hmax = ds.index._get_max_smoothing_length(ptype, hsml)
+    le = ds.domain_left_edge.in_units("code_length").d.copy()
+    re = ds.domain_right_edge.in_units("code_length").d.copy()
+    if 2 * hmax >= re[ax] - le[ax]:
+        return ds.all_data()
+    if ds.periodicity[ax]:
+        # Regions wrap around periodic boundaries.
+        le[ax], re[ax] = coord - hmax, coord + hmax
+    else:
+        le[ax], re[ax] = max(coord - hmax, le[ax]), min(coord + hmax, re[ax])
+    return ds.region((le + re) / 2.0, le, re)
+
+def _sph_projection_image(ds, buff, wbuff, units, weighted):
+    # Reduces a projection made by pixelize_sph_kernel_projection across
+    # processors and gives it the units of the projected field.
+    comm = communication_system.communicators[-1]
+    buff = comm.mpi_allreduce(buff, op="sum")[:, :, 0]
+    wbuff = comm.mpi_allreduce(wbuff, op="sum")
+    units = comm.mpi_bcast(units)
+    units = Unit(units, registry=ds.unit_registry)
+    if weighted:
+        # Pixels no particle covers are left as NaN, as for projections.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            buff /= wbuff
+    else:
+        dl = ds.quan(1.0, "code_length").in_units(ds.unit_system["length"])
+        buff *= dl.d
+        units = units * dl.units
+    return buff, units
+
 class FixedResolutionBuffer(object):
     r"""
     FixedResolutionBuffer(data_source, bounds, buff_size, antialias = True)
@@ -129,20 +207,103 @@ class FixedResolutionBuffer(object):
             if hasattr(b, "in_units"):
                 b = float(b.in_units("code_length"))
             bounds.append(b)
-        buff = self.ds.coordinates.pixelize(self.data_source.axis,
-            self.data_source, item, bounds, self.buff_size,
-            int(self.antialias))
+        sph = self._get_sph_source(item)
+        if sph is None:
+            buff = self.ds.coordinates.pixelize(self.data_source.axis,
+                self.data_source, item, bounds, self.buff_size,
+                int(self.antialias))
+        else:
+            buff, units = self._sph_pixelize(item, sph, bounds)
 
         for name, (args, kwargs) in self._filters:
             buff = filter_registry[name](*args[1:], **kwargs).apply(buff)
 
         # Need to add _period and self.periodic
         # self._period, int(self.periodic)
-        ia = ImageArray(buff, input_units=self.data_source[item].units,
-                        info=self._get_info(item))
+        if sph is None:
+            units = self.data_source[item].units
+        ia = ImageArray(buff, input_units=units, info=self._get_info(item))
         self.data[item] = ia
         return self.data[item]
 
+    def _get_sph_source(self, item):
+        source = self.data_source
+        if source._type_name == "slice":
+            field = source._determine_fields(item)[0]
+            return get_sph_source(self.ds, field)
+        elif source._type_name == "proj" and hasattr(source, "data_source"):
+            field = source._determine_fields(item)[0]
+            method = source.method
+            if getattr(source, "_sum_only", False):
+                method = "sum"
+            return get_sph_source(self.ds, field, source.weight_field, method)
+        return None
+
+    def _sph_pixelize(self, item, sph, bounds):
+        # Adds the kernels of the SPH particles that a field is smoothed
+        # from straight into the image, instead of pixelizing the smoothed
+        # field.  Returns the image and its units.
+        source = self.data_source
+        field = source._determine_fields(item)[0]
+        ptype, fname, mass, hsml, dens, kernel_name = sph
+        units = self.ds._get_field_info(*field).units
+        ax = source.axis
+        xax = self.ds.coordinates.x_axis[ax]
+        yax = self.ds.coordinates.y_axis[ax]
+        period = [self._period[0], self._period[1]]
+        for i, p in enumerate(period):
+            if hasattr(p, "in_units"):
+                period[i] = float(p.in_units("code_length"))
+        proj = source._type_name == "proj"
+        if proj:
+            dd = source.data_source
+            wsph = None
+            if source.weight_field is not None:
+                wsph = self.ds.field_info.get_sph_source(source.weight_field)
+        else:
+            coord = source.coord
+            if hasattr(coord, "in_units"):
+                coord = float(coord.in_units("code_length"))
+            dd = source._data_source
+            if dd is None:
+                dd = _sph_slice_region(self.ds, ptype, hsml, ax, coord)
+            DW = float(self.ds.domain_width[ax].in_units("code_length"))
+        buff = np.zeros((self.buff_size[1], self.buff_size[0], 1),
+                        dtype="float64")
+        wbuff = np.zeros((self.buff_size[1], self.buff_size[0]),
+                         dtype="float64")
+        nthreads = get_particle_nthreads()
+        with dd._field_parameter_state(dd.field_parameters):
+            for chunk in parallel_objects(dd.chunks([], "io",
+                                                    local_only=True)):
+                pos, h, pvol, data, units = _sph_particles(chunk, sph, units)
+                if pos.shape[0] == 0:
+                    continue
+                if proj:
+                    if wsph is None:
+                        w = np.ones(pos.shape[0], dtype="float64")
+                    else:
+                        w = chunk[ptype, wsph[1]].d.astype("float64")
+                    pixelize_sph_kernel_projection(buff, wbuff,
+                        pos[:, xax], pos[:, yax], h, pvol,
+                        data.reshape(-1, 1), w, bounds, kernel_name, period,
+                        int(self.periodic), nthreads)
+                else:
+                    dz = pos[:, ax] - coord
+                    if self.ds.periodicity[ax]:
+                        dz -= DW * np.rint(dz / DW)
+                    pixelize_sph_kernel_slice(buff, wbuff,
+                        pos[:, xax], pos[:, yax], dz, h, pvol,
+                        data.reshape(-1, 1), bounds, kernel_name, period,
+                        int(self.periodic), nthreads)
+        if proj:
+            return _sph_projection_image(self.ds, buff, wbuff, units,
+                                         wsph is not None)
+        comm = communication_system.communicators[-1]
+        buff = comm.mpi_allreduce(buff, op="sum")[:, :, 0]
+        units = comm.mpi_bcast(units)
+        return buff, Unit(units, registry=self.ds.unit_registry)
+
     def __setitem__(self, item, val):
         self.data[item] = val
 
@@ -531,6 +692,14 @@ class OffAxisProjectionFixedResolutionBuffer(FixedResolutionBuffer):
         mylog.info("Making a fixed resolution buffer of (%s) %d by %d" % \
             (item, self.buff_size[0], self.buff_size[1]))
         dd = self.data_source
+        sph = get_sph_source(self.ds, dd._determine_fields(item)[0],
+                             dd.weight_field, dd.method)
+        if sph is not None:
+            buff, units = self._sph_pixelize(item, sph)
+            ia = ImageArray(buff, input_units=units,
+                            info=self._get_info(item))
+            self[item] = ia
+            return ia
         width = self.ds.arr((self.bounds[1] - self.bounds[0],
                              self.bounds[3] - self.bounds[2],
                              self.bounds[5] - self.bounds[4]))
@@ -545,6 +714,260 @@ class OffAxisProjectionFixedResolutionBuffer(FixedResolutionBuffer):
         self[item] = ia
         return ia
 
+    def _sph_pixelize(self, item, sph):
+        # Rotates the SPH particles a field is smoothed from into the frame
+        # of the image and adds up their kernels along the line of sight.
+        # Only particles within the depth of the image are used.
+        dd = self.data_source
+        field = dd._determine_fields(item)[0]
+        ptype, fname, mass, hsml, dens, kernel_name = sph
+        units = self.ds._get_field_info(*field).units
+        bounds = []
+        for b in self.bounds:
+            if hasattr(b, "in_units"):
+                b = float(b.in_units("code_length"))
+            bounds.append(b)
+        center = dd.center
+        if hasattr(center, "in_units"):
+            center = center.in_units("code_length").d
+        vecs = np.asarray(dd.orienter.unit_vectors, dtype="float64")
+        DW = self.ds.domain_width.in_units("code_length").d
+        periodic = np.array(self.ds.periodicity, dtype="bool")
+        wsph = None
+        if dd.weight_field is not None:
+            wsph = self.ds.field_info.get_sph_source(dd.weight_field)
+        buff = np.zeros((self.buff_size[1], self.buff_size[0], 1),
+                        dtype="float64")
+        wbuff = np.zeros((self.buff_size[1], self.buff_size[0]),
+                         dtype="float64")
+        nthreads = get_particle_nthreads()
+        for chunk in parallel_objects(dd.dd.chunks([], "io",
+                                                   local_only=True)):
+            pos, h, pvol, data, units = _sph_particles(chunk, sph, units)
+            if pos.shape[0] == 0:
+                continue
+            pos -= center
+            pos[:, periodic] -= DW[periodic] * \
+                np.rint(pos[:, periodic] / DW[periodic])
+            pos = np.dot(pos, vecs.T)
+            mask = (pos[:, 2] + h >= bounds[4]) & (pos[:, 2] - h <= bounds[5])
+            if wsph is None:
+                w = np.ones(pos.shape[0], dtype="float64")
+            else:
+                w = chunk[ptype, wsph[1]].d.astype("float64")
+            pixelize_sph_kernel_projection(buff, wbuff,
+                pos[mask, 0], pos[mask, 1], h[mask], pvol[mask],
+                data[mask].reshape(-1, 1), w[mask], bounds[:4], kernel_name,
+                None, 0, nthreads)
+        return _sph_projection_image(self.ds, buff, wbuff, units,
+                                     wsph is not None)
+
+
+class ProjectionBufferDataSource(object):
+    """
+    A stand-in for a projection object describing an on-axis projection
+    that is deposited straight into an image by a
+    :class:`~yt.visualization.fixed_resolution.ProjectionFixedResolutionBuffer`.
+    """
+    _type_name = 'proj'
+    _key_fields = []
+    def __init__(self, data_source, axis, weight_field=None,
+                 method="integrate"):
+        self.dd = data_source
+        self.ds = data_source.ds
+        self.axis = fix_axis(axis, self.ds)
+        if method not in ("integrate", "mip", "sum"):
+            raise NotImplementedError(method)
+        self.method = method
+        if weight_field is not None:
+            weight_field = self.dd._determine_fields(weight_field)[0]
+        self.weight_field = weight_field
+        self.center = getattr(data_source, "center", None)
+        if self.center is None:
+            self.center = self.ds.domain_center
+
+    def _determine_fields(self, *args):
+        return self.dd._determine_fields(*args)
+
+    def __str__(self):
+        return "ProjectionBuffer (%s): axis=%s, data_source=%s" % (
+            self.ds, self.axis, self.dd)
+
+class ProjectionFixedResolutionBuffer(FixedResolutionBuffer):
+    r"""
+    ProjectionFixedResolutionBuffer(data_source, axis, bounds, buff_size,
+                                    weight_field=None, method="integrate",
+                                    antialias=True, periodic=False)
+
+    This object is a subclass of
+    :class:`yt.visualization.fixed_resolution.FixedResolutionBuffer`
+    that makes on-axis projections of a 3D data object directly at the
+    requested image resolution.  Rather than building a
+    :class:`~yt.data_objects.construction_data_containers.YTQuadTreeProj`
+    and pixelizing it, the cells of each io chunk are deposited straight
+    into the image, so memory use scales with the number of pixels rather
+    than the number of cells in the projection.  In parallel, each
+    processor deposits its own chunks and the images are reduced at the
+    end.  Every field requested in one call to :meth:`project` is made in
+    a single pass over the data.
+
+    Parameters
+    ----------
+    data_source : 3D data object
+        The data to be projected, for instance ``ds.all_data()``.
+    axis : int or str
+        The axis along which to project.
+    bounds : sequence of floats
+        The (xmin, xmax, ymin, ymax) extent of the image, in code units.
+    buff_size : sequence of ints
+        The size of the image to generate.
+    weight_field : field, optional
+        If supplied, the projection is the average of the field weighted
+        by this field along each line of sight.
+    method : string, optional
+        "integrate", "mip" or "sum", as for
+        :class:`~yt.data_objects.construction_data_containers.YTQuadTreeProj`.
+    antialias : boolean
+        Kept for compatibility with the other buffers.  Cells are always
+        deposited in proportion to the fraction of each pixel they cover, so
+        that the image conserves the projected quantity.
+    periodic : boolean
+        Whether the image wraps around the domain boundaries.
+
+    Notes
+    -----
+    This buffer is an explicit opt-in: ``to_frb``, ``ProjectionPlot`` and
+    the other plot windows build a
+    :class:`~yt.data_objects.construction_data_containers.YTQuadTreeProj`
+    and pixelize it, which lets them pan and zoom without going back to the
+    data.  Create this buffer directly when only an image of a given size
+    is needed.
+
+    Examples
+    --------
+    >>> frb = ProjectionFixedResolutionBuffer(ds.all_data(), "z",
+    ...                                       (0.0, 1.0, 0.0, 1.0),
+    ...                                       (800, 800))
+    >>> frb.project(["density", "temperature"])
+    >>> print frb["density"].max()
+    """
+    def __init__(self, data_source, axis, bounds, buff_size,
+                 weight_field=None, method="integrate", antialias=True,
+                 periodic=False):
+        source = ProjectionBufferDataSource(data_source, axis, weight_field,
+                                            method)
+        FixedResolutionBuffer.__init__(self, source, bounds, buff_size,
+                                       antialias, periodic)
+
+    def __getitem__(self, item):
+        if item not in self.data:
+            self.project([item])
+        return self.data[item]
+
+    def _projected_units(self, field, chunk):
+        source = self.data_source
+        finfo = self.ds._get_field_info(field)
+        if finfo.units is None and chunk is not None:
+            finfo.units = str(chunk[field].units)
+        units = Unit(finfo.units or "", registry=self.ds.unit_registry)
+        if source.weight_field is not None or source.method != "integrate":
+            return units, units
+        ax_name = self.ds.coordinates.axis_name[source.axis]
+        dl = self.ds.field_info["index", "path_element_%s" % ax_name].units
+        dl = Unit(dl, registry=self.ds.unit_registry)
+        if not dl.is_dimensionless:
+            dl = dl.get_base_equivalent(unit_system=self.ds.unit_system)
+        return units, units * dl
+
+    def project(self, items):
+        """
+        Make the projections of all of *items* in one pass over the data.
+        """
+        source = self.data_source
+        items = [item for item in ensure_list(items) if item not in self.data]
+        if len(items) == 0:
+            return
+        fields = source._determine_fields(items)
+        mylog.info("Projecting %s directly onto a %d by %d buffer" %
+                   (fields, self.buff_size[0], self.buff_size[1]))
+        bounds = []
+        for b in self.bounds:
+            if hasattr(b, "in_units"):
+                b = float(b.in_units("code_length"))
+            bounds.append(b)
+        xax = self.ds.coordinates.x_axis[source.axis]
+        yax = self.ds.coordinates.y_axis[source.axis]
+        ax_name = self.ds.coordinates.axis_name[source.axis]
+        period = [self._period[0], self._period[1]]
+        for i, p in enumerate(period):
+            if hasattr(p, "in_units"):
+                period[i] = float(p.in_units("code_length"))
+        mip = int(source.method == "mip")
+        buff = np.zeros((self.buff_size[1], self.buff_size[0], len(fields)),
+                        dtype="float64")
+        if mip:
+            buff[:] = -np.inf
+        wbuff = np.zeros((self.buff_size[1], self.buff_size[0]),
+                         dtype="float64")
+        field_units = {}
+        units = {}
+        dd = source.dd
+        with dd._field_parameter_state(dd.field_parameters):
+            for chunk in parallel_objects(dd.chunks([], "io",
+                                                    local_only=True)):
+                if chunk.ires.size == 0:
+                    continue
+                if len(units) == 0:
+                    for field in fields:
+                        field_units[field], units[field] = \
+                            self._projected_units(field, chunk)
+                if source.method == "integrate":
+                    dl = chunk["index", "path_element_%s" % ax_name]
+                    if not dl.units.is_dimensionless:
+                        dl.convert_to_units(self.ds.unit_system["length"])
+                    dl = dl.d
+                else:
+                    dl = 1.0
+                v = np.empty((chunk.ires.size, len(fields)), dtype="float64")
+                for i, field in enumerate(fields):
+                    v[:, i] = chunk[field].in_units(field_units[field]).d * dl
+                if source.weight_field is not None and not mip:
+                    w = chunk[source.weight_field].d
+                    np.multiply(v, w[:, None], v)
+                    w = w * dl
+                else:
+                    w = np.ones(chunk.ires.size, dtype="float64")
+                fcoords = chunk.fcoords.d
+                fwidth = chunk.fwidth.d
+                pixelize_projection(buff, wbuff,
+                                    fcoords[:, xax], fcoords[:, yax],
+                                    fwidth[:, xax] / 2.0,
+                                    fwidth[:, yax] / 2.0,
+                                    v, w, bounds, mip,
+                                    period, int(self.periodic))
+        comm = communication_system.communicators[-1]
+        op = "max" if mip else "sum"
+        buff = comm.mpi_allreduce(buff, op=op)
+        wbuff = comm.mpi_allreduce(wbuff, op=op)
+        # Only processors that deposited a chunk know the units, so they are
+        # gathered from all of them.
+        units = comm.par_combine_object(units, datatype="dict", op="join")
+        for field in fields:
+            if field not in units:
+                # Nothing was selected anywhere, so the image is empty.
+                units[field] = self._projected_units(field, None)[1]
+        if mip:
+            buff[wbuff == 0] = 0.0
+        elif source.weight_field is not None:
+            # Pixels no cell falls in are left as NaN, as for projections.
+            with np.errstate(invalid='ignore'):
+                np.divide(buff, wbuff[:, :, None], buff)
+        for i, (item, field) in enumerate(zip(items, fields)):
+            image = buff[:, :, i].copy()
+            for name, (args, kwargs) in self._filters:
+                image = filter_registry[name](*args[1:], **kwargs).apply(image)
+            self.data[item] = ImageArray(image, input_units=units[field],
+                                         info=self._get_info(item))
 
 class ParticleImageBuffer(FixedResolutionBuffer):
     """
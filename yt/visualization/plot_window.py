@@ -27,7 +27,8 @@ from .base_plot_types import \
     ImagePlotMPL
 from .fixed_resolution import \
     FixedResolutionBuffer, \
-    OffAxisProjectionFixedResolutionBuffer
+    OffAxisProjectionFixedResolutionBuffer, \
+    get_sph_source
 from .plot_modifications import callback_registry
 from .plot_container import \
     ImagePlotContainer, \
@@ -1276,7 +1277,12 @@ class AxisAlignedSlicePlot(PWViewerMPL):
         else:
             slc = ds.slice(axis, center[axis], field_parameters=field_parameters,
                            center=center, data_source=data_source)
-            slc.get_data(fields)
+            # Fields smoothed from SPH particles are pixelized from the
+            # particles by the buffer, so they are not sliced here.
+            mesh_fields = [f for f in slc._determine_fields(fields)
+                           if get_sph_source(ds, f) is None]
+            if len(mesh_fields) > 0:
+                slc.get_data(mesh_fields)
         validate_mesh_fields(slc, fields)
         PWViewerMPL.__init__(self, slc, bounds, origin=origin,
                              fontsize=fontsize, fields=fields,
@@ -1464,7 +1470,15 @@ class ProjectionPlot(PWViewerMPL):
             else:
                 proj.weight_field = weight_field
         else:
-            proj = ds.proj(fields, axis, weight_field=weight_field,
+            # As for slices, fields smoothed from SPH particles are not
+            # projected on the mesh.
+            pfields = test_data_source._determine_fields(fields)
+            if weight_field is not None:
+                weight_field = test_data_source._determine_fields(
+                    weight_field)[0]
+            pfields = [f for f in pfields if get_sph_source(
+                ds, f, weight_field, method) is None]
+            proj = ds.proj(pfields, axis, weight_field=weight_field,
                            center=center, data_source=data_source,
                            field_parameters=field_parameters, method=method,
                            max_level=max_level)
@@ -0,0 +1,79 @@
+"""
+Tests for projecting directly into a fixed resolution buffer
+
+
+
+"""
+from __future__ import absolute_import
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+from yt.testing import \
+    fake_amr_ds, \
+    fake_random_ds, \
+    assert_equal, \
+    assert_rel_equal
+from yt.visualization.fixed_resolution import \
+    FixedResolutionBuffer, \
+    ProjectionFixedResolutionBuffer
+
+def setup():
+    """Test specific setup."""
+    from yt.config import ytcfg
+    ytcfg["yt", "__withintesting"] = "True"
+
+def test_projection_buffer():
+    ds = fake_random_ds(16, nprocs=8)
+    bounds = (0.0, 1.0, 0.0, 1.0)
+    for axis in range(3):
+        for weight, method in [(None, "integrate"), ("density", "integrate"),
+                               (None, "mip"), (None, "sum")]:
+            proj = ds.proj("density", axis, weight_field=weight,
+                           method=method)
+            frb1 = FixedResolutionBuffer(proj, bounds, (16, 16))
+            frb2 = ProjectionFixedResolutionBuffer(ds.all_data(), axis,
+                                                   bounds, (16, 16),
+                                                   weight_field=weight,
+                                                   method=method)
+            assert_equal(frb1["density"].units, frb2["density"].units)
+            assert_rel_equal(frb1["density"], frb2["density"], 10)
+
+def test_projection_buffer_amr():
+    ds = fake_amr_ds(fields=("Density",))
+    bounds = (0.0, 1.0, 0.0, 1.0)
+    proj = ds.proj("Density", 2)
+    frb1 = FixedResolutionBuffer(proj, bounds, (64, 64))
+    frb2 = ProjectionFixedResolutionBuffer(ds.all_data(), 2, bounds,
+                                           (64, 64))
+    frb2.project(["Density", "cell_volume"])
+    assert_equal(set(frb2.keys()), set(["Density", "cell_volume"]))
+    assert_rel_equal(frb1["Density"], frb2["Density"], 10)
+
+def test_projection_buffer_overlap():
+    # Pixels that straddle cell edges take each cell in proportion to the
+    # area it covers, with or without antialiasing, so a sum of ones along
+    # the line of sight is the number of cells in every pixel.
+    ds = fake_random_ds(16, fields=("density",), units=("g/cm**3",))
+    bounds = (0.0, 1.0, 0.0, 1.0)
+    for antialias in [True, False]:
+        frb = ProjectionFixedResolutionBuffer(ds.all_data(), 2, bounds,
+                                              (24, 24), method="sum",
+                                              antialias=antialias)
+        assert_rel_equal(frb["ones"].d, 16.0 * np.ones((24, 24)), 10)
+
+def test_projection_buffer_empty():
+    # Nothing is selected, so there are no chunks to take the units from.
+    ds = fake_random_ds(16)
+    sp = ds.sphere([0.5, 0.5, 0.5], 1.0e-6)
+    frb = ProjectionFixedResolutionBuffer(sp, 2, (0.0, 1.0, 0.0, 1.0),
+                                          (8, 8))
+    assert_equal(str(frb["density"].units),
+                 str(ds.proj("density", 2)["density"].units))
+    assert_equal(frb["density"].d, np.zeros((8, 8)))
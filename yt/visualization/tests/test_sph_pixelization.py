@@ -0,0 +1,140 @@
+"""
+Tests for making images of SPH fields from the particles
+
+
+
+"""
+from __future__ import absolute_import
+
+#-----------------------------------------------------------------------------
+# Copyright (c) 2018, yt Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+#-----------------------------------------------------------------------------
+import numpy as np
+
+from yt.fields.particle_fields import \
+    add_volume_weighted_smoothed_field
+from yt.frontends.stream.api import load_particles
+from yt.testing import \
+    assert_almost_equal, \
+    assert_equal, \
+    assert_rel_equal
+from yt.utilities.lib.pixelization_routines import \
+    get_sph_kernel_tables, \
+    pixelize_sph_kernel_projection
+from yt.visualization.fixed_resolution import \
+    FixedResolutionBuffer, \
+    OffAxisProjectionFixedResolutionBuffer, \
+    get_sph_source, \
+    _sph_slice_region
+from yt.visualization.plot_window import \
+    OffAxisProjectionDummyDataSource, \
+    ProjectionPlot
+
+def setup():
+    """Test specific setup."""
+    from yt.config import ytcfg
+    ytcfg["yt", "__withintesting"] = "True"
+
+def fake_sph_ds(npart=1000):
+    prng = np.random.RandomState(0x4d3d3d3)
+    data = {}
+    for ax in "xyz":
+        data["particle_position_%s" % ax] = \
+            (prng.uniform(0.2, 0.8, npart), "cm")
+    data["particle_mass"] = (prng.uniform(1.0, 2.0, npart), "g")
+    data["density"] = (prng.uniform(1.0, 2.0, npart), "g/cm**3")
+    data["smoothing_length"] = (prng.uniform(0.03, 0.1, npart), "cm")
+    ds = load_particles(data, 1.0)
+    ds.index
+    fn, = add_volume_weighted_smoothed_field(
+        "io", "particle_position", "particle_mass", "smoothing_length",
+        "density", "density", ds.field_info)
+    return ds, fn
+
+def test_sph_kernel_tables():
+    for kernel_name in ["cubic", "quartic", "wendland2"]:
+        w3, w2 = get_sph_kernel_tables(kernel_name)
+        q2 = np.linspace(0.0, 1.0, w3.size)
+        assert_almost_equal(2.0 * np.pi * np.trapz(np.sqrt(q2) * w3, q2),
+                            1.0, 3)
+        assert_almost_equal(np.pi * np.trapz(w2, q2), 1.0, 3)
+
+def test_sph_kernel_projection():
+    prng = np.random.RandomState(0x4d3d3d3)
+    n = 1000
+    px, py = prng.uniform(0.2, 0.8, (2, n))
+    # Half of the particles are smaller than a pixel.
+    hsml = np.concatenate([prng.uniform(0.03, 0.1, n // 2),
+                           np.full(n // 2, 0.001)])
+    pvol = prng.uniform(1e-4, 2e-4, n)
+    data = np.ones((n, 1))
+    for nthreads in [1, 4]:
+        buff = np.zeros((64, 64, 1))
+        wbuff = np.zeros((64, 64))
+        pixelize_sph_kernel_projection(
+            buff, wbuff, px, py, hsml, pvol, data, np.ones(n),
+            (0.0, 1.0, 0.0, 1.0), num_threads=nthreads)
+        assert_rel_equal(buff.sum() / 64**2, pvol.sum(), 2)
+        assert_equal(buff[:, :, 0], wbuff)
+
+def test_sph_frb():
+    ds, fn = fake_sph_ds()
+    ad = ds.all_data()
+    mass = ad["io", "particle_mass"].sum()
+    assert get_sph_source(ds, fn) is not None
+    assert get_sph_source(ds, fn, method="mip") is None
+    proj = ds.proj(fn, 2)
+    frb = FixedResolutionBuffer(proj, (0.0, 1.0, 0.0, 1.0), (64, 64))
+    image = frb[fn]
+    assert_equal(image.units, proj[fn].units)
+    assert_rel_equal((image * ds.quan(1.0 / 64**2, "cm**2")).sum(),
+                     mass.in_units("g"), 2)
+    slc = ds.slice(2, 0.5)
+    frb = FixedResolutionBuffer(slc, (0.0, 1.0, 0.0, 1.0), (64, 64))
+    image = frb[fn]
+    assert_equal(image.units, ds.field_info[fn].units)
+    assert image.max() > 0
+
+def test_sph_slice_region():
+    ds, fn = fake_sph_ds()
+    # Only the particles within the largest smoothing length of the slice
+    # are read.
+    reg = _sph_slice_region(ds, "io", "smoothing_length", 2, 0.5)
+    hmax = ds.all_data()["io", "smoothing_length"].max().d
+    assert_almost_equal(reg.left_edge.d, [0.0, 0.0, 0.5 - hmax])
+    assert_almost_equal(reg.right_edge.d, [1.0, 1.0, 0.5 + hmax])
+    images = []
+    for data_source in [None, ds.all_data()]:
+        slc = ds.slice(2, 0.5, data_source=data_source)
+        frb = FixedResolutionBuffer(slc, (0.0, 1.0, 0.0, 1.0), (64, 64))
+        images.append(frb[fn])
+    assert_equal(images[0], images[1])
+    # The largest smoothing length is found once per dataset.
+    assert_almost_equal(
+        ds.index._max_smoothing_lengths["io", "smoothing_length"], hmax)
+    ds.index._max_smoothing_lengths["io", "smoothing_length"] = 0.25
+    reg = _sph_slice_region(ds, "io", "smoothing_length", 2, 0.5)
+    assert_almost_equal(reg.left_edge.d, [0.0, 0.0, 0.25])
+
+def test_sph_projection_plot():
+    ds, fn = fake_sph_ds()
+    # Nothing is projected on the mesh when every field is pixelized from
+    # the particles.
+    p = ProjectionPlot(ds, 2, fn)
+    assert_equal(len(p.data_source.field_data), 0)
+
+def test_sph_off_axis_projection():
+    ds, fn = fake_sph_ds()
+    mass = ds.all_data()["io", "particle_mass"].sum()
+    width = ds.arr([1.2, 1.2, 2.0], "code_length")
+    source = OffAxisProjectionDummyDataSource(
+        ds.domain_center, ds, [1.0, 1.0, 0.0], width, [fn], False)
+    frb = OffAxisProjectionFixedResolutionBuffer(
+        source, (-0.6, 0.6, -0.6, 0.6, -1.0, 1.0), (64, 64))
+    image = frb[fn]
+    area = ds.quan((1.2 / 64)**2, "cm**2")
+    assert_rel_equal((image * area).sum(), mass.in_units("g"), 2)